@@ -1,9 +1,9 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Пакет application для программы "Бухгалтерия"
-"""
-
-__version__ = "1.0.0"
-__author__ = "Student"
-__description__ = "Программа для ведения бухгалтерской отчетности"
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пакет application для программы "Бухгалтерия"
+"""
+
+__version__ = "1.0.0"
+__author__ = "Student"
+__description__ = "Программа для ведения бухгалтерской отчетности"
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Консольный вывод функций бухгалтерии с уровнями подробности и буферизацией
+"""
+
+import atexit
+import os
+import sys
+import threading
+
+QUIET = 0     # ничего не выводить
+SUMMARY = 1   # только итоги пакетных операций
+NORMAL = 2    # сообщения каждого вызова (по умолчанию)
+CONSOLE_LEVELS = {'quiet': QUIET, 'summary': SUMMARY, 'normal': NORMAL}
+
+# Переменная окружения с начальной настройкой: уровень и, через запятую,
+# режим буферизации, например "summary,buffered" или "quiet"
+CONSOLE_ENV = 'ACCOUNTING_CONSOLE'
+
+# Размер буфера по умолчанию (в символах), после которого он сбрасывается
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class Console:
+    """
+    Вывод сообщений функций пакета application в stdout.
+
+    Сообщение передается шаблоном str.format и аргументами, а форматируется
+    только если его уровень не выше текущего: в тихом режиме вызов стоит
+    одно сравнение. В буферизованном режиме строки копятся в памяти и
+    пишутся в поток одним вызовом write, когда накопится buffer_size
+    символов, при flush() и при выходе из программы.
+
+    Args:
+        level (int): QUIET, SUMMARY или NORMAL
+        buffered (bool): Писать в поток крупными порциями
+        buffer_size (int): Размер буфера в символах
+        stream: Поток вывода (по умолчанию - текущий sys.stdout)
+    """
+
+    def __init__(self, level=NORMAL, buffered=False, buffer_size=DEFAULT_BUFFER_SIZE, stream=None):
+        self.level = level
+        self.buffered = buffered
+        self.buffer_size = buffer_size
+        self.stream = stream
+        self._buffer = []
+        self._buffered_size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Консоль с настройкой из переменной ACCOUNTING_CONSOLE"""
+        console = cls()
+        options = (part.strip().lower() for part in os.environ.get(CONSOLE_ENV, '').split(','))
+        for option in filter(None, options):
+            if option == 'buffered':
+                console.buffered = True
+            elif option in CONSOLE_LEVELS:
+                console.level = CONSOLE_LEVELS[option]
+            else:
+                raise ValueError(f"Неизвестная настройка {CONSOLE_ENV}: {option}")
+        return console
+
+    def enabled(self, level=NORMAL):
+        """Будут ли выведены сообщения этого уровня"""
+        return level <= self.level
+
+    def info(self, message, *args):
+        """Сообщение отдельного вызова (уровень NORMAL)"""
+        if self.level >= NORMAL:
+            self.write(message.format(*args) if args else message)
+
+    def summary(self, message, *args):
+        """Итог пакетной операции (уровень SUMMARY)"""
+        if self.level >= SUMMARY:
+            self.write(message.format(*args) if args else message)
+
+    def write(self, line):
+        """Вывести строку без проверки уровня"""
+        line += '\n'
+        if not self.buffered:
+            self._stream().write(line)
+            return
+        with self._lock:
+            self._buffer.append(line)
+            self._buffered_size += len(line)
+            if self._buffered_size >= self.buffer_size:
+                self._flush()
+
+    def flush(self):
+        """Записать накопленные строки в поток"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            text = ''.join(self._buffer)
+            self._buffer.clear()
+            self._buffered_size = 0
+            stream = self._stream()
+            stream.write(text)
+            stream.flush()
+
+    def _stream(self):
+        # sys.stdout читается при каждой записи: его могут подменить (тесты, перенаправление)
+        return self.stream if self.stream is not None else sys.stdout
+
+
+console = Console.from_env()
+
+
+def configure_console(level=None, buffered=None, buffer_size=None):
+    """
+    Изменить уровень подробности или режим буферизации вывода.
+
+    Args:
+        level: QUIET, SUMMARY, NORMAL или их имя ('quiet', 'summary', 'normal')
+        buffered (bool): Писать в stdout крупными порциями
+        buffer_size (int): Размер буфера в символах
+    """
+    if isinstance(level, str):
+        try:
+            level = CONSOLE_LEVELS[level]
+        except KeyError:
+            raise ValueError(f"Неизвестный уровень вывода: {level}; допустимы {', '.join(CONSOLE_LEVELS)}") from None
+    if level is not None:
+        console.level = level
+    if buffer_size is not None:
+        if buffer_size < 1:
+            raise ValueError("Размер буфера должен быть не меньше 1")
+        console.buffer_size = buffer_size
+    if buffered is not None:
+        if not buffered:
+            console.flush()
+        console.buffered = buffered
+
+
+def flush_console():
+    """Записать в stdout накопленный вывод"""
+    console.flush()
+
+
+atexit.register(flush_console)
+if hasattr(os, 'register_at_fork'):
+    # Буфер сбрасывается до fork, чтобы дочерний процесс не вывел его повторно
+    os.register_at_fork(before=flush_console)
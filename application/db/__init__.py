@@ -1,7 +1,7 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Пакет db для работы с базой данных
-"""
-
-__version__ = "1.0.0"
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пакет db для работы с базой данных
+"""
+
+__version__ = "1.0.0"
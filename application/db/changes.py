@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Журнал изменений хранилища сотрудников
+"""
+
+import threading
+from collections import deque, namedtuple
+from itertools import islice
+
+# Сколько последних изменений хранит журнал по умолчанию
+DEFAULT_CHANGE_LOG_SIZE = 100_000
+
+# Изменение сотрудника: old - запись до изменения (None при добавлении),
+# new - запись после изменения, revision - версия данных хранилища после
+# изменения (у изменений одной транзакции она общая)
+Change = namedtuple('Change', 'sequence employee_id old new revision')
+
+
+class ChangeLog:
+    """
+    Журнал последних изменений сотрудников с последовательной нумерацией.
+
+    Потребитель запоминает номер последнего учтенного изменения (position)
+    и затем забирает только новые изменения через since(). Журнал хранит
+    не больше maxlen записей: если нужные изменения уже вытеснены,
+    since() возвращает None и потребитель пересчитывает данные полностью.
+
+    Args:
+        maxlen (int): Максимальное число хранимых изменений
+    """
+
+    def __init__(self, maxlen=DEFAULT_CHANGE_LOG_SIZE):
+        self._changes = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.position = 0  # номер последнего изменения
+
+    def __len__(self):
+        return len(self._changes)
+
+    def record(self, old, new, revision=None):
+        """Записать изменение сотрудника; возвращает его номер"""
+        return self.record_many([(old, new)], revision)
+
+    def record_many(self, changes, revision=None):
+        """
+        Записать пары (старая запись, новая запись); возвращает номер последней.
+
+        revision - версия данных после изменений (по умолчанию - номер
+        изменения, для хранилищ без собственной версии)
+        """
+        with self._lock:
+            append = self._changes.append
+            position = self.position
+            for old, new in changes:
+                position += 1
+                append(Change(position, (new if new is not None else old)['id'], old, new,
+                              position if revision is None else revision))
+            self.position = position
+            return position
+
+    def since(self, position):
+        """
+        Изменения с номерами больше position.
+
+        Returns:
+            list: Изменения по порядку или None, если часть из них
+            уже вытеснена из журнала
+        """
+        with self._lock:
+            missing = self.position - position
+            if missing <= 0:
+                return []
+            if missing > len(self._changes):
+                return None
+            # С правого конца: стоимость зависит от числа новых изменений, а не от длины журнала
+            changes = list(islice(reversed(self._changes), missing))
+            changes.reverse()
+            return changes
+
+    def dirty_ids(self, position):
+        """Множество ID сотрудников, измененных после position (None - журнал неполон)"""
+        changes = self.since(position)
+        if changes is None:
+            return None
+        return {change.employee_id for change in changes}
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Компактное представление сотрудников: записи со __slots__
+и колоночное хранение для массовых расчетов
+"""
+
+from array import array
+from collections.abc import Mapping
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+
+EMPLOYEE_FIELDS = ('id', 'name', 'position', 'salary', 'hire_date')
+
+
+class EmployeeRecord(Mapping):
+    """
+    Неизменяемая запись о сотруднике со __slots__.
+
+    Занимает в несколько раз меньше памяти, чем словарь, и при этом
+    ведет себя как словарь для чтения: emp['salary'], emp.get('hire_date'),
+    сравнение с dict и repr в том же виде, что и у словаря.
+    Необязательное поле hire_date отсутствует в ключах, если оно не задано.
+    """
+
+    __slots__ = EMPLOYEE_FIELDS
+
+    def __init__(self, id, name, position, salary=0.0, hire_date=None):
+        setter = object.__setattr__
+        setter(self, 'id', id)
+        setter(self, 'name', name)
+        setter(self, 'position', position)
+        setter(self, 'salary', salary)
+        setter(self, 'hire_date', hire_date)
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Создать запись из словаря (или другой записи)"""
+        if isinstance(data, cls):
+            return data
+        unknown = set(data) - set(EMPLOYEE_FIELDS)
+        if unknown:
+            raise TypeError(f"Неизвестные поля сотрудника: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+    def replace(self, **fields):
+        """Новая запись с измененными полями"""
+        return EmployeeRecord.from_mapping({**self, **fields})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EmployeeRecord неизменяема, используйте replace()")
+
+    def __getitem__(self, key):
+        if key in EMPLOYEE_FIELDS:
+            value = getattr(self, key)
+            if value is not None or key != 'hire_date':
+                return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for field in EMPLOYEE_FIELDS:
+            if field != 'hire_date' or self.hire_date is not None:
+                yield field
+
+    def __len__(self):
+        return len(EMPLOYEE_FIELDS) - (self.hire_date is None)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, field) for field in EMPLOYEE_FIELDS))
+
+    def __reduce__(self):
+        return EmployeeRecord, tuple(getattr(self, field) for field in EMPLOYEE_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def to_dict(self):
+        """Обычный словарь с данными сотрудника"""
+        return dict(self)
+
+
+class EmployeeColumns:
+    """
+    Колоночное хранение штата для массовых расчетов.
+
+    ID и оклады лежат в массивах array ('q' и 'd'), должности и даты
+    приема закодированы словарем (массив кодов + список значений),
+    имена хранятся одним буфером UTF-8 со смещениями. Построчный доступ
+    возвращает легковесные представления EmployeeRowView, совместимые
+    со словарем: columns[i]['salary'].
+    """
+
+    def __init__(self):
+        self.ids = array('q')
+        self.salaries = array('d')
+        self.position_codes = array('I')
+        self.positions = []
+        self.hire_date_codes = array('I')
+        self.hire_dates = [None]
+        self._name_data = bytearray()
+        self._name_offsets = array('q', [0])
+        self._position_lookup = {}
+        self._hire_date_lookup = {None: 0}
+
+    @classmethod
+    def from_records(cls, employees):
+        """Построить колонки из последовательности словарей или записей"""
+        columns = cls()
+        columns.extend(employees)
+        return columns
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return EmployeeRowView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield EmployeeRowView(self, index)
+
+    def append(self, employee):
+        """Добавить одного сотрудника"""
+        self.ids.append(employee['id'])
+        self.salaries.append(float(employee.get('salary', 0.0)))
+        self.position_codes.append(self.position_code(employee['position'], create=True))
+        self.hire_date_codes.append(self._hire_date_code(employee.get('hire_date')))
+        self._name_data += employee['name'].encode('utf-8')
+        self._name_offsets.append(len(self._name_data))
+
+    def extend(self, employees):
+        """Добавить последовательность сотрудников"""
+        for employee in employees:
+            self.append(employee)
+
+    def position_code(self, position, create=False):
+        """
+        Код должности в словаре должностей.
+
+        Args:
+            position (str): Должность
+            create (bool): Добавить должность в словарь, если ее нет
+        """
+        code = self._position_lookup.get(position)
+        if code is None:
+            if not create:
+                raise KeyError(position)
+            code = self._position_lookup[position] = len(self.positions)
+            self.positions.append(position)
+        return code
+
+    def _hire_date_code(self, hire_date):
+        code = self._hire_date_lookup.get(hire_date)
+        if code is None:
+            code = self._hire_date_lookup[hire_date] = len(self.hire_dates)
+            self.hire_dates.append(hire_date)
+        return code
+
+    def name(self, index):
+        """Имя сотрудника по номеру строки"""
+        start, end = self._name_offsets[index], self._name_offsets[index + 1]
+        return self._name_data[start:end].decode('utf-8')
+
+    def record(self, index):
+        """Строка в виде EmployeeRecord"""
+        return EmployeeRecord(
+            self.ids[index], self.name(index), self.positions[self.position_codes[index]],
+            self.salaries[index], self.hire_dates[self.hire_date_codes[index]],
+        )
+
+    def salary_totals_by_position(self):
+        """
+        Сумма окладов и число сотрудников по должностям за один проход.
+
+        Returns:
+            dict: должность -> (count, total_salary)
+        """
+        if np is not None and len(self):
+            codes, salaries = self.as_numpy('position_codes', 'salaries')
+            counts = np.bincount(codes, minlength=len(self.positions))
+            totals = np.bincount(codes, weights=salaries, minlength=len(self.positions))
+            return {
+                position: (int(counts[code]), float(totals[code]))
+                for code, position in enumerate(self.positions) if counts[code]
+            }
+
+        counts = [0] * len(self.positions)
+        totals = [0.0] * len(self.positions)
+        for code, salary in zip(self.position_codes, self.salaries):
+            counts[code] += 1
+            totals[code] += salary
+        return {
+            position: (counts[code], totals[code])
+            for code, position in enumerate(self.positions) if counts[code]
+        }
+
+    def as_numpy(self, *names):
+        """
+        Представить колонки как массивы NumPy без копирования.
+
+        Args:
+            *names: Имена колонок ('ids', 'salaries', 'position_codes',
+                'hire_date_codes'); по умолчанию - все
+        """
+        if np is None:
+            raise RuntimeError("Для as_numpy() требуется пакет numpy")
+        dtypes = {'ids': np.int64, 'salaries': np.float64,
+                  'position_codes': np.uint32, 'hire_date_codes': np.uint32}
+        names = names or tuple(dtypes)
+        arrays = tuple(np.frombuffer(getattr(self, name), dtype=dtypes[name]) for name in names)
+        return arrays if len(arrays) > 1 else arrays[0]
+
+    def nbytes(self):
+        """Примерный объем памяти, занятой колонками (в байтах)"""
+        buffers = (self.ids, self.salaries, self.position_codes,
+                   self.hire_date_codes, self._name_offsets)
+        return (sum(column.itemsize * len(column) for column in buffers)
+                + len(self._name_data)
+                + sum(len(value.encode('utf-8')) for value in self.positions))
+
+
+class EmployeeRowView(Mapping):
+    """
+    Представление одной строки EmployeeColumns в виде словаря для чтения.
+
+    Не копирует данные: значения читаются из колонок при обращении.
+    """
+
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns, index):
+        self._columns = columns
+        self._index = index
+
+    def __getitem__(self, key):
+        columns, index = self._columns, self._index
+        if key == 'id':
+            return columns.ids[index]
+        if key == 'salary':
+            return columns.salaries[index]
+        if key == 'position':
+            return columns.positions[columns.position_codes[index]]
+        if key == 'name':
+            return columns.name(index)
+        if key == 'hire_date':
+            hire_date = columns.hire_dates[columns.hire_date_codes[index]]
+            if hire_date is not None:
+                return hire_date
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from ('id', 'name', 'position', 'salary')
+        if self._columns.hire_date_codes[self._index]:
+            yield 'hire_date'
+
+    def __len__(self):
+        return 4 + bool(self._columns.hire_date_codes[self._index])
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пул соединений SQLite для слоя данных
+"""
+
+import contextlib
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+
+# Переменная окружения с путем к файлу базы; без нее база создается в памяти
+DATABASE_ENV = 'ACCOUNTING_DB'
+
+# База в памяти с общим кэшем: все соединения пула видят одни данные,
+# а у каждого пула своя база
+MEMORY_DATABASE = 'file:accounting-{}?mode=memory&cache=shared'
+
+_memory_databases = itertools.count(1)
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений SQLite.
+
+    Соединения создаются по мере надобности (не больше size) и
+    возвращаются в пул после использования; поток, не получивший
+    соединение, ждет освобождения. Файловая база работает в режиме WAL:
+    чтения не блокируются записью, а записи выполняются по очереди.
+    База в памяти (общий кэш) не умеет ждать блокировок таблиц, поэтому
+    обращения к ней выполняются по одному.
+
+    После fork пул открывает в дочернем процессе новые соединения,
+    унаследованные не используются; база в памяти у дочернего процесса
+    своя и пустая, поэтому рабочим процессам данные передаются явно.
+
+    Args:
+        database (str): Путь к файлу базы или URI (по умолчанию - из
+            переменной ACCOUNTING_DB, иначе общая база в памяти)
+        size (int): Максимальное число соединений
+        timeout (float): Ожидание блокировки файла базы в секундах
+    """
+
+    def __init__(self, database=None, size=4, timeout=10.0):
+        if size < 1:
+            raise ValueError("Размер пула должен быть не меньше 1")
+        database = database or os.environ.get(DATABASE_ENV) or ':memory:'
+        if database == ':memory:':
+            # Обычная база ':memory:' была бы своей у каждого соединения
+            database = MEMORY_DATABASE.format(next(_memory_databases))
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.in_memory = 'mode=memory' in database
+        # База в памяти существует, пока открыто хотя бы одно соединение
+        self._keeper = None
+        self._reset()
+
+    def _reset(self):
+        if self.in_memory and self._keeper is not None:
+            # Унаследованная после fork база в памяти непригодна: создаем новую
+            self.database = MEMORY_DATABASE.format(next(_memory_databases))
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # Удерживается на время транзакции записи; вызывающий код может
+        # взять его сам, чтобы выполнить действия атомарно с записью
+        self.write_lock = threading.RLock()
+        self._access = threading.RLock() if self.in_memory else contextlib.nullcontext()
+        if self.in_memory:
+            self._keeper = self._open()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Взять соединение из пула на время блока with"""
+        if self._pid != os.getpid():
+            self._reset()
+        connection = self._acquire()
+        try:
+            with self._access:
+                yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            self._idle.put(connection)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Соединение с открытой транзакцией записи.
+
+        При выходе из блока транзакция фиксируется, при исключении -
+        откатывается целиком.
+        """
+        with self.write_lock, self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.rollback()
+                raise
+            connection.commit()
+
+    def execute(self, sql, parameters=()):
+        """Выполнить запрос на чтение и вернуть все строки"""
+        with self.connection() as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def close(self):
+        """Закрыть свободные соединения (база в памяти при этом удаляется)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._open()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def _open(self):
+        connection = sqlite3.connect(self.database, timeout=self.timeout, uri=True,
+                                     isolation_level=None, check_same_thread=False)
+        if not self.in_memory:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
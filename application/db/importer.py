@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пакетный импорт сотрудников из файлов CSV и JSONL
+"""
+
+import csv
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from itertools import islice
+
+# Число строк, которые проверяются и записываются одной транзакцией
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Оклад нового сотрудника, если он не указан
+DEFAULT_SALARY = 100000.0
+
+# Формат файла по расширению
+IMPORT_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+# Отклоненные строки пишутся рядом с исходным файлом: <файл>.rejects.jsonl
+REJECTS_SUFFIX = '.rejects.jsonl'
+
+_FIELDS = frozenset(('id', 'name', 'position', 'salary', 'hire_date'))
+
+
+class ChunkReport(namedtuple('ChunkReport', 'index rows imported rejected seconds')):
+    """Итоги одной части импорта"""
+
+    __slots__ = ()
+
+    @property
+    def rows_per_second(self):
+        """Скорость обработки строк"""
+        return self.rows / self.seconds if self.seconds else math.inf
+
+
+class ImportReport(namedtuple('ImportReport', 'imported rejected chunks seconds rejects_path')):
+    """
+    Итоги импорта: число добавленных и отклоненных строк, отчеты частей
+    (ChunkReport), общее время и путь к файлу отклоненных строк
+    (None, если все строки приняты).
+    """
+
+    __slots__ = ()
+
+    @property
+    def rows_per_second(self):
+        """Средняя скорость обработки строк"""
+        rows = self.imported + self.rejected
+        return rows / self.seconds if self.seconds else math.inf
+
+
+def detect_format(path):
+    """Формат файла ('csv' или 'jsonl') по расширению"""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        return IMPORT_FORMATS[extension]
+    except KeyError:
+        raise ValueError(f"Неизвестный формат файла импорта: {path}") from None
+
+
+def read_rows(path, format=None, encoding='utf-8'):
+    """
+    Построчно читать файл импорта.
+
+    Файл не загружается в память целиком. Для CSV первая строка -
+    заголовок с именами полей; в JSONL каждая строка - объект JSON,
+    пустые строки пропускаются.
+
+    Yields:
+        tuple: (номер строки, данные строки, ошибка разбора или None)
+    """
+    format = format or detect_format(path)
+    with open(path, encoding=encoding, newline='') as stream:
+        if format == 'csv':
+            reader = csv.DictReader(stream)
+            for row in reader:
+                extra = row.pop(None, None)
+                error = ValueError(f"Лишние значения: {extra}") if extra else None
+                yield reader.line_num, row, error
+        elif format == 'jsonl':
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, json.loads(line), None
+                except ValueError as e:
+                    yield number, line.rstrip('\r\n'), e
+        else:
+            raise ValueError(f"Неизвестный формат файла импорта: {format}")
+
+
+def validate_batch(rows, default_salary=DEFAULT_SALARY, hire_date=None):
+    """
+    Проверить пачку строк импорта.
+
+    Args:
+        rows (iterable): Кортежи из read_rows
+        default_salary (float): Оклад, если он не указан
+        hire_date (str): Дата приема, если она не указана (по умолчанию - сегодня)
+
+    Returns:
+        tuple: (список (номер строки, сотрудник) для записи,
+                список (номер строки, данные, текст ошибки))
+    """
+    hire_date = hire_date or date.today().isoformat()
+    valid, rejected = [], []
+    append_valid, append_rejected = valid.append, rejected.append
+
+    for line, row, error in rows:
+        if error is None:
+            try:
+                append_valid((line, _employee(row, default_salary, hire_date)))
+                continue
+            except (TypeError, ValueError) as e:
+                error = e
+        append_rejected((line, row, str(error)))
+
+    return valid, rejected
+
+
+def import_file(repository, path, format=None, chunk_size=DEFAULT_CHUNK_SIZE, rejects_path=None,
+                default_salary=DEFAULT_SALARY, hire_date=None, on_chunk=None, encoding='utf-8'):
+    """
+    Импортировать сотрудников из файла CSV или JSONL в хранилище.
+
+    Файл читается частями по chunk_size строк, поэтому память не зависит
+    от его размера. Часть проверяется целиком, ID без явного значения
+    выдаются из последовательности хранилища, а принятые строки
+    записываются одной транзакцией (add_many). Ошибочная строка не
+    прерывает импорт: она записывается в файл отклоненных строк вместе
+    с номером строки и текстом ошибки.
+
+    Args:
+        repository: Хранилище сотрудников (EmployeeRepository или SqliteEmployeeRepository)
+        path (str): Путь к файлу
+        format (str): 'csv' или 'jsonl' (по умолчанию - по расширению)
+        chunk_size (int): Число строк в одной части
+        rejects_path (str): Файл отклоненных строк (по умолчанию - path + '.rejects.jsonl')
+        default_salary (float): Оклад, если он не указан
+        hire_date (str): Дата приема, если она не указана (по умолчанию - сегодня)
+        on_chunk (callable): Вызывается с ChunkReport после каждой части
+        encoding (str): Кодировка файла
+
+    Returns:
+        ImportReport: Итоги импорта
+    """
+    if chunk_size < 1:
+        raise ValueError("Размер части должен быть не меньше 1")
+    rejects_path = rejects_path or os.fspath(path) + REJECTS_SUFFIX
+    hire_date = hire_date or date.today().isoformat()
+    rows = read_rows(path, format, encoding)
+    rejects = _RejectWriter(rejects_path)
+    chunks = []
+    imported = rejected = 0
+    started = time.perf_counter()
+
+    try:
+        while True:
+            chunk_started = time.perf_counter()
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+
+            valid, invalid = validate_batch(batch, default_salary, hire_date)
+            valid, duplicates = _drop_duplicate_ids(repository, valid)
+            stored, failed = _store(repository, valid)
+            invalid.extend(duplicates)
+            invalid.extend(failed)
+            rejects.write(invalid)
+
+            report = ChunkReport(len(chunks) + 1, len(batch), stored, len(invalid),
+                                 time.perf_counter() - chunk_started)
+            chunks.append(report)
+            imported += stored
+            rejected += len(invalid)
+            if on_chunk is not None:
+                on_chunk(report)
+    finally:
+        rejects.close()
+
+    return ImportReport(imported, rejected, chunks, time.perf_counter() - started,
+                        rejects_path if rejected else None)
+
+
+def _employee(row, default_salary, hire_date):
+    """Проверенный словарь сотрудника из строки импорта"""
+    if not isinstance(row, dict):
+        raise TypeError("Строка должна быть объектом с полями сотрудника")
+    unknown = row.keys() - _FIELDS
+    if unknown:
+        raise ValueError(f"Неизвестные поля сотрудника: {', '.join(sorted(map(str, unknown)))}")
+
+    return {
+        'id': _optional(row.get('id'), _employee_id, None),
+        'name': _text(row.get('name'), "Имя сотрудника не может быть пустым"),
+        'position': _text(row.get('position'), "Должность не может быть пустой"),
+        'salary': _optional(row.get('salary'), _salary, default_salary),
+        'hire_date': _optional(row.get('hire_date'), _hire_date, hire_date),
+    }
+
+
+def _optional(value, convert, default):
+    """Пустое значение заменяется значением по умолчанию"""
+    if value is None or value == '':
+        return default
+    return convert(value)
+
+
+def _text(value, message):
+    if not isinstance(value, str):
+        raise TypeError(f"{message}: ожидается строка")
+    value = value.strip()
+    if not value:
+        raise ValueError(message)
+    return value
+
+
+def _employee_id(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise TypeError(f"ID сотрудника должен быть целым числом: {value!r}")
+    value = int(value)
+    if value < 1:
+        raise ValueError(f"ID сотрудника должен быть положительным: {value}")
+    return value
+
+
+def _salary(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(f"Оклад должен быть числом: {value!r}")
+    value = float(value)
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"Недопустимый оклад: {value}")
+    return value
+
+
+@lru_cache(maxsize=4096)  # даты приема в файле обычно повторяются
+def _hire_date(value):
+    if not isinstance(value, str):
+        raise TypeError(f"Дата приема должна быть строкой ГГГГ-ММ-ДД: {value!r}")
+    return date.fromisoformat(value.strip()).isoformat()
+
+
+def _drop_duplicate_ids(repository, valid):
+    """Отклонить строки с ID, который уже есть в хранилище или раньше в этой части"""
+    explicit = [employee['id'] for _, employee in valid if employee['id'] is not None]
+    if not explicit:
+        return valid, []
+
+    taken = set(repository.existing_ids(explicit))
+    accepted, duplicates = [], []
+    for line, employee in valid:
+        employee_id = employee['id']
+        if employee_id is None:
+            accepted.append((line, employee))
+        elif employee_id in taken:
+            duplicates.append((line, employee, f"Сотрудник с ID {employee_id} уже существует"))
+        else:
+            taken.add(employee_id)
+            accepted.append((line, employee))
+    return accepted, duplicates
+
+
+def _store(repository, valid):
+    """
+    Записать часть одной транзакцией.
+
+    Если транзакция отклонена (например, ID занят параллельной записью),
+    строки записываются по одной, чтобы отклонить только ошибочные.
+    """
+    if not valid:
+        return 0, []
+    try:
+        return len(repository.add_many(employee for _, employee in valid)), []
+    except ValueError:
+        pass
+
+    stored, failed = 0, []
+    for line, employee in valid:
+        try:
+            repository.add(employee)
+            stored += 1
+        except ValueError as e:
+            failed.append((line, employee, str(e)))
+    return stored, failed
+
+
+class _RejectWriter:
+    """Файл отклоненных строк в формате JSONL; создается при первой ошибке"""
+
+    def __init__(self, path):
+        self.path = path
+        self._stream = None
+
+    def write(self, rejected):
+        if not rejected:
+            return
+        if self._stream is None:
+            self._stream = open(self.path, 'w', encoding='utf-8')
+        self._stream.writelines(
+            json.dumps({'line': line, 'error': error, 'row': row}, ensure_ascii=False, default=str) + '\n'
+            for line, row, error in rejected
+        )
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
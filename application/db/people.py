@@ -1,159 +1,258 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Модуль для работы с данными сотрудников с применением декораторов
-"""
-
-import time
-from datetime import datetime
-from decorators import logger, performance_monitor, validate_args
-
-
-@logger('accounting.log')
-@performance_monitor
-def get_employees():
-    """
-    Функция для получения списка сотрудников
-    """
-    print("👥 Загружаем список сотрудников из базы данных...")
-    print("   - Подключение к базе данных")
-    print("   - Выборка активных сотрудников")
-    print("   - Проверка актуальности данных")
-
-    # Имитируем задержку загрузки данных
-    time.sleep(0.05)
-
-    # Имитируем возвращение списка сотрудников
-    employees = [
-        {"id": 1, "name": "Иванов И.И.", "position": "Менеджер", "salary": 120000.0},
-        {"id": 2, "name": "Петров П.П.", "position": "Программист", "salary": 180000.0},
-        {"id": 3, "name": "Сидоров С.С.", "position": "Аналитик", "salary": 150000.0}
-    ]
-
-    print(f"✅ Загружено {len(employees)} сотрудников")
-    print(f"   Время загрузки: {datetime.now().strftime('%H:%M:%S')}")
-
-    return employees
-
-
-@logger('accounting.log')
-@validate_args(int)
-def get_employee_by_id(employee_id):
-    """
-    Получить сотрудника по ID
-
-    Args:
-        employee_id (int): ID сотрудника
-    """
-    employees = get_employees()
-
-    for employee in employees:
-        if employee['id'] == employee_id:
-            print(f"🔍 Найден сотрудник: {employee['name']}")
-            return employee
-
-    print(f"❌ Сотрудник с ID {employee_id} не найден")
-    return None
-
-
-@logger('accounting.log')
-@validate_args(str, str)
-def add_employee(name, position):
-    """
-    Добавить нового сотрудника
-
-    Args:
-        name (str): Имя сотрудника
-        position (str): Должность
-    """
-    if not name.strip():
-        raise ValueError("Имя сотрудника не может быть пустым")
-
-    if not position.strip():
-        raise ValueError("Должность не может быть пустой")
-
-    # Имитируем добавление в базу данных
-    new_employee = {
-        'id': 4,  # В реальности генерировался бы автоматически
-        'name': name.strip(),
-        'position': position.strip(),
-        'salary': 100000.0,  # Базовая зарплата
-        'hire_date': datetime.now().strftime('%Y-%m-%d')
-    }
-
-    print(f"➕ Добавлен новый сотрудник: {name} - {position}")
-    return new_employee
-
-
-@logger('accounting.log')
-def update_employee_data():
-    """
-    Дополнительная функция для обновления данных сотрудников
-    """
-    update_info = {
-        'updated_at': datetime.now().isoformat(),
-        'records_updated': 3,
-        'status': 'success'
-    }
-
-    print("🔄 Данные сотрудников обновлены")
-    return update_info
-
-
-@logger('accounting.log')
-def get_employees_by_position(position):
-    """
-    Получить сотрудников по должности
-
-    Args:
-        position (str): Должность для поиска
-    """
-    if not isinstance(position, str):
-        raise TypeError("Должность должна быть строкой")
-
-    employees = get_employees()
-    filtered_employees = [
-        emp for emp in employees
-        if emp['position'].lower() == position.lower()
-    ]
-
-    print(f"🎯 Найдено {len(filtered_employees)} сотрудников с должностью '{position}'")
-    return filtered_employees
-
-
-@logger('accounting.log')
-def calculate_department_stats():
-    """
-    Рассчитать статистику по отделам
-    """
-    employees = get_employees()
-
-    # Группируем по должностям
-    positions = {}
-    total_salary = 0
-
-    for emp in employees:
-        pos = emp['position']
-        salary = emp.get('salary', 0)
-
-        if pos not in positions:
-            positions[pos] = {'count': 0, 'total_salary': 0}
-
-        positions[pos]['count'] += 1
-        positions[pos]['total_salary'] += salary
-        total_salary += salary
-
-    # Вычисляем средние зарплаты
-    for pos_data in positions.values():
-        pos_data['average_salary'] = pos_data['total_salary'] / pos_data['count']
-
-    stats = {
-        'total_employees': len(employees),
-        'total_salary_budget': total_salary,
-        'average_salary': total_salary / len(employees) if employees else 0,
-        'positions': positions,
-        'generated_at': datetime.now().isoformat()
-    }
-
-    print("📈 Статистика по отделам рассчитана")
-    return stats
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль для работы с данными сотрудников с применением декораторов
+"""
+
+from datetime import datetime
+import application.incremental
+import application.stats
+from decorators import (
+    logger, performance_monitor, validate_args, cached, single_flight, persistent_cache,
+    code_version, ResultCache,
+)
+from application.console import console
+from application.db.connection import ConnectionPool
+from application.db.importer import DEFAULT_CHUNK_SIZE, DEFAULT_SALARY, import_file
+from application.db.repository import position_key
+from application.db.sqlite_repository import SqliteEmployeeRepository
+from application.incremental import LiveDepartmentStats
+
+# Время жизни закэшированных данных о сотрудниках (в секундах)
+CACHE_TTL = 60.0
+
+# Пустой кэш для функций, кэш которых выключен настройкой инструментирования
+_NO_CACHE = ResultCache(maxsize=1)
+
+# Начальные данные "базы"
+SEED_EMPLOYEES = (
+    {"id": 1, "name": "Иванов И.И.", "position": "Менеджер", "salary": 120000.0},
+    {"id": 2, "name": "Петров П.П.", "position": "Программист", "salary": 180000.0},
+    {"id": 3, "name": "Сидоров С.С.", "position": "Аналитик", "salary": 150000.0},
+)
+
+# База из переменной окружения ACCOUNTING_DB (по умолчанию - в памяти)
+_repository = SqliteEmployeeRepository(ConnectionPool(), SEED_EMPLOYEES)
+
+
+# Статистика по отделам, обновляемая по журналу изменений хранилища
+_live_department_stats = LiveDepartmentStats(_repository)
+
+
+def get_repository():
+    """Хранилище сотрудников (SQLite) с индексами по ID и должности"""
+    return _repository
+
+
+def get_live_department_stats():
+    """Инкрементальная статистика по отделам для штата приложения"""
+    return _live_department_stats
+
+
+@logger('accounting.log')
+@cached(maxsize=1, ttl=CACHE_TTL)
+@single_flight()
+@performance_monitor
+def get_employees():
+    """
+    Функция для получения списка сотрудников
+    """
+    console.info("👥 Загружаем список сотрудников из базы данных...")
+
+    employees = _repository.all()
+
+    console.info("✅ Загружено {} сотрудников", len(employees))
+    console.info("   Время загрузки: {:%H:%M:%S}", datetime.now())
+
+    return employees
+
+
+@logger('accounting.log')
+@cached(maxsize=1024, ttl=CACHE_TTL)
+@validate_args(int)
+def get_employee_by_id(employee_id):
+    """
+    Получить сотрудника по ID
+
+    Args:
+        employee_id (int): ID сотрудника
+    """
+    employee = _repository.get(employee_id)
+
+    if employee is not None:
+        console.info("🔍 Найден сотрудник: {}", employee['name'])
+        return employee
+
+    console.info("❌ Сотрудник с ID {} не найден", employee_id)
+    return None
+
+
+@logger('accounting.log')
+@validate_args(str, str)
+def add_employee(name, position):
+    """
+    Добавить нового сотрудника
+
+    Args:
+        name (str): Имя сотрудника
+        position (str): Должность
+    """
+    if not name.strip():
+        raise ValueError("Имя сотрудника не может быть пустым")
+
+    if not position.strip():
+        raise ValueError("Должность не может быть пустой")
+
+    # ID назначается хранилищем из последовательности
+    new_employee = _repository.add({
+        'name': name.strip(),
+        'position': position.strip(),
+        'salary': DEFAULT_SALARY,  # Базовая зарплата
+        'hire_date': datetime.now().strftime('%Y-%m-%d')
+    })
+
+    invalidate_employee_caches(new_employee['id'], new_employee['position'])
+
+    console.info("➕ Добавлен новый сотрудник: {} - {}", name, position)
+    return new_employee
+
+
+@logger('accounting.log')
+@performance_monitor
+def import_employees(path, chunk_size=DEFAULT_CHUNK_SIZE, rejects_path=None):
+    """
+    Массово добавить сотрудников из файла CSV или JSONL
+
+    Вместо отдельного вызова add_employee на каждого сотрудника файл
+    читается частями, каждая часть проверяется и записывается одной
+    транзакцией. Ошибочные строки не прерывают импорт и попадают в файл
+    отклоненных строк.
+
+    Args:
+        path (str): Путь к файлу (.csv, .jsonl)
+        chunk_size (int): Число строк в одной части
+        rejects_path (str): Файл отклоненных строк (по умолчанию - path + '.rejects.jsonl')
+
+    Returns:
+        ImportReport: Итоги импорта
+    """
+    def report_chunk(chunk):
+        console.info("   Часть {}: {} добавлено, {} отклонено, {:,.0f} строк/с",
+                     chunk.index, chunk.imported, chunk.rejected, chunk.rows_per_second)
+
+    try:
+        report = import_file(_repository, path, chunk_size=chunk_size,
+                             rejects_path=rejects_path, on_chunk=report_chunk)
+    finally:
+        invalidate_employee_caches()
+
+    console.summary("📥 Импортировано {} сотрудников за {:.2f} с", report.imported, report.seconds)
+    if report.rejected:
+        console.summary("⚠️ Отклонено строк: {} (см. {})", report.rejected, report.rejects_path)
+    return report
+
+
+@logger('accounting.log')
+def update_employee_data(employee_id=None, **fields):
+    """
+    Обновить данные сотрудника
+
+    Изменение записывается в журнал хранилища, по которому итоги
+    зарплаты и статистика по отделам обновляются без полного пересчета.
+
+    Args:
+        employee_id (int): ID сотрудника (None - только сбросить кэши)
+        **fields: Новые значения полей (name, position, salary, hire_date)
+    """
+    records_updated = 0
+    if employee_id is None:
+        invalidate_employee_caches()
+    else:
+        old, new = _repository.update(employee_id, **fields)
+        invalidate_employee_caches(employee_id, old['position'])
+        if new['position'] != old['position']:
+            invalidate_employee_caches(employee_id, new['position'])
+        records_updated = 1
+
+    update_info = {
+        'updated_at': datetime.now().isoformat(),
+        'records_updated': records_updated,
+        'status': 'success'
+    }
+
+    console.info("🔄 Данные сотрудников обновлены")
+    return update_info
+
+
+@logger('accounting.log')
+@cached(maxsize=256, ttl=CACHE_TTL)
+def get_employees_by_position(position):
+    """
+    Получить сотрудников по должности
+
+    Args:
+        position (str): Должность для поиска
+    """
+    if not isinstance(position, str):
+        raise TypeError("Должность должна быть строкой")
+
+    filtered_employees = _repository.by_position(position)
+
+    console.info("🎯 Найдено {} сотрудников с должностью '{}'", len(filtered_employees), position)
+    return filtered_employees
+
+
+@cached(maxsize=1, ttl=CACHE_TTL)
+@persistent_cache(depends_on=_repository.fingerprint,
+                  version=code_version(application.stats, application.incremental))
+def _department_stats():
+    """Статистика по отделам без generated_at (кэшируемая часть отчета)"""
+    stats = _live_department_stats.report()
+    del stats['generated_at']
+
+    console.info("📈 Статистика по отделам рассчитана")
+    return stats
+
+
+@logger('accounting.log')
+def calculate_department_stats():
+    """
+    Рассчитать статистику по отделам
+
+    Тонкая обертка над агрегатом application.stats: первый расчет -
+    один проход по штату, дальше агрегат обновляется по журналу
+    изменений. При неизменном штате результат берется из постоянного кэша;
+    время формирования generated_at в кэш не попадает и всегда текущее.
+    """
+    return {**_department_stats(), 'generated_at': datetime.now().isoformat()}
+
+
+def invalidate_employee_caches(employee_id=None, position=None):
+    """
+    Сбросить закэшированные данные после изменения сотрудников
+
+    Args:
+        employee_id (int): ID измененного сотрудника (None - сбросить все записи)
+        position (str): Должность измененного сотрудника (None - все должности)
+    """
+    _result_cache(get_employees).clear()
+    _result_cache(_department_stats).clear()
+
+    if employee_id is None:
+        _result_cache(get_employee_by_id).clear()
+    else:
+        _result_cache(get_employee_by_id).invalidate(employee_id)
+
+    if position is None:
+        _result_cache(get_employees_by_position).clear()
+    else:
+        # Ключ как у индекса хранилища: запросы ' менеджер ' и 'МЕНЕДЖЕР' - одна должность
+        key = position_key(position)
+        _result_cache(get_employees_by_position).invalidate_where(
+            lambda args, kwargs: position_key(str(args[0] if args else kwargs.get('position'))) == key
+        )
+
+
+def _result_cache(func):
+    """Кэш функции (пустой, если cached выключен при декорировании)"""
+    return getattr(func, 'result_cache', _NO_CACHE)
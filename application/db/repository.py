@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище сотрудников в памяти с индексами по ID и должности
+"""
+
+import contextlib
+import threading
+from operator import attrgetter
+
+from decorators import content_hash
+from application.db.changes import ChangeLog
+from application.db.columnar import EMPLOYEE_FIELDS, EmployeeColumns, EmployeeRecord
+
+
+def position_key(position):
+    """Ключ индекса должности: без учета регистра и крайних пробелов"""
+    return position.strip().casefold()
+
+
+class EmployeeRepository:
+    """
+    Хранилище сотрудников с первичным индексом по ID
+    и вторичным индексом по должности.
+
+    Поиск по ID выполняется за O(1), поиск по должности - за O(k),
+    где k - число сотрудников с этой должностью. Индексы обновляются
+    инкрементально при добавлении и изменении записей.
+
+    Сотрудники хранятся как компактные неизменяемые EmployeeRecord,
+    которые читаются как словари; для изменений используется update().
+    Каждое добавление и изменение записывается в журнал changes.
+
+    Args:
+        employees (iterable): Начальный список сотрудников
+    """
+
+    def __init__(self, employees=()):
+        self._by_id = {}
+        self._by_position = {}
+        self._next_id = 1
+        self._fingerprint = None
+        self._lock = threading.RLock()
+        self.changes = ChangeLog()
+        self.add_many(employees)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, employee_id):
+        return employee_id in self._by_id
+
+    def get(self, employee_id):
+        """Найти сотрудника по ID (None, если не найден)"""
+        return self._by_id.get(employee_id)
+
+    def by_position(self, position):
+        """Список сотрудников с указанной должностью (без учета регистра)"""
+        return list(self._by_position.get(position_key(position), {}).values())
+
+    def all(self):
+        """Список всех сотрудников в порядке добавления"""
+        return list(self._by_id.values())
+
+    def positions(self):
+        """Множество ключей должностей, по которым есть сотрудники"""
+        return set(self._by_position)
+
+    def next_id(self):
+        """Зарезервировать и вернуть следующий свободный ID"""
+        with self._lock:
+            employee_id = self._next_id
+            self._next_id += 1
+            return employee_id
+
+    def add(self, employee):
+        """
+        Добавить сотрудника и обновить индексы.
+
+        Args:
+            employee (dict): Данные сотрудника; если нет 'id', он назначается
+                из последовательности
+
+        Returns:
+            EmployeeRecord: Сохраненная запись
+        """
+        with self._lock:
+            if employee.get('id') is None:
+                employee = {**employee, 'id': self.next_id()}
+            employee = EmployeeRecord.from_mapping(employee)
+            employee_id = employee['id']
+            if employee_id in self._by_id:
+                raise ValueError(f"Сотрудник с ID {employee_id} уже существует")
+
+            self._by_id[employee_id] = employee
+            self._index_position(employee)
+            self._next_id = max(self._next_id, employee_id + 1)
+            self._fingerprint = None
+            self.changes.record(None, employee)
+            return employee
+
+    def add_many(self, employees):
+        """
+        Добавить несколько сотрудников; возвращает список сохраненных записей.
+
+        Занятые ID проверяются заранее: при ошибке не добавляется никто.
+        """
+        with self._lock:
+            employees = list(employees)
+            seen = set()
+            for employee in employees:
+                employee_id = employee.get('id')
+                if employee_id is None:
+                    continue
+                if employee_id in self._by_id or employee_id in seen:
+                    raise ValueError(f"Сотрудник с ID {employee_id} уже существует")
+                seen.add(employee_id)
+            return [self.add(employee) for employee in employees]
+
+    def existing_ids(self, employee_ids):
+        """Множество ID из employee_ids, которые уже заняты"""
+        with self._lock:
+            return {employee_id for employee_id in employee_ids if employee_id in self._by_id}
+
+    def update(self, employee_id, **fields):
+        """
+        Изменить данные сотрудника с переиндексацией должности.
+
+        Returns:
+            tuple: (старая запись, новая запись)
+        """
+        if 'id' in fields and fields['id'] != employee_id:
+            raise ValueError("ID сотрудника изменять нельзя")
+
+        with self._lock:
+            old = self._by_id.get(employee_id)
+            if old is None:
+                raise KeyError(f"Сотрудник с ID {employee_id} не найден")
+
+            new = old.replace(**fields)
+            self._unindex_position(old)
+            self._by_id[employee_id] = new
+            self._index_position(new)
+            self._fingerprint = None
+            self.changes.record(old, new)
+            return old, new
+
+    def exclusive(self):
+        """Блок with, внутри которого хранилище не изменяется"""
+        return self._lock
+
+    def revision(self):
+        """Версия данных: номер последнего изменения в журнале"""
+        return self.changes.position
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """
+        Блок with с согласованными версией данных и итератором по всем
+        сотрудникам; до выхода из блока хранилище не изменяется.
+        """
+        with self._lock:
+            yield self.changes.position, iter(self._by_id.values())
+
+    def fingerprint(self):
+        """
+        Отпечаток содержимого штата (хеш всех записей).
+
+        Пересчитывается только после изменений и служит снимком входных
+        данных для persistent_cache расчетов по всему штату.
+        """
+        with self._lock:
+            if self._fingerprint is None:
+                # Поля по столбцам сериализуются втрое быстрее, чем записи целиком
+                records = self._by_id.values()
+                self._fingerprint = content_hash(*(list(map(attrgetter(field), records))
+                                                   for field in EMPLOYEE_FIELDS))
+            return self._fingerprint
+
+    def columns(self):
+        """Колоночный снимок штата (EmployeeColumns) для массовых расчетов"""
+        with self._lock:
+            return EmployeeColumns.from_records(self._by_id.values())
+
+    def _index_position(self, employee):
+        key = position_key(employee['position'])
+        self._by_position.setdefault(key, {})[employee['id']] = employee
+
+    def _unindex_position(self, employee):
+        key = position_key(employee['position'])
+        bucket = self._by_position.get(key)
+        if bucket is not None:
+            bucket.pop(employee['id'], None)
+            if not bucket:
+                del self._by_position[key]
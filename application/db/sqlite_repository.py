@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Хранилище сотрудников в SQLite с индексами по ID и должности
+"""
+
+import contextlib
+import json
+import sqlite3
+
+from decorators import content_hash_stream
+from application.db.changes import ChangeLog
+from application.db.columnar import EMPLOYEE_FIELDS, EmployeeColumns, EmployeeRecord
+from application.db.connection import ConnectionPool
+from application.db.repository import position_key
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS employees (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        position TEXT NOT NULL,
+        position_key TEXT NOT NULL,
+        salary REAL NOT NULL DEFAULT 0.0,
+        hire_date TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS employees_by_position ON employees (position_key, id)",
+    # Последовательность ID сотрудников и номер версии данных
+    """CREATE TABLE IF NOT EXISTS counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )""",
+    "INSERT OR IGNORE INTO counters (name, value) VALUES ('employee_id', 0), ('revision', 0)",
+)
+
+_SELECT = f"SELECT {', '.join(EMPLOYEE_FIELDS)} FROM employees"
+_INSERT = ("INSERT INTO employees (id, name, position, position_key, salary, hire_date) "
+           "VALUES (?, ?, ?, ?, ?, ?)")
+_UPDATE = ("UPDATE employees SET name = ?, position = ?, position_key = ?, salary = ?, "
+           "hire_date = ? WHERE id = ?")
+_RESERVE_IDS = "UPDATE counters SET value = value + ? WHERE name = 'employee_id' RETURNING value"
+_BUMP_REVISION = "UPDATE counters SET value = value + 1 WHERE name = 'revision'"
+_REVISION = "SELECT value FROM counters WHERE name = 'revision'"
+
+# Число строк, которые fingerprint() читает и хеширует за раз
+_FINGERPRINT_BATCH = 10_000
+
+
+def _record(cursor, row):
+    """Фабрика строк: EmployeeRecord вместо кортежа"""
+    return EmployeeRecord(*row)
+
+
+class SqliteEmployeeRepository:
+    """
+    Хранилище сотрудников в базе SQLite с тем же интерфейсом,
+    что у EmployeeRepository.
+
+    Поиск по ID идет по первичному ключу, поиск по должности - по индексу
+    (position_key, id); ключ должности вычисляется в Python, так как
+    lower() SQLite не понимает кириллицу. Запросы параметризованы,
+    подготовленные выражения кэшируются соединениями пула. Добавление
+    нескольких сотрудников - один executemany в одной транзакции, ID
+    выдаются из последовательности в базе. Изменения, сделанные через
+    это хранилище, записываются в журнал changes после фиксации транзакции
+    вместе с версией данных (revision); изменения из других процессов
+    в журнал не попадают, но видны по росту revision().
+
+    Args:
+        pool (ConnectionPool): Пул соединений (по умолчанию - новый, база
+            из переменной ACCOUNTING_DB или в памяти)
+        employees (iterable): Начальные сотрудники; добавляются, только если
+            таблица пуста (файл базы мог сохраниться с прошлого запуска)
+    """
+
+    def __init__(self, pool=None, employees=()):
+        self.pool = pool if pool is not None else ConnectionPool()
+        self._fingerprint = (None, None)  # (версия данных, отпечаток)
+        self.changes = ChangeLog()
+        with self.pool.transaction() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            if connection.execute('SELECT 1 FROM employees LIMIT 1').fetchone() is None:
+                self._insert(connection, employees)
+
+    def __len__(self):
+        return self.pool.execute('SELECT COUNT(*) FROM employees')[0][0]
+
+    def __contains__(self, employee_id):
+        return bool(self.pool.execute('SELECT 1 FROM employees WHERE id = ?', (employee_id,)))
+
+    def get(self, employee_id):
+        """Найти сотрудника по ID (None, если не найден)"""
+        rows = self._select(f'{_SELECT} WHERE id = ?', (employee_id,))
+        return rows[0] if rows else None
+
+    def by_position(self, position):
+        """Список сотрудников с указанной должностью (без учета регистра)"""
+        return self._select(f'{_SELECT} WHERE position_key = ? ORDER BY id', (position_key(position),))
+
+    def all(self):
+        """Список всех сотрудников в порядке ID"""
+        return self._select(f'{_SELECT} ORDER BY id')
+
+    def positions(self):
+        """Множество ключей должностей, по которым есть сотрудники"""
+        return {row[0] for row in self.pool.execute('SELECT DISTINCT position_key FROM employees')}
+
+    def next_id(self, count=1):
+        """Зарезервировать и вернуть следующий свободный ID (первый из count)"""
+        with self.pool.transaction() as connection:
+            return self._reserve(connection, count)
+
+    def add(self, employee):
+        """
+        Добавить сотрудника.
+
+        Args:
+            employee (dict): Данные сотрудника; если нет 'id', он назначается
+                из последовательности
+
+        Returns:
+            EmployeeRecord: Сохраненная запись
+        """
+        return self.add_many([employee])[0]
+
+    def add_many(self, employees):
+        """
+        Добавить сотрудников одной транзакцией (executemany).
+
+        При ошибке не добавляется никто. Возвращает список сохраненных записей.
+        """
+        with self.pool.write_lock:
+            with self.pool.transaction() as connection:
+                records = self._insert(connection, employees)
+                revision = connection.execute(_REVISION).fetchone()[0]
+            self.changes.record_many(((None, record) for record in records), revision)
+            return records
+
+    def existing_ids(self, employee_ids):
+        """Множество ID из employee_ids, которые уже заняты (один запрос)"""
+        rows = self.pool.execute(
+            'SELECT id FROM employees WHERE id IN (SELECT value FROM json_each(?))',
+            (json.dumps(list(employee_ids)),)
+        )
+        return {row[0] for row in rows}
+
+    def update(self, employee_id, **fields):
+        """
+        Изменить данные сотрудника.
+
+        Returns:
+            tuple: (старая запись, новая запись)
+        """
+        if 'id' in fields and fields['id'] != employee_id:
+            raise ValueError("ID сотрудника изменять нельзя")
+
+        with self.pool.write_lock:
+            with self.pool.transaction() as connection:
+                cursor = connection.execute(f'{_SELECT} WHERE id = ?', (employee_id,))
+                cursor.row_factory = _record
+                old = cursor.fetchone()
+                if old is None:
+                    raise KeyError(f"Сотрудник с ID {employee_id} не найден")
+
+                new = old.replace(**fields)
+                connection.execute(_UPDATE, (new['name'], new['position'], position_key(new['position']),
+                                             new['salary'], new.get('hire_date'), employee_id))
+                connection.execute(_BUMP_REVISION)
+                revision = connection.execute(_REVISION).fetchone()[0]
+            self.changes.record(old, new, revision)
+            return old, new
+
+    def exclusive(self):
+        """Блок with, внутри которого хранилище не изменяется через этот пул"""
+        return self.pool.write_lock
+
+    def revision(self):
+        """Версия данных в базе (растет при каждой записи, в том числе из других процессов)"""
+        return self.pool.execute(_REVISION)[0][0]
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """
+        Блок with с согласованными версией данных и курсором по всем
+        сотрудникам (одна транзакция чтения).
+
+        Строки читаются из базы по мере обхода курсора, поэтому память
+        не зависит от размера штата.
+        """
+        with self.pool.connection() as connection:
+            connection.execute('BEGIN')
+            revision = connection.execute(_REVISION).fetchone()[0]
+            cursor = connection.execute(f'{_SELECT} ORDER BY id')
+            cursor.row_factory = _record
+            yield revision, cursor
+
+    def fingerprint(self):
+        """
+        Отпечаток содержимого штата (хеш всех записей).
+
+        Пересчитывается только после изменения версии данных в базе,
+        в том числе изменений из других процессов. Строки хешируются
+        частями по мере чтения, без загрузки всего штата в память.
+        """
+        with self.pool.connection() as connection:
+            connection.execute('BEGIN')
+            revision = connection.execute(_REVISION).fetchone()[0]
+            cached_revision, fingerprint = self._fingerprint
+            if cached_revision != revision:
+                cursor = connection.execute(f'{_SELECT} ORDER BY id')
+                fingerprint = content_hash_stream(iter(lambda: cursor.fetchmany(_FINGERPRINT_BATCH), []))
+                self._fingerprint = (revision, fingerprint)
+        return fingerprint
+
+    def columns(self):
+        """Колоночный снимок штата (EmployeeColumns) для массовых расчетов"""
+        return EmployeeColumns.from_records(self.all())
+
+    def _select(self, sql, parameters=()):
+        with self.pool.connection() as connection:
+            cursor = connection.execute(sql, parameters)
+            cursor.row_factory = _record
+            return cursor.fetchall()
+
+    def _reserve(self, connection, count):
+        last = connection.execute(_RESERVE_IDS, (count,)).fetchone()[0]
+        return last - count + 1
+
+    def _insert(self, connection, employees):
+        employees = list(employees)
+        missing = sum(1 for employee in employees if employee.get('id') is None)
+        next_id = self._reserve(connection, missing) if missing else None
+
+        records = []
+        for employee in employees:
+            if employee.get('id') is None:
+                employee = {**employee, 'id': next_id}
+                next_id += 1
+            records.append(EmployeeRecord.from_mapping(employee))
+
+        if not records:
+            return records
+        try:
+            connection.executemany(_INSERT, (
+                (record.id, record.name, record.position, position_key(record.position),
+                 record.salary, record.hire_date)
+                for record in records
+            ))
+        except sqlite3.IntegrityError as e:
+            if len(records) == 1:
+                raise ValueError(f"Сотрудник с ID {records[0]['id']} уже существует") from e
+            raise ValueError(f"Среди добавляемых есть сотрудник с существующим ID: {e}") from e
+
+        # Явно заданные ID не должны выдаваться последовательностью повторно
+        connection.execute(
+            "UPDATE counters SET value = (SELECT MAX(id) FROM employees) "
+            "WHERE name = 'employee_id' AND value < (SELECT MAX(id) FROM employees)"
+        )
+        connection.execute(_BUMP_REVISION)
+        return records
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Итоги по штату, обновляемые по журналу изменений без полного пересчета
+"""
+
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from application.stats import DepartmentAggregate
+
+# Переменная окружения режима проверки: сравнивать итоги с полным
+# пересчетом каждые N обновлений (0 или не задана - не сравнивать)
+VERIFY_ENV = 'ACCOUNTING_VERIFY_INCREMENTAL'
+
+
+def _verify_every_from_env():
+    value = os.environ.get(VERIFY_ENV, '').strip()
+    return int(value) if value else 0
+
+
+class LiveAggregate(ABC):
+    """
+    Агрегат по всему штату, который обновляется по журналу изменений
+    хранилища (repository.changes) вместо полного пересчета.
+
+    refresh() забирает изменения, сделанные после прошлого обновления:
+    для каждого исключает вклад старой записи и учитывает вклад новой,
+    поэтому стоимость обновления зависит от числа изменений, а не от
+    размера штата. Агрегат строится заново, если нужные изменения уже
+    вытеснены из журнала (например, после массового импорта) или версия
+    данных хранилища (revision) ушла дальше журнала: штат изменил другой
+    процесс, работающий с той же базой.
+
+    В режиме проверки (verify_every=N) каждое N-е обновление сравнивает
+    итоги с полным пересчетом и при расхождении выбрасывает RuntimeError.
+
+    Подклассы задают empty(), include(), exclude() и to_report().
+
+    Args:
+        repository: Хранилище сотрудников с журналом changes
+        verify_every (int): Период проверки (по умолчанию - из переменной
+            ACCOUNTING_VERIFY_INCREMENTAL, 0 - без проверки)
+    """
+
+    # Допустимое расхождение чисел с полным пересчетом
+    rel_tol = 1e-9
+    abs_tol = 1e-9
+
+    def __init__(self, repository, verify_every=None):
+        self.repository = repository
+        self.verify_every = _verify_every_from_env() if verify_every is None else verify_every
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+        self._aggregate = None
+        self._position = 0
+        self._revision = None
+        self._refreshes = 0
+
+    @abstractmethod
+    def empty(self):
+        """Пустой агрегат"""
+
+    @abstractmethod
+    def include(self, aggregate, employee):
+        """Учесть сотрудника в агрегате"""
+
+    @abstractmethod
+    def exclude(self, aggregate, employee):
+        """Исключить ранее учтенного сотрудника из агрегата"""
+
+    def settle(self, aggregate):
+        """Довести агрегат до согласованного состояния после пачки изменений"""
+
+    @abstractmethod
+    def to_report(self, aggregate):
+        """Отчет по агрегату"""
+
+    def refresh(self):
+        """
+        Учесть изменения хранилища после прошлого обновления.
+
+        Returns:
+            int: Число учтенных изменений (-1, если агрегат построен заново)
+        """
+        with self.repository.exclusive(), self._lock:
+            applied = self._refresh()
+            self._refreshes += 1
+            if self.verify_every and self._refreshes % self.verify_every == 0:
+                differences = self._differences()
+                if differences:
+                    raise RuntimeError("Инкрементальные итоги расходятся с полным пересчетом: "
+                                       + "; ".join(differences))
+            return applied
+
+    def report(self):
+        """Актуальный отчет (с учетом последних изменений)"""
+        with self.repository.exclusive(), self._lock:
+            self._refresh()
+            return self.to_report(self._aggregate)
+
+    def verify(self):
+        """
+        Сравнить итоги с полным пересчетом.
+
+        Returns:
+            list: Описания расхождений (пустой список - итоги совпадают)
+        """
+        with self.repository.exclusive(), self._lock:
+            self._refresh()
+            return self._differences()
+
+    def rebuild(self):
+        """Построить агрегат заново по всему штату"""
+        with self.repository.exclusive(), self._lock:
+            self._rebuild()
+
+    def _refresh(self):
+        changes = None
+        if self._aggregate is not None:
+            changes = self.repository.changes.since(self._position)
+        if changes is None or not self._continuous(changes):
+            self._rebuild()
+            return -1
+
+        aggregate = self._aggregate
+        for change in changes:
+            if change.old is not None:
+                self.exclude(aggregate, change.old)
+            if change.new is not None:
+                self.include(aggregate, change.new)
+        if changes:
+            self.settle(aggregate)
+            self._position = changes[-1].sequence
+            self._revision = changes[-1].revision
+        return len(changes)
+
+    def _continuous(self, changes):
+        """Журнал покрывает все версии данных после учтенной (нет чужих записей)"""
+        revisions = sorted({change.revision for change in changes})
+        expected = list(range(self._revision + 1, self._revision + 1 + len(revisions)))
+        if revisions != expected:
+            return False
+        return self.repository.revision() == (revisions[-1] if revisions else self._revision)
+
+    def _rebuild(self):
+        self._position = self.repository.changes.position
+        with self.repository.snapshot() as (revision, employees):
+            self._aggregate = self._full(employees)
+        self._revision = revision
+        self.rebuilds += 1
+
+    def _full(self, employees):
+        # Один проход по потоку сотрудников: штат не загружается в память
+        aggregate = self.empty()
+        for employee in employees:
+            self.include(aggregate, employee)
+        return aggregate
+
+    def _differences(self):
+        with self.repository.snapshot() as (_, employees):
+            full = self._full(employees)
+        return _compare(self.to_report(self._aggregate), self.to_report(full),
+                        self.rel_tol, self.abs_tol)
+
+
+def _compare(live, full, rel_tol, abs_tol, path=''):
+    """Расхождения двух отчетов (generated_at не сравнивается)"""
+    if isinstance(live, dict) and isinstance(full, dict):
+        differences = []
+        for key in live.keys() | full.keys():
+            if key == 'generated_at':
+                continue
+            if key not in live or key not in full:
+                differences.append(f"{path}{key}: есть только в одном из отчетов")
+            else:
+                differences.extend(_compare(live[key], full[key], rel_tol, abs_tol, f"{path}{key}."))
+        return differences
+
+    if isinstance(live, float) and isinstance(full, float):
+        same = math.isclose(live, full, rel_tol=rel_tol, abs_tol=abs_tol)
+    else:
+        same = live == full
+    return [] if same else [f"{path.rstrip('.')}: {live!r} вместо {full!r}"]
+
+
+class LiveDepartmentStats(LiveAggregate):
+    """
+    Статистика по отделам (формат calculate_department_stats),
+    обновляемая по журналу изменений.
+
+    Количество, суммы и средние обновляются точно; стандартное отклонение -
+    обратным шагом Уэлфорда с ошибкой округления, поэтому при проверке
+    оно сверяется с точностью до копейки. Min/max должности после
+    удаления крайнего оклада пересчитываются по индексу должности.
+    """
+
+    abs_tol = 0.01
+
+    def empty(self):
+        return DepartmentAggregate()
+
+    def include(self, aggregate, employee):
+        aggregate.add(employee)
+
+    def exclude(self, aggregate, employee):
+        aggregate.remove(employee)
+
+    def settle(self, aggregate):
+        for position in list(aggregate.stale_positions):
+            aggregate.reset_extremes(position, (
+                employee.get('salary', 0) for employee in self.repository.by_position(position)
+                if employee['position'] == position
+            ))
+
+    def to_report(self, aggregate):
+        return aggregate.to_report()
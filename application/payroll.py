@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Многопроцессный расчет зарплаты по всему штату
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+
+from decorators import logger, performance_monitor, flush_logs, configure_sink, get_sink
+from application.salary import compute_payslip, PayrollTotals
+
+# Размер части штата, которую обрабатывает один процесс за раз
+DEFAULT_CHUNK_SIZE = 5000
+
+# Лог, в который рабочие процессы пишут вместе с родителем
+WORKER_LOG_PATH = 'accounting.log'
+
+_pools = 0  # число работающих пулов процессов
+_pools_lock = threading.Lock()
+_previous_process_safe = False
+
+
+@contextmanager
+def _process_safe_log():
+    """
+    Блок with, пока идет который лог рабочих процессов пишется пачками
+    под блокировкой между процессами, чтобы записи не перемешивались.
+
+    Режим включается только на время работы пула процессов; после
+    завершения последнего пула восстанавливается прежняя настройка.
+    """
+    global _pools, _previous_process_safe
+    with _pools_lock:
+        if _pools == 0:
+            _previous_process_safe = get_sink(WORKER_LOG_PATH).process_safe
+            configure_sink(WORKER_LOG_PATH, process_safe=True)
+        _pools += 1
+    try:
+        yield
+    finally:
+        with _pools_lock:
+            _pools -= 1
+            if _pools == 0:
+                configure_sink(WORKER_LOG_PATH, process_safe=_previous_process_safe)
+
+
+def _init_worker():
+    """Инициализация рабочего процесса (при spawn настройки родителя не наследуются)"""
+    configure_sink(WORKER_LOG_PATH, process_safe=True)
+
+
+def _describe_employees(employees):
+    """Краткое описание штата для лога вместо полного списка"""
+    try:
+        return f'<{len(employees)} сотрудников>'
+    except TypeError:
+        return '<поток сотрудников>'
+
+
+def _summarize_chunk(args, kwargs, result):
+    """Записывать в лог размер части и число листков, а не сами данные"""
+    rows = args[0] if args else kwargs.get('rows', ())
+    # При ошибке результата нет (None), а описание части нужнее всего
+    summary = '<ошибка>' if result is None else f'<{len(result)} листков>'
+    return (_describe_employees(rows),), {}, summary
+
+
+def _summarize_payroll(args, kwargs, result):
+    """Заменить список сотрудников в записи лога на его размер"""
+    if args:
+        args = (_describe_employees(args[0]),) + tuple(args[1:])
+    elif 'employees' in kwargs:
+        kwargs = dict(kwargs, employees=_describe_employees(kwargs['employees']))
+    return args, kwargs, result
+
+
+@logger('accounting.log', redact=_summarize_chunk)
+@performance_monitor
+def process_payroll_chunk(rows):
+    """
+    Рассчитать часть штата (выполняется в рабочем процессе)
+
+    Args:
+        rows (list): Кортежи (id, имя, оклад, процент премии)
+
+    Returns:
+        list: Расчетные листки в том же порядке
+    """
+    return [compute_payslip(*row) for row in rows]
+
+
+def _run_chunk(rows):
+    """
+    Точка входа рабочего процесса: расчетные листки части.
+
+    Рабочие процессы пула завершаются без обработчиков atexit,
+    поэтому буфер логов сбрасывается после каждой части.
+    """
+    try:
+        return process_payroll_chunk(rows)
+    finally:
+        flush_logs()
+
+
+def _run_chunk_totals(rows):
+    """Точка входа рабочего процесса: только итоги части (без передачи листков)"""
+    totals = PayrollTotals()
+    for payslip in _run_chunk(rows):
+        totals.add(payslip)
+    return totals
+
+
+def _chunks(employees, bonus_percent, chunk_size):
+    """Разбить поток сотрудников на части из компактных кортежей"""
+    bonus_for = bonus_percent if callable(bonus_percent) else (lambda employee: bonus_percent)
+    rows = (
+        (emp['id'], emp['name'], float(emp['salary']), float(bonus_for(emp)))
+        for emp in employees
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_payroll(employees, bonus_percent=0.0, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Рассчитать зарплату для потока сотрудников в пуле процессов
+
+    Штат делится на части, которые считаются параллельно, а расчетные
+    листки возвращаются в исходном порядке по мере готовности. В работе
+    одновременно находится не больше 2 * workers частей, поэтому память
+    не зависит от размера штата.
+
+    Args:
+        employees (iterable): Сотрудники (словари или EmployeeRecord)
+        bonus_percent: Процент премии - число или функция employee -> процент
+        workers (int): Число процессов (по умолчанию - число ядер;
+            1 - расчет в текущем процессе)
+        chunk_size (int): Число сотрудников в одной части
+
+    Yields:
+        dict: Расчетный листок (см. compute_payslip)
+    """
+    for payslips in _map_chunks(_run_chunk, employees, bonus_percent, workers, chunk_size):
+        yield from payslips
+
+
+def _map_chunks(task, employees, bonus_percent, workers, chunk_size):
+    """Применить task к частям штата в пуле процессов, сохраняя порядок частей"""
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(employees, bonus_percent, chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            yield task(chunk)
+        return
+
+    flush_logs()  # записи родителя пишет сам родитель, а не копии в дочерних процессах
+    with _process_safe_log(), ProcessPoolExecutor(max_workers=workers,
+                                                  initializer=_init_worker) as executor:
+        pending = deque(executor.submit(task, chunk) for chunk in islice(chunks, 2 * workers))
+        while pending:
+            result = pending.popleft().result()
+            for chunk in islice(chunks, 1):
+                pending.append(executor.submit(task, chunk))
+            yield result
+
+
+@logger('accounting.log', redact=_summarize_payroll)
+@performance_monitor
+def calculate_payroll(employees, bonus_percent=0.0, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Итоги расчета зарплаты по штату в формате calculate_salary
+
+    Args:
+        employees (iterable): Сотрудники
+        bonus_percent: Процент премии - число или функция employee -> процент
+        workers (int): Число процессов
+        chunk_size (int): Число сотрудников в одной части
+
+    Итоги частей считаются в рабочих процессах, а здесь только
+    объединяются, поэтому расчет масштабируется по числу ядер.
+
+    Returns:
+        dict: total_employees, total_salary, average_salary и суммы
+        премий, налогов и выплат на руки
+    """
+    totals = PayrollTotals()
+    for partial in _map_chunks(_run_chunk_totals, employees, bonus_percent, workers, chunk_size):
+        totals.merge(partial)
+    return totals.to_report()
@@ -1,101 +1,392 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Модуль для расчета зарплаты сотрудников с применением декораторов
-"""
-
-import time
-from datetime import datetime
-from decorators import logger, performance_monitor, validate_args
-
-
-@logger('accounting.log')
-@performance_monitor
-def calculate_salary():
-    """
-    Функция для расчета зарплаты сотрудников
-    """
-    print("🧮 Выполняется расчет зарплаты...")
-    print("   - Обработка базовых окладов")
-    print("   - Расчет премий и надбавок")
-    print("   - Вычисление налогов и удержаний")
-    print(f"   - Дата расчета: {datetime.now().strftime('%d.%m.%Y')}")
-
-    # Имитируем сложные вычисления
-    time.sleep(0.1)
-
-    # Имитируем результат расчета
-    salary_data = {
-        'total_employees': 3,
-        'total_salary': 450000.0,
-        'average_salary': 150000.0
-    }
-
-    print("✅ Расчет зарплаты завершен!")
-    return salary_data
-
-
-@logger('accounting.log')
-@validate_args(str, float, float)
-def calculate_individual_salary(employee_name, base_salary, bonus_percent=0.0):
-    """
-    Расчет зарплаты для конкретного сотрудника
-
-    Args:
-        employee_name (str): Имя сотрудника
-        base_salary (float): Базовая зарплата
-        bonus_percent (float): Процент премии
-    """
-    bonus = base_salary * (bonus_percent / 100)
-    total_salary = base_salary + bonus
-
-    result = {
-        'employee': employee_name,
-        'base': base_salary,
-        'bonus': bonus,
-        'total': total_salary
-    }
-
-    print(f"💰 {employee_name}: {total_salary:.2f} руб. (базовая: {base_salary}, премия: {bonus:.2f})")
-    return result
-
-
-@logger('accounting.log')
-def get_salary_report():
-    """
-    Дополнительная функция для генерации отчета по зарплате
-    """
-    report_data = {
-        'report_date': datetime.now().strftime('%Y-%m-%d'),
-        'status': 'generated',
-        'format': 'detailed'
-    }
-
-    print("📊 Отчет по зарплате сгенерирован")
-    return report_data
-
-
-@logger('accounting.log')
-def calculate_taxes(gross_salary):
-    """
-    Расчет налогов с зарплаты
-
-    Args:
-        gross_salary (float): Валовая зарплата
-    """
-    if not isinstance(gross_salary, (int, float)) or gross_salary < 0:
-        raise ValueError("Зарплата должна быть положительным числом")
-
-    income_tax = gross_salary * 0.13  # 13% подоходный налог
-    social_tax = gross_salary * 0.22  # 22% социальные взносы
-
-    net_salary = gross_salary - income_tax
-    total_taxes = income_tax + social_tax
-
-    return {
-        'gross_salary': gross_salary,
-        'income_tax': income_tax,
-        'social_tax': social_tax,
-        'net_salary': net_salary,
-        'total_taxes': total_taxes
-    }
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль для расчета зарплаты сотрудников с применением декораторов
+"""
+
+import math
+from datetime import datetime
+import application.incremental
+import application.stats
+from decorators import logger, performance_monitor, validate_args, persistent_cache, code_version
+from application.console import console
+from application.db.people import get_repository
+from application.incremental import LiveAggregate
+from application.stats import ExactSum
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен, есть реализация на чистом Python
+    np = None
+
+INCOME_TAX_RATE = 0.13  # 13% подоходный налог
+SOCIAL_TAX_RATE = 0.22  # 22% социальные взносы
+
+
+def compute_payslip(employee_id, employee_name, base_salary, bonus_percent=0.0):
+    """
+    Расчет начислений и налогов одного сотрудника без логирования и вывода
+
+    Использует те же формулы, что calculate_individual_salary и calculate_taxes
+    (налоги считаются с начисленной суммы с премией).
+
+    Returns:
+        dict: id, employee, base, bonus, total, income_tax, social_tax, net_salary
+    """
+    bonus = base_salary * (bonus_percent / 100)
+    total = base_salary + bonus
+    income_tax = total * INCOME_TAX_RATE
+    return {
+        'id': employee_id,
+        'employee': employee_name,
+        'base': base_salary,
+        'bonus': bonus,
+        'total': total,
+        'income_tax': income_tax,
+        'social_tax': total * SOCIAL_TAX_RATE,
+        'net_salary': total - income_tax,
+    }
+
+
+class PayrollTotals:
+    """
+    Итоги расчета зарплаты, накапливаемые по расчетным листкам.
+
+    Суммы точные (ExactSum), поэтому итоги частей расчета, выполненных
+    в разных процессах, объединяются без зависимости от порядка.
+    """
+
+    FIELDS = ('base', 'bonus', 'total', 'income_tax', 'social_tax', 'net_salary')
+
+    def __init__(self):
+        self.employees = 0
+        self._sums = {field: ExactSum() for field in self.FIELDS}
+
+    def add(self, payslip):
+        """Учесть расчетный листок сотрудника"""
+        self.employees += 1
+        for field, total in self._sums.items():
+            total.add(payslip[field])
+        return self
+
+    def remove(self, payslip):
+        """Исключить ранее учтенный расчетный листок (суммы возвращаются точно)"""
+        self.employees -= 1
+        for field, total in self._sums.items():
+            total.add(-payslip[field])
+        return self
+
+    def merge(self, other):
+        """Объединить с итогами другой части расчета"""
+        self.employees += other.employees
+        for field, total in self._sums.items():
+            total.merge(other._sums[field])
+        return self
+
+    def total(self, field):
+        """Точная сумма по полю расчетного листка"""
+        return self._sums[field].value
+
+    def to_report(self):
+        """
+        Итоги в формате calculate_salary.
+
+        Returns:
+            dict: total_employees, total_salary, average_salary и суммы
+            премий, налогов и выплат на руки
+        """
+        total_salary = self.total('total')
+        return {
+            'total_employees': self.employees,
+            'total_salary': total_salary,
+            'average_salary': total_salary / self.employees if self.employees else 0.0,
+            'total_bonus': self.total('bonus'),
+            'total_income_tax': self.total('income_tax'),
+            'total_social_tax': self.total('social_tax'),
+            'total_net_salary': self.total('net_salary'),
+        }
+
+
+class LivePayroll(LiveAggregate):
+    """
+    Итоги расчета зарплаты по штату (PayrollTotals), обновляемые по журналу
+    изменений: вклад старой записи сотрудника вычитается, новой - добавляется.
+    Суммы точные, поэтому итоги совпадают с полным пересчетом.
+    """
+
+    def empty(self):
+        return PayrollTotals()
+
+    def include(self, totals, employee):
+        totals.add(compute_payslip(employee['id'], employee['name'], employee['salary']))
+
+    def exclude(self, totals, employee):
+        totals.remove(compute_payslip(employee['id'], employee['name'], employee['salary']))
+
+    def to_report(self, totals):
+        return totals.to_report()
+
+
+# Итоги по штату приложения; строятся при первом расчете
+_live_payroll = LivePayroll(get_repository())
+
+
+def get_live_payroll():
+    """Инкрементальные итоги расчета зарплаты по штату приложения"""
+    return _live_payroll
+
+
+@logger('accounting.log')
+@persistent_cache(depends_on=get_repository().fingerprint,
+                  version=code_version(compute_payslip, PayrollTotals, LivePayroll,
+                                       application.stats, application.incremental))
+@performance_monitor  # под кэшем: попадания не искажают гистограмму времени расчета
+def calculate_salary():
+    """
+    Функция для расчета зарплаты сотрудников
+
+    Итоги сохраняются в постоянном кэше: при неизменном штате повторный
+    запуск программы получает их без пересчета. После изменений штата
+    итоги обновляются по журналу изменений, а не пересчитываются.
+    """
+    console.info("🧮 Выполняется расчет зарплаты...")
+    console.info("   - Обработка базовых окладов")
+    console.info("   - Расчет премий и надбавок")
+    console.info("   - Вычисление налогов и удержаний")
+    console.info("   - Дата расчета: {:%d.%m.%Y}", datetime.now())
+
+    report = _live_payroll.report()
+    salary_data = {
+        'total_employees': report['total_employees'],
+        'total_salary': report['total_salary'],
+        'average_salary': report['average_salary']
+    }
+
+    console.info("✅ Расчет зарплаты завершен!")
+    return salary_data
+
+
+@logger('accounting.log')
+@validate_args(str, float, float)
+def calculate_individual_salary(employee_name, base_salary, bonus_percent=0.0):
+    """
+    Расчет зарплаты для конкретного сотрудника
+
+    Args:
+        employee_name (str): Имя сотрудника
+        base_salary (float): Базовая зарплата
+        bonus_percent (float): Процент премии
+    """
+    bonus = base_salary * (bonus_percent / 100)
+    total_salary = base_salary + bonus
+
+    result = {
+        'employee': employee_name,
+        'base': base_salary,
+        'bonus': bonus,
+        'total': total_salary
+    }
+
+    console.info("💰 {}: {:.2f} руб. (базовая: {}, премия: {:.2f})",
+                 employee_name, total_salary, base_salary, bonus)
+    return result
+
+
+@logger('accounting.log')
+def get_salary_report():
+    """
+    Дополнительная функция для генерации отчета по зарплате
+    """
+    report_data = {
+        'report_date': datetime.now().strftime('%Y-%m-%d'),
+        'status': 'generated',
+        'format': 'detailed'
+    }
+
+    console.info("📊 Отчет по зарплате сгенерирован")
+    return report_data
+
+
+def _check_gross_salaries(values):
+    """
+    Проверка валовых зарплат для calculate_taxes и calculate_taxes_batch.
+
+    Правило одно для всех реализаций: int или float (но не bool),
+    конечное и неотрицательное.
+    """
+    for value in values:
+        # Сравнение ложно и для NaN
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < math.inf:
+            raise ValueError("Зарплата должна быть положительным числом")
+
+
+@logger('accounting.log')
+def calculate_taxes(gross_salary):
+    """
+    Расчет налогов с зарплаты
+
+    Args:
+        gross_salary (float): Валовая зарплата
+    """
+    _check_gross_salaries((gross_salary,))
+
+    income_tax = gross_salary * INCOME_TAX_RATE
+    social_tax = gross_salary * SOCIAL_TAX_RATE
+
+    net_salary = gross_salary - income_tax
+    total_taxes = income_tax + social_tax
+
+    return {
+        'gross_salary': gross_salary,
+        'income_tax': income_tax,
+        'social_tax': social_tax,
+        'net_salary': net_salary,
+        'total_taxes': total_taxes
+    }
+
+
+def _batch_summary(args, kwargs, result):
+    """Заменить массивы пакетного вызова на их размеры, а результат - на итоги"""
+    def describe(value):
+        if isinstance(value, (str, int, float)):
+            return value
+        try:
+            return f'<{len(value)} значений>'
+        except TypeError:
+            return value
+
+    summary = result['totals'] if isinstance(result, dict) else result
+    return (tuple(describe(arg) for arg in args),
+            {name: describe(value) for name, value in kwargs.items()},
+            summary)
+
+
+def _use_numpy(backend):
+    """Выбрать реализацию пакетного расчета: 'auto', 'numpy' или 'python'"""
+    if backend not in ('auto', 'numpy', 'python'):
+        raise ValueError(f"Неизвестная реализация: {backend}")
+    if backend == 'numpy' and np is None:
+        raise RuntimeError("Для backend='numpy' требуется пакет numpy")
+    return np is not None and backend != 'python'
+
+
+@logger('accounting.log', redact=_batch_summary)
+@performance_monitor
+def calculate_taxes_batch(gross_salaries, backend='auto'):
+    """
+    Пакетный расчет налогов для массива валовых зарплат
+
+    Выполняет те же операции, что и calculate_taxes, но одним векторным
+    проходом (NumPy при наличии, иначе чистый Python), поэтому значения
+    совпадают с результатами calculate_taxes для каждого элемента.
+    Допустимые значения те же, что у calculate_taxes, в обеих реализациях;
+    массив NumPy должен иметь целый или вещественный тип.
+    В лог пишется одна сводная запись на пакет.
+
+    Args:
+        gross_salaries: Последовательность или массив валовых зарплат
+        backend (str): 'auto', 'numpy' или 'python'
+
+    Returns:
+        dict: Колонки gross_salary, income_tax, social_tax, net_salary,
+        total_taxes (массивы NumPy или списки) и итоги totals
+    """
+    if _use_numpy(backend):
+        if isinstance(gross_salaries, np.ndarray):
+            # Массив проверяется векторно; bool, строки и объекты не принимаются
+            if gross_salaries.dtype.kind not in 'iuf':
+                raise ValueError("Зарплата должна быть положительным числом")
+            gross = gross_salaries.astype(np.float64, copy=False)
+            if gross.size and (not np.all(np.isfinite(gross)) or gross.min() < 0):
+                raise ValueError("Зарплата должна быть положительным числом")
+        else:
+            # asarray молча превратил бы True в 1.0, а '100' в 100.0
+            gross = list(gross_salaries)
+            _check_gross_salaries(gross)
+            gross = np.asarray(gross, dtype=np.float64)
+        income_tax = gross * INCOME_TAX_RATE
+        social_tax = gross * SOCIAL_TAX_RATE
+        net_salary = gross - income_tax
+        total_taxes = income_tax + social_tax
+    else:
+        # Элементы массива NumPy приводятся к int/float/bool Python, чтобы правило было общим
+        if np is not None and isinstance(gross_salaries, np.ndarray):
+            gross = gross_salaries.tolist()
+        else:
+            gross = list(gross_salaries)
+        _check_gross_salaries(gross)
+        income_tax = [value * INCOME_TAX_RATE for value in gross]
+        social_tax = [value * SOCIAL_TAX_RATE for value in gross]
+        net_salary = [value - tax for value, tax in zip(gross, income_tax)]
+        total_taxes = [income + social for income, social in zip(income_tax, social_tax)]
+
+    return {
+        'gross_salary': gross,
+        'income_tax': income_tax,
+        'social_tax': social_tax,
+        'net_salary': net_salary,
+        'total_taxes': total_taxes,
+        'totals': {
+            'employees': len(gross),
+            'gross_salary': math.fsum(gross),
+            'income_tax': math.fsum(income_tax),
+            'social_tax': math.fsum(social_tax),
+            'net_salary': math.fsum(net_salary),
+            'total_taxes': math.fsum(total_taxes),
+        },
+    }
+
+
+@logger('accounting.log', redact=_batch_summary)
+@performance_monitor
+def calculate_individual_salaries_batch(employee_names, base_salaries, bonus_percents=0.0,
+                                        backend='auto'):
+    """
+    Пакетный расчет зарплат для списка сотрудников
+
+    Эквивалентен вызову calculate_individual_salary для каждого сотрудника,
+    но выполняется одним векторным проходом, без вывода строки на каждого
+    сотрудника и с одной записью в лог на пакет.
+
+    Args:
+        employee_names: Имена сотрудников
+        base_salaries: Базовые зарплаты
+        bonus_percents: Процент премии - одно число для всех или по сотруднику
+        backend (str): 'auto', 'numpy' или 'python'
+
+    Returns:
+        dict: Колонки employee, base, bonus, total и итоги totals
+    """
+    names = list(employee_names)
+    per_employee_bonus = not isinstance(bonus_percents, (int, float))
+
+    if _use_numpy(backend):
+        base = np.asarray(base_salaries, dtype=np.float64)
+        percents = np.asarray(bonus_percents, dtype=np.float64)
+        if len(base) != len(names) or (per_employee_bonus and len(percents) != len(names)):
+            raise ValueError("Длины массивов имен, окладов и премий должны совпадать")
+        bonus = base * (percents / 100)
+        total = base + bonus
+    else:
+        base = list(base_salaries)
+        percents = list(bonus_percents) if per_employee_bonus else [bonus_percents] * len(base)
+        if len(base) != len(names) or len(percents) != len(names):
+            raise ValueError("Длины массивов имен, окладов и премий должны совпадать")
+        bonus = [salary * (percent / 100) for salary, percent in zip(base, percents)]
+        total = [salary + extra for salary, extra in zip(base, bonus)]
+
+    totals = {
+        'employees': len(names),
+        'base': math.fsum(base),
+        'bonus': math.fsum(bonus),
+        'total': math.fsum(total),
+    }
+
+    console.summary("💰 Пакетный расчет: {} сотрудников, итого {:.2f} руб.", len(names), totals['total'])
+    return {
+        'employee': names,
+        'base': base,
+        'bonus': bonus,
+        'total': total,
+        'totals': totals,
+    }
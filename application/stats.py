@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Потоковая агрегация статистики по зарплатам за один проход
+"""
+
+import math
+from datetime import datetime
+
+
+class ExactSum:
+    """
+    Точная сумма чисел с плавающей точкой (частичные суммы Шевчука,
+    тот же алгоритм, что и в math.fsum).
+
+    Результат не зависит от порядка слагаемых, поэтому частичные суммы
+    шардов объединяются без накопления ошибки округления, а вычитание
+    ранее добавленного значения возвращает сумму точно к прежней.
+    """
+
+    __slots__ = ('_partials',)
+
+    def __init__(self, values=()):
+        self._partials = []
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        """Добавить слагаемое"""
+        partials = self._partials
+        i = 0
+        for partial in partials:
+            if abs(value) < abs(partial):
+                value, partial = partial, value
+            high = value + partial
+            low = partial - (high - value)
+            if low:
+                partials[i] = low
+                i += 1
+            value = high
+        partials[i:] = [value]
+
+    def merge(self, other):
+        """Добавить все слагаемые другой суммы"""
+        for partial in list(other._partials):
+            self.add(partial)
+        return self
+
+    def copy(self):
+        clone = ExactSum()
+        clone._partials = self._partials[:]
+        return clone
+
+    @property
+    def value(self):
+        """Сумма, округленная один раз"""
+        return math.fsum(self._partials)
+
+
+class RunningStats:
+    """
+    Накопительная статистика: count, сумма, min, max, среднее и дисперсия.
+
+    Дисперсия считается по Уэлфорду и объединяется формулой Чана,
+    сумма и среднее - через точную сумму ExactSum, поэтому объединение
+    частичных агрегатов дает тот же count/total/mean/min/max, что и
+    расчет по всем данным сразу.
+    """
+
+    __slots__ = ('count', 'min', 'max', '_total', '_mean', '_m2')
+
+    def __init__(self):
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._total = ExactSum()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        """Учесть значение"""
+        self.count += 1
+        self._total.add(value)
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def remove(self, value):
+        """
+        Исключить ранее учтенное значение.
+
+        Сумма и среднее возвращаются точно к прежним, дисперсия - обратным
+        шагом Уэлфорда. Минимум и максимум по остальным значениям
+        восстановить нельзя, поэтому при удалении крайнего значения
+        возвращается True: вызывающий код должен передать оставшиеся
+        значения в reset_extremes().
+        """
+        if self.count <= 1:
+            self.__init__()
+            return False
+
+        mean = self._mean
+        self.count -= 1
+        self._total.add(-value)
+        if self.count == 1:
+            # Одно значение: состояние известно точно, без накопленной ошибки
+            self._mean, self._m2 = self._total.value, 0.0
+        else:
+            self._mean = mean + (mean - value) / self.count
+            self._m2 -= (value - mean) * (value - self._mean)
+        return value <= self.min or value >= self.max
+
+    def reset_extremes(self, values):
+        """Пересчитать минимум и максимум по всем учтенным значениям"""
+        values = list(values)
+        self.min = min(values, default=None)
+        self.max = max(values, default=None)
+
+    def merge(self, other):
+        """Объединить с агрегатом другого шарда"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.min, self.max = other.count, other.min, other.max
+            self._total = other._total.copy()
+            self._mean, self._m2 = other._mean, other._m2
+            return self
+
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self._total.merge(other._total)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total(self):
+        return self._total.value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        """Дисперсия генеральной совокупности"""
+        return max(self._m2, 0.0) / self.count if self.count else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class DepartmentAggregate:
+    """
+    Агрегат статистики зарплат по должностям и по штату в целом.
+
+    Потребляет сотрудников из любого итератора за один проход
+    и в постоянной памяти (размер зависит только от числа должностей).
+    Агрегаты шардов объединяются методом merge(), изменения штата
+    учитываются парой remove()/add() без полного пересчета.
+    """
+
+    def __init__(self):
+        self.overall = RunningStats()
+        self.positions = {}
+        # Должности, у которых после remove() нужно пересчитать min/max
+        self.stale_positions = set()
+
+    def add(self, employee):
+        """Учесть одного сотрудника"""
+        self.add_value(employee['position'], employee.get('salary', 0))
+
+    def remove(self, employee):
+        """Исключить ранее учтенного сотрудника"""
+        self.remove_value(employee['position'], employee.get('salary', 0))
+
+    def remove_value(self, position, salary):
+        """Исключить оклад, ранее учтенный для должности"""
+        stats = self.positions[position]
+        if stats.remove(salary):
+            self.stale_positions.add(position)
+        if not stats.count:
+            del self.positions[position]
+            self.stale_positions.discard(position)
+        self.overall.remove(salary)
+
+    def reset_extremes(self, position, salaries):
+        """
+        Пересчитать min/max должности по окладам всех ее сотрудников
+        (для должностей из stale_positions)
+        """
+        self.positions[position].reset_extremes(salaries)
+        self.stale_positions.discard(position)
+        self.overall.reset_extremes(
+            value for stats in self.positions.values() for value in (stats.min, stats.max)
+        )
+
+    def add_value(self, position, salary):
+        """Учесть оклад для должности"""
+        stats = self.positions.get(position)
+        if stats is None:
+            stats = self.positions[position] = RunningStats()
+        stats.add(salary)
+        self.overall.add(salary)
+
+    def consume(self, employees):
+        """Учесть всех сотрудников из итератора; возвращает self"""
+        add_value = self.add_value
+        for employee in employees:
+            add_value(employee['position'], employee.get('salary', 0))
+        return self
+
+    def merge(self, other):
+        """Объединить с агрегатом другого шарда; возвращает self"""
+        for position, stats in other.positions.items():
+            self.positions.setdefault(position, RunningStats()).merge(stats)
+        self.overall.merge(other.overall)
+        return self
+
+    def to_report(self):
+        """
+        Отчет в формате calculate_department_stats.
+
+        Returns:
+            dict: total_employees, total_salary_budget, average_salary,
+            positions (count, total_salary, average_salary, min/max и
+            стандартное отклонение по каждой должности) и generated_at
+        """
+        positions = {
+            position: {
+                'count': stats.count,
+                'total_salary': stats.total,
+                'average_salary': stats.mean,
+                'min_salary': stats.min,
+                'max_salary': stats.max,
+                'salary_stdev': stats.stdev,
+            }
+            for position, stats in self.positions.items()
+        }
+        return {
+            'total_employees': self.overall.count,
+            'total_salary_budget': self.overall.total,
+            'average_salary': self.overall.mean,
+            'positions': positions,
+            'generated_at': datetime.now().isoformat(),
+        }
+
+
+def aggregate_department_stats(employees):
+    """Агрегат статистики по итератору сотрудников"""
+    return DepartmentAggregate().consume(employees)
+
+
+def merge_aggregates(aggregates):
+    """Объединить агрегаты шардов в один"""
+    result = DepartmentAggregate()
+    for aggregate in aggregates:
+        result.merge(aggregate)
+    return result
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарки декораторов и модулей программы "Бухгалтерия"
+
+Запуск:
+    python benchmarks.py              # все бенчмарки
+    python benchmarks.py overhead     # только выбранные
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from decorators import (
+    logger, performance_monitor, close_logs, configure_instrumentation, reset_instrumentation,
+)
+
+
+def per_call_ns(func, number, repeat=5):
+    """Лучшее из нескольких повторов время одного вызова в наносекундах"""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def print_table(title, rows, baseline=None):
+    """Вывести результаты замеров в виде таблицы"""
+    print(f"\n📊 {title}")
+    print("-" * 60)
+    for name, value in rows:
+        line = f"{name:<36} {value:12.1f} нс"
+        if baseline is not None:
+            line += f"  (+{value - baseline:.1f})"
+        print(line)
+
+
+def bench_overhead(number=200_000):
+    """Накладные расходы декораторов на вызов пустой функции"""
+
+    def empty():
+        pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        variants = [
+            ('без декоратора', empty),
+            ('@performance_monitor', performance_monitor(empty)),
+            ('@performance_monitor(cpu_time)', performance_monitor(cpu_time='thread')(empty)),
+            ('@logger', logger(path)(empty)),
+            ('@logger(sample_every=100)', logger(path, sample_every=100)(empty)),
+            ('@logger(cpu_time)', logger(path, cpu_time='thread')(empty)),
+        ]
+        rows = [(name, per_call_ns(func, number)) for name, func in variants]
+
+        # Выключение во время работы: уже созданные обертки проверяют уровень
+        switched = [
+            ('@performance_monitor, выключен', performance_monitor(empty)),
+            ('@logger, выключен', logger(path)(empty)),
+        ]
+        configure_instrumentation(all='off')
+        try:
+            rows.extend((name, per_call_ns(func, number)) for name, func in switched)
+        finally:
+            reset_instrumentation()
+        close_logs(path)
+
+    print_table("Накладные расходы на пустую функцию", rows, baseline=rows[0][1])
+
+
+def make_roster(size):
+    """Синтетический список сотрудников заданного размера"""
+    positions = ['Менеджер', 'Программист', 'Аналитик', 'Дизайнер', 'Бухгалтер']
+    return [
+        {
+            'id': i,
+            'name': f'Сотрудник {i}',
+            'position': positions[i % len(positions)],
+            'salary': 100000.0 + (i % 1000) * 100,
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def bench_lookup(sizes=(1_000, 10_000, 100_000)):
+    """Линейный поиск по списку против индексированного хранилища"""
+    from application.db.repository import EmployeeRepository
+
+    def scan_by_id(employees, employee_id):
+        for employee in employees:
+            if employee['id'] == employee_id:
+                return employee
+        return None
+
+    def scan_by_position(employees, position):
+        return [emp for emp in employees if emp['position'].lower() == position.lower()]
+
+    for size in sizes:
+        employees = make_roster(size)
+        repository = EmployeeRepository(employees)
+        target = size * 3 // 4
+        number = max(1, 200_000 // size)
+        rows = [
+            ('поиск по ID: перебор', per_call_ns(lambda: scan_by_id(employees, target), number)),
+            ('поиск по ID: индекс', per_call_ns(lambda: repository.get(target), number * 100)),
+            ('по должности: перебор',
+             per_call_ns(lambda: scan_by_position(employees, 'аналитик'), number)),
+            ('по должности: индекс',
+             per_call_ns(lambda: repository.by_position('аналитик'), number)),
+        ]
+        print_table(f"Поиск сотрудников (штат {size})", rows)
+
+
+def traced_bytes(build):
+    """Объем памяти, выделенной при построении структуры (в байтах)"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def bench_memory(size=1_000_000):
+    """Память на штат: словари против записей со __slots__ и колонок"""
+    from application.db.columnar import EmployeeColumns, EmployeeRecord
+
+    dict_bytes, employees = traced_bytes(lambda: make_roster(size))
+    record_bytes, _ = traced_bytes(lambda: [EmployeeRecord.from_mapping(emp) for emp in employees])
+    column_bytes, _ = traced_bytes(lambda: EmployeeColumns.from_records(employees))
+
+    print(f"\n📊 Память на штат из {size} сотрудников")
+    print("-" * 60)
+    # Записи ссылаются на те же строки имен, поэтому учитывается только их оверхед
+    for name, value in (('словари', dict_bytes), ('EmployeeRecord (без строк)', record_bytes),
+                        ('EmployeeColumns', column_bytes)):
+        print(f"{name:<36} {value / 2**20:9.1f} МБ  "
+              f"({value / size:6.1f} Б/строку, x{dict_bytes / value:.1f})")
+
+
+def bench_batch(size=20_000):
+    """Поштучный расчет налогов и зарплат против пакетного"""
+    from application.salary import (
+        calculate_taxes, calculate_taxes_batch,
+        calculate_individual_salary, calculate_individual_salaries_batch,
+    )
+
+    roster = make_roster(size)
+    names = [emp['name'] for emp in roster]
+    salaries = [emp['salary'] for emp in roster]
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        rows = [
+            ('calculate_taxes x N', per_call_ns(
+                lambda: [calculate_taxes(value) for value in salaries], 1, repeat=3)),
+            ('calculate_taxes_batch', per_call_ns(
+                lambda: calculate_taxes_batch(salaries), 1, repeat=3)),
+            ('calculate_individual_salary x N', per_call_ns(
+                lambda: [calculate_individual_salary(name, value, 10.0)
+                         for name, value in zip(names, salaries)], 1, repeat=3)),
+            ('calculate_individual_salaries_batch', per_call_ns(
+                lambda: calculate_individual_salaries_batch(names, salaries, 10.0), 1, repeat=3)),
+        ]
+    close_logs('accounting.log')
+
+    rows = [(name, value / size) for name, value in rows]
+    print_table(f"Расчет на одного сотрудника (пакет из {size})", rows)
+
+
+def bench_log_formats(size=200_000):
+    """Размер и скорость чтения лога в текстовом, JSONL и двоичном форматах"""
+    from log_reader import iter_records
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for log_format in ('text', 'jsonl', 'binary'):
+            path = os.path.join(tmp, f'{log_format}.log')
+
+            @logger(path, log_format=log_format)
+            def calculate(employee_id, salary, bonus_percent=10.0):
+                return salary * (1 + bonus_percent / 100)
+
+            for i in range(size):
+                calculate(i, 100000.0 + i, bonus_percent=5.0 if i % 10 else 15.0)
+            close_logs(path)
+
+            read_all = per_call_ns(lambda: sum(1 for _ in iter_records(path)), 1, repeat=1)
+            decode_all = per_call_ns(lambda: sum(1 for entry in iter_records(path) if entry.args), 1, repeat=1)
+            filtered = per_call_ns(lambda: sum(1 for _ in iter_records(path, func='missing')), 1, repeat=1)
+            print(f"{log_format:<8} {os.path.getsize(path) / size:6.1f} Б/запись")
+            rows.extend([
+                (f'{log_format}: заголовки записей', read_all / size),
+                (f'{log_format}: с аргументами', decode_all / size),
+                (f'{log_format}: фильтр по функции', filtered / size),
+            ])
+
+    print_table(f"Чтение лога на одну запись ({size} записей)", rows)
+
+
+def legacy_validate_args(*types):
+    """Прежняя реализация validate_args: zip позиционных аргументов с типами"""
+
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            for i, (arg, expected_type) in enumerate(zip(args, types)):
+                if not isinstance(arg, expected_type):
+                    raise TypeError(f"Аргумент {i + 1} функции {func.__name__} "
+                                    f"должен быть типа {expected_type.__name__}")
+            return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def bench_validation(number=200_000):
+    """Прежняя проверка аргументов против привязанной к сигнатуре"""
+    from decorators import validate_args, configure_validation
+
+    def salary(employee_name, base_salary, bonus_percent=0.0):
+        return base_salary * (1 + bonus_percent / 100)
+
+    legacy = legacy_validate_args(str, float, float)(salary)
+    checked = validate_args(str, float, float)(salary)
+    rows = [
+        ('без проверки', per_call_ns(lambda: salary('Иван', 1000.0, 10.0), number)),
+        ('прежняя, позиционные', per_call_ns(lambda: legacy('Иван', 1000.0, 10.0), number)),
+        ('прежняя, по имени (не проверяет)', per_call_ns(
+            lambda: legacy('Иван', base_salary=1000.0, bonus_percent=10.0), number)),
+        ('новая, позиционные', per_call_ns(lambda: checked('Иван', 1000.0, 10.0), number)),
+        ('новая, по имени', per_call_ns(
+            lambda: checked('Иван', base_salary=1000.0, bonus_percent=10.0), number)),
+    ]
+    try:
+        configure_validation(sample_every=100)
+        rows.append(('новая, sample_every=100', per_call_ns(lambda: checked('Иван', 1000.0, 10.0), number)))
+        configure_validation(enabled=False)
+        rows.append(('новая, проверки выключены', per_call_ns(lambda: checked('Иван', 1000.0, 10.0), number)))
+    finally:
+        configure_validation()
+
+    print_table("Проверка типов аргументов", rows, baseline=rows[0][1])
+
+
+def bench_payroll(size=400_000):
+    """Расчет зарплаты по штату в одном процессе и в пуле процессов"""
+    from application.payroll import calculate_payroll
+
+    roster = make_roster(size)
+    rows = []
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        elapsed = per_call_ns(lambda: calculate_payroll(roster, 10.0, workers=workers), 1, repeat=1)
+        rows.append((f'процессов: {workers}', elapsed / size))
+    close_logs('accounting.log')
+
+    print_table(f"Расчет зарплаты на одного сотрудника (штат {size})", rows)
+
+
+def bench_fusion(number=200_000):
+    """Стек декораторов отдельными обертками против объединенной обертки"""
+    import decorators
+    from decorators import validate_args, cached
+
+    def salary(employee_name, base_salary, bonus_percent=0.0):
+        return base_salary * (1 + bonus_percent / 100)
+
+    def call(func):
+        return per_call_ns(lambda: func('Иван', 1000.0, 10.0), number)
+
+    # Запись в файл и гистограмма стоят одинаково в обоих вариантах и
+    # заслоняют разницу, поэтому лог с выборкой, а монитор без реестра
+    def log(path):
+        return logger(path, sample_every=1000)
+
+    monitor = performance_monitor(registry=None)
+    stacks = [
+        ('logger+monitor', lambda path: (log(path), monitor)),
+        ('logger+validate', lambda path: (log(path), validate_args(str, float, float))),
+        ('logger+cache', lambda path: (log(path), cached())),
+        ('logger+cache+validate+monitor', lambda path: (
+            log(path), cached(), validate_args(str, float, float), monitor)),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        rows = [('без декораторов', call(salary))]
+        for name, make_stack in stacks:
+            for fuse in (False, True):
+                decorators.FUSE_STACKS = fuse
+                try:
+                    func = salary
+                    for decorator in reversed(make_stack(path)):
+                        func = decorator(func)
+                finally:
+                    decorators.FUSE_STACKS = True
+                rows.append((f"{name}: {'одна обертка' if fuse else 'слои'}", call(func)))
+        close_logs(path)
+
+    print_table("Объединение стека декораторов", rows, baseline=rows[0][1])
+
+
+def bench_persistent(size=200_000):
+    """Статистика по штату: полный расчет против постоянного кэша"""
+    from decorators import persistent_cache, get_persistent_store
+    from application.db.repository import EmployeeRepository
+    from application.stats import aggregate_department_stats
+
+    repository = EmployeeRepository(make_roster(size))
+
+    first = repository.all()[0]
+
+    def department_stats():
+        return aggregate_department_stats(repository.all()).to_report()
+
+    def changed_fingerprint():
+        repository.update(first['id'], salary=first['salary'])
+        return repository.fingerprint()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.sqlite3')
+        stored = persistent_cache(path, depends_on=repository.fingerprint)(department_stats)
+        stored()
+        rows = [
+            ('полный расчет', per_call_ns(department_stats, 1, repeat=3)),
+            ('отпечаток штата после изменения', per_call_ns(changed_fingerprint, 1, repeat=3)),
+            ('из постоянного кэша', per_call_ns(stored, 1, repeat=3)),
+        ]
+        get_persistent_store(path).close()
+
+    print_table(f"Статистика по отделам (штат {size})", rows)
+
+
+def bench_database(size=50_000, lookups=2_000):
+    """Слой данных SQLite: пакетная вставка и поиск по индексам, память против файла"""
+    from application.db.connection import ConnectionPool
+    from application.db.repository import EmployeeRepository
+    from application.db.sqlite_repository import SqliteEmployeeRepository
+
+    roster = [{key: value for key, value in employee.items() if key != 'id'}
+              for employee in make_roster(size)]
+    ids = range(1, lookups + 1)
+
+    def lookup(repository):
+        return lambda: [repository.get(employee_id) for employee_id in ids]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        storages = [
+            ('словари в памяти', EmployeeRepository),
+            ('SQLite в памяти', lambda: SqliteEmployeeRepository(ConnectionPool(':memory:'))),
+            ('SQLite в файле', lambda: SqliteEmployeeRepository(
+                ConnectionPool(os.path.join(tmp, 'employees.sqlite3')))),
+        ]
+        for label, build in storages:
+            repository = build()
+            rows.append((f'{label}: add_many, на сотрудника',
+                         per_call_ns(lambda: repository.add_many(roster), 1, repeat=1) / size))
+            rows.append((f'{label}: get по ID', per_call_ns(lookup(repository), 1) / lookups))
+            rows.append((f'{label}: by_position', per_call_ns(
+                lambda: repository.by_position('Программист'), 1, repeat=3)))
+            if hasattr(repository, 'pool'):
+                repository.pool.close()
+
+    print_table(f"Слой данных (штат {size})", rows)
+
+
+def bench_import(size=200_000, single=2_000):
+    """Массовый импорт из CSV против поштучного добавления"""
+    from application.db.connection import ConnectionPool
+    from application.db.importer import import_file
+    from application.db.sqlite_repository import SqliteEmployeeRepository
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'employees.csv')
+        with open(source, 'w', encoding='utf-8') as stream:
+            stream.write('name,position,salary,hire_date\n')
+            stream.writelines(f"{employee['name']},{employee['position']},{employee['salary']},2024-01-15\n"
+                              for employee in make_roster(size))
+
+        pool = ConnectionPool(os.path.join(tmp, 'employees.sqlite3'))
+        repository = SqliteEmployeeRepository(pool)
+
+        def add_one_by_one():
+            for index in range(single):
+                repository.add({'name': f'Сотрудник {index}', 'position': 'Аналитик', 'salary': 100000.0})
+
+        rows = [('add по одному, на сотрудника', per_call_ns(add_one_by_one, 1, repeat=1) / single)]
+        report = import_file(repository, source)
+        rows.append(('import_file, на сотрудника', report.seconds * 1e9 / report.imported))
+        pool.close()
+
+    print_table(f"Импорт сотрудников ({size} строк, {report.rows_per_second:,.0f} строк/с)", rows)
+
+
+def bench_incremental(size=200_000):
+    """Итоги по штату после изменения одного сотрудника: пересчет против журнала изменений"""
+    from application.db.repository import EmployeeRepository
+    from application.incremental import LiveDepartmentStats
+    from application.salary import LivePayroll, PayrollTotals, compute_payslip
+    from application.stats import aggregate_department_stats
+
+    repository = EmployeeRepository(make_roster(size))
+    payroll = LivePayroll(repository, verify_every=0)
+    departments = LiveDepartmentStats(repository, verify_every=0)
+    payroll.refresh()
+    departments.refresh()
+    salaries = iter(range(10**9))
+
+    def change_one():
+        # Оклад внутри диапазона: крайние значения должности не меняются
+        repository.update(size // 2, salary=150000.0 + next(salaries) % 1000)
+
+    def full_recompute():
+        change_one()
+        totals = PayrollTotals()
+        for employee in repository.all():
+            totals.add(compute_payslip(employee['id'], employee['name'], employee['salary']))
+        return totals.to_report(), aggregate_department_stats(repository.all()).to_report()
+
+    def incremental():
+        change_one()
+        return payroll.report(), departments.report()
+
+    rows = [
+        ('полный пересчет', per_call_ns(full_recompute, 1, repeat=3)),
+        ('по журналу изменений', per_call_ns(incremental, 1_000)),
+    ]
+    assert payroll.verify() == [] and departments.verify() == []
+    print_table(f"Зарплата и статистика после изменения (штат {size})", rows)
+
+
+def bench_console(number=50_000):
+    """Сообщение на каждый вызов: print против уровней и буфера консоли"""
+    from application.console import Console, NORMAL, QUIET, SUMMARY
+
+    name, total, base, bonus = 'Иванов И.И.', 132000.0, 120000.0, 12000.0
+    # Построчная буферизация, как у терминала: системный вызов на каждую строку
+    with open(os.devnull, 'w', encoding='utf-8', buffering=1) as stream:
+        consoles = [
+            ('Console, построчно', Console(NORMAL, stream=stream)),
+            ('Console, буфер 64 КБ', Console(NORMAL, buffered=True, stream=stream)),
+            ('Console, уровень summary', Console(SUMMARY, stream=stream)),
+            ('Console, тихий режим', Console(QUIET, stream=stream)),
+        ]
+
+        def printed():
+            print(f"💰 {name}: {total:.2f} руб. (базовая: {base}, премия: {bonus:.2f})", file=stream)
+
+        rows = [('print', per_call_ns(printed, number))]
+        for label, console in consoles:
+            def message(console=console):
+                console.info("💰 {}: {:.2f} руб. (базовая: {}, премия: {:.2f})", name, total, base, bonus)
+            rows.append((label, per_call_ns(message, number)))
+            console.flush()
+
+    print_table("Вывод сообщения в консоль", rows)
+
+
+BENCHMARKS = {
+    'overhead': bench_overhead,
+    'lookup': bench_lookup,
+    'memory': bench_memory,
+    'batch': bench_batch,
+    'payroll': bench_payroll,
+    'validation': bench_validation,
+    'logformat': bench_log_formats,
+    'fusion': bench_fusion,
+    'persistent': bench_persistent,
+    'database': bench_database,
+    'import': bench_import,
+    'incremental': bench_incremental,
+    'console': bench_console,
+}
+
+
+def main(names):
+    """Запустить выбранные (или все) бенчмарки"""
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"❌ Неизвестный бенчмарк: {name}. Доступны: {', '.join(BENCHMARKS)}")
+            return 1
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
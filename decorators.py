@@ -1,133 +1,2835 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Модуль с декораторами для программы "Бухгалтерия"
-"""
-
-from datetime import datetime
-from functools import wraps
-import os
-
-
-def logger(path_or_function=None):
-    """
-    Универсальный декоратор логирования.
-    Может использоваться как простой декоратор (@logger)
-    или как параметризованный (@logger('path/to/file.log'))
-
-    Args:
-        path_or_function: Путь к файлу логов или декорируемая функция
-    """
-
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Определяем путь к файлу логов
-            if isinstance(path_or_function, str):
-                log_path = path_or_function
-            else:
-                log_path = 'accounting.log'
-
-            # Получаем время начала выполнения
-            start_time = datetime.now()
-
-            try:
-                # Вызываем оригинальную функцию
-                result = func(*args, **kwargs)
-
-                # Рассчитываем время выполнения
-                end_time = datetime.now()
-                execution_time = (end_time - start_time).total_seconds()
-
-                # Формируем строку с аргументами
-                args_str = ', '.join(map(str, args))
-                kwargs_str = ', '.join([f'{k}={v}' for k, v in kwargs.items()])
-
-                all_args = []
-                if args_str:
-                    all_args.append(args_str)
-                if kwargs_str:
-                    all_args.append(kwargs_str)
-                args_combined = ', '.join(all_args)
-
-                # Формируем запись в лог
-                log_entry = (
-                    f"{start_time.strftime('%Y-%m-%d %H:%M:%S')} | "
-                    f"SUCCESS | {func.__name__}({args_combined}) -> {result} | "
-                    f"Время: {execution_time:.4f}с\n"
-                )
-
-                # Записываем в файл
-                with open(log_path, 'a', encoding='utf-8') as log_file:
-                    log_file.write(log_entry)
-
-                return result
-
-            except Exception as e:
-                # Логируем ошибки
-                end_time = datetime.now()
-                execution_time = (end_time - start_time).total_seconds()
-
-                log_entry = (
-                    f"{start_time.strftime('%Y-%m-%d %H:%M:%S')} | "
-                    f"ERROR | {func.__name__}({args}, {kwargs}) -> {type(e).__name__}: {e} | "
-                    f"Время: {execution_time:.4f}с\n"
-                )
-
-                with open(log_path, 'a', encoding='utf-8') as log_file:
-                    log_file.write(log_entry)
-
-                # Перебрасываем исключение
-                raise
-
-        return wrapper
-
-    # Проверяем, использован ли декоратор без параметров
-    if callable(path_or_function):
-        return decorator(path_or_function)
-    else:
-        return decorator
-
-
-def performance_monitor(func):
-    """
-    Декоратор для мониторинга производительности функций
-    """
-
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = datetime.now()
-        result = func(*args, **kwargs)
-        end_time = datetime.now()
-
-        execution_time = (end_time - start_time).total_seconds()
-
-        if execution_time > 1.0:  # Если функция выполнялась больше секунды
-            print(f"⚠️  МЕДЛЕННОЕ ВЫПОЛНЕНИЕ: {func.__name__} заняла {execution_time:.2f} секунд")
-
-        return result
-
-    return wrapper
-
-
-def validate_args(*types):
-    """
-    Декоратор для валидации типов аргументов
-    """
-
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            # Проверяем типы позиционных аргументов
-            for i, (arg, expected_type) in enumerate(zip(args, types)):
-                if not isinstance(arg, expected_type):
-                    raise TypeError(
-                        f"Аргумент {i + 1} функции {func.__name__} должен быть типа {expected_type.__name__}, "
-                        f"получен {type(arg).__name__}"
-                    )
-
-            return func(*args, **kwargs)
-
-        return wrapper
-
-    return decorator
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль с декораторами для программы "Бухгалтерия"
+"""
+
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping
+from datetime import date, datetime
+from functools import partial, wraps
+import atexit
+import contextlib
+import copy
+import itertools
+import math
+import os
+import random
+import struct
+import sys
+import threading
+import time
+import weakref
+from types import FunctionType, MethodType, ModuleType, NoneType, UnionType
+
+try:
+    import fcntl
+except ImportError:  # Нет на Windows: блокировка между процессами недоступна
+    fcntl = None
+
+
+DEFAULT_LOG_PATH = 'accounting.log'
+
+# Общее ядро измерения времени для всех декораторов модуля:
+# длительности измеряются монотонными часами в целых наносекундах
+wall_clock_ns = time.perf_counter_ns
+
+CPU_CLOCKS = {
+    'process': time.process_time_ns,
+    'thread': time.thread_time_ns,
+}
+
+
+def get_cpu_clock(kind):
+    """
+    Получить функцию чтения процессорного времени.
+
+    Args:
+        kind (str): 'process', 'thread' или None, если CPU-время не измеряется
+    """
+    if kind is None:
+        return None
+    try:
+        return CPU_CLOCKS[kind]
+    except KeyError:
+        raise ValueError(
+            f"Неизвестные часы CPU: {kind}; допустимы {', '.join(CPU_CLOCKS)}"
+        ) from None
+
+
+def format_duration(duration_ns):
+    """Форматировать длительность в наносекундах как секунды"""
+    return f'{duration_ns / 1e9:.6f}с'
+
+
+class LogSink:
+    """
+    Общий приемник записей для одного лог-файла.
+
+    Держит файл открытым, накапливает записи в памяти и сбрасывает их на диск
+    фоновым потоком при достижении порога по количеству записей или по времени.
+    Вызывающий поток платит только за добавление записи в очередь.
+
+    При заданных max_bytes или when файл ротируется: текущий файл
+    переименовывается в path.1 (старые поколения сдвигаются до
+    backup_count), а сжатие в path.1.gz выполняется фоновым потоком.
+    Несколько процессов могут писать и ротировать один файл: запись
+    идет под разделяемой блокировкой файла path.lock, а ротация -
+    под исключительной, поэтому пачка не попадет в уже ротированный файл.
+
+    Пачка записей всегда передается в os.write целиком, но длинная пачка
+    может быть записана частями. В режиме process_safe вся пачка пишется
+    под исключительной блокировкой path.lock, поэтому записи процессов,
+    пишущих в один файл, не перемешиваются даже при частичной записи.
+
+    Args:
+        path (str): Путь к файлу логов
+        batch_size (int): Количество записей, после которого буфер сбрасывается
+        flush_interval (float): Максимальное время (с) хранения записи в буфере
+        durable (bool): Синхронная запись с fsync для каждой записи
+        max_bytes (int): Ротировать файл, когда он превысит этот размер
+        when (str): Ротировать файл раз в период: 'midnight' или 'hour'
+        backup_count (int): Сколько ротированных файлов хранить
+        compress (bool): Сжимать ротированные файлы gzip
+        process_safe (bool): Писать пачки под блокировкой между процессами
+    """
+
+    def __init__(self, path, batch_size=256, flush_interval=0.5, durable=False,
+                 max_bytes=None, when=None, backup_count=5, compress=True,
+                 process_safe=False):
+        if when is not None and when not in ROTATION_PERIODS:
+            raise ValueError(f"Неизвестный период ротации: {when}; допустимы {', '.join(ROTATION_PERIODS)}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self.max_bytes = max_bytes
+        self.when = when
+        self.backup_count = backup_count
+        self.compress = compress
+        self.process_safe = process_safe
+        self._lock_fd = None
+        self._compressors = []
+        self._pending = deque()
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._closed = False
+        self._sync_requested = False
+
+    def options(self):
+        """Текущие настройки приемника (параметры конструктора)"""
+        return {name: getattr(self, name) for name in SINK_OPTIONS}
+
+    def emit(self, entry, durable=False, block=True):
+        """
+        Поставить запись в очередь на запись.
+
+        Args:
+            entry: Запись LogRecord, готовая строка лога или байты
+            durable (bool): Записать синхронно и дождаться fsync
+            block (bool): False - не блокировать вызывающий поток даже
+                для durable-записи (для цикла событий asyncio): запись
+                и fsync выполнит фоновый поток при ближайшем сбросе
+        """
+        self._pending.append(entry)
+
+        if (durable or self.durable) and not block:
+            self._sync_requested = True
+            self._wakeup.set()
+        elif durable or self.durable or self._closed:
+            self.flush(sync=True)
+            return
+
+        if self._thread is None:
+            self._start_writer()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self, sync=None):
+        """
+        Записать все накопленные записи в файл.
+
+        Args:
+            sync (bool): Вызвать fsync после записи (по умолчанию - как в durable)
+        """
+        with self._write_lock:
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return
+
+            parts = [entry if isinstance(entry, (str, bytes)) else entry.render() for entry in batch]
+            try:
+                data = ''.join(parts).encode('utf-8')
+            except TypeError:  # В пачке есть записи двоичного формата
+                data = b''.join(part.encode('utf-8') if isinstance(part, str) else part
+                                for part in parts)
+
+            rotating = self.max_bytes is not None or self.when is not None
+            if not rotating and not self.process_safe:
+                self._write(self._open(), data, sync)
+                return
+
+            # В режиме process_safe пачка пишется под исключительной
+            # блокировкой и не перемешивается с записями других процессов.
+            # Иначе хватает разделяемой: ротация в другом процессе дождется
+            # окончания записи, а после ротации файл будет переоткрыт
+            with self._locked(shared=not self.process_safe):
+                fd = self._open()
+                if not (rotating and self._rotation_due(os.fstat(fd), len(data))):
+                    self._write(fd, data, sync)
+                    return
+                if self.process_safe:
+                    self._rotate_locked(len(data))
+                    self._write(self._open(), data, sync)
+                    return
+            self._rotate(len(data))
+            with self._locked(shared=True):
+                self._write(self._open(), data, sync)
+
+    def _write(self, fd, data, sync):
+        while data:
+            written = os.write(fd, data)
+            data = data[written:]
+
+        if sync or (sync is None and self.durable):
+            os.fsync(fd)
+
+    def close(self):
+        """Сбросить буфер, остановить фоновый поток и закрыть файл"""
+        self._closed = True
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
+
+        with self._write_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+                self._lock_fd = None
+
+        # Дожидаемся сжатия ротированных файлов, чтобы не оставить его незавершенным
+        for compressor in self._compressors:
+            compressor.join()
+        self._compressors = []
+
+    def _open(self):
+        """
+        Вернуть дескриптор файла, переоткрыв его при необходимости.
+
+        Файл мог быть удален или подменен снаружи (например, очисткой логов
+        перед тестами), поэтому перед каждой пачкой сверяем inode.
+        """
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path)
+                opened = os.fstat(self._fd)
+                if (current.st_ino, current.st_dev) == (opened.st_ino, opened.st_dev):
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _locked(self, shared):
+        """Блокировка файла path.lock, общая для всех процессов"""
+        if self._lock_fd is None and fcntl is not None:
+            self._lock_fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        return _file_lock(self.path + '.lock', shared=shared, fd=self._lock_fd)
+
+    def _rotation_due(self, status, pending):
+        """Нужна ли ротация файла перед записью pending байт"""
+        if status.st_size == 0:
+            return False
+        if self.max_bytes is not None and status.st_size + pending > self.max_bytes:
+            return True
+        if self.when is not None:
+            period_start = ROTATION_PERIODS[self.when]
+            return period_start(datetime.fromtimestamp(status.st_mtime)) < period_start(datetime.now())
+        return False
+
+    def _rotate(self, pending):
+        """Ротировать файл под исключительной блокировкой"""
+        with self._locked(shared=False):
+            self._rotate_locked(pending)
+
+    def _rotate_locked(self, pending):
+        """Ротировать файл (исключительная блокировка уже захвачена)"""
+        # Пока мы ждали блокировку, файл мог ротировать другой процесс
+        try:
+            due = self._rotation_due(os.stat(self.path), pending)
+        except FileNotFoundError:
+            due = False
+        if not due:
+            return
+
+        segment = _shift_segments(self.path, self.backup_count)
+        if segment is None or not self.compress:
+            return
+        # Файл открывается до снятия блокировки: следующая ротация
+        # может переименовать его, но дескриптор останется верным
+        source = open(segment, 'rb')
+
+        compressor = threading.Thread(
+            target=_compress_segment, args=(self.path, source, self.backup_count),
+            name=f'LogSink.compress({segment})', daemon=True,
+        )
+        self._compressors = [thread for thread in self._compressors if thread.is_alive()]
+        self._compressors.append(compressor)
+        compressor.start()
+
+    def _start_writer(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f'LogSink({self.path})', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            sync, self._sync_requested = self._sync_requested, False
+            try:
+                self.flush(sync=sync or None)
+            except OSError as e:
+                # Ошибка записи не должна останавливать фоновый поток
+                print(f"⚠️  Не удалось записать лог {self.path}: {e}", file=sys.stderr)
+
+
+ROTATION_PERIODS = {
+    'midnight': lambda moment: moment.replace(hour=0, minute=0, second=0, microsecond=0),
+    'hour': lambda moment: moment.replace(minute=0, second=0, microsecond=0),
+}
+
+
+@contextlib.contextmanager
+def _file_lock(path, shared=False, fd=None):
+    """
+    Блокировка flock на файле path для согласования процессов.
+
+    Args:
+        path (str): Файл блокировки (создается при необходимости)
+        shared (bool): Разделяемая блокировка вместо исключительной
+        fd (int): Уже открытый дескриптор файла блокировки
+    """
+    if fcntl is None:
+        yield
+        return
+
+    own = fd is None
+    if own:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        if own:
+            os.close(fd)
+
+
+def rotated_segment(path, index):
+    """Путь к ротированному файлу поколения index (сжатому или нет) или None"""
+    for candidate in (f'{path}.{index}', f'{path}.{index}.gz'):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _shift_segments(path, backup_count):
+    """
+    Сдвинуть поколения ротированных файлов и переименовать текущий в path.1.
+
+    Вызывается под исключительной блокировкой. Возвращает путь
+    нового ротированного файла или None, если поколения не хранятся.
+    """
+    # Удаляем последнее хранимое поколение и более старые (backup_count
+    # могли уменьшить), затем сдвигаем остальные на одно поколение
+    index = max(backup_count, 1)
+    while rotated_segment(path, index) is not None:
+        for suffix in ('', '.gz'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(f'{path}.{index}{suffix}')
+        index += 1
+
+    for index in range(backup_count - 1, 0, -1):
+        for suffix in ('', '.gz'):
+            segment = f'{path}.{index}{suffix}'
+            if os.path.exists(segment):
+                os.replace(segment, f'{path}.{index + 1}{suffix}')
+
+    if backup_count < 1:
+        os.remove(path)
+        return None
+    os.replace(path, f'{path}.1')
+    return f'{path}.1'
+
+
+def _compress_segment(path, source, backup_count):
+    """
+    Сжать ротированный файл в фоновом потоке.
+
+    Сжатие идет во временный файл без блокировки; затем под блокировкой
+    ищется текущее имя исходного файла (его могли сдвинуть следующие
+    ротации), и сжатая копия подменяет его атомарным переименованием.
+    """
+    import gzip
+    import shutil
+
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.gz.tmp'
+    try:
+        with source:
+            status = os.fstat(source.fileno())
+            with gzip.open(temporary, 'wb') as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+        # Время изменения сохраняем: по нему читатели пропускают старые файлы
+        os.utime(temporary, ns=(status.st_atime_ns, status.st_mtime_ns))
+
+        with _file_lock(path + '.lock'):
+            for index in range(1, backup_count + 1):
+                segment = f'{path}.{index}'
+                try:
+                    if os.stat(segment).st_ino != status.st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                os.replace(temporary, segment + '.gz')
+                os.remove(segment)
+                return
+        os.remove(temporary)  # Файл успел устареть и удален ротацией
+    except OSError as e:
+        print(f"⚠️  Не удалось сжать ротированный лог {path}: {e}", file=sys.stderr)
+        with contextlib.suppress(OSError):
+            os.remove(temporary)
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(path, **options):
+    """
+    Получить общий приемник для лог-файла, создав его при первом обращении.
+
+    Args:
+        path (str): Путь к файлу логов
+        **options: Параметры LogSink, применяемые при создании
+    """
+    sink = _sinks.get(path)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(path)
+            if sink is None:
+                sink = _sinks[path] = LogSink(path, **options)
+    return sink
+
+
+SINK_OPTIONS = ('batch_size', 'flush_interval', 'durable', 'max_bytes', 'when',
+                'backup_count', 'compress', 'process_safe')
+
+
+def configure_sink(path, **options):
+    """
+    Изменить параметры приемника (например, включить durable для аудита).
+
+    Args:
+        path (str): Путь к файлу логов
+        **options: batch_size, flush_interval, durable, max_bytes, when,
+            backup_count, compress, process_safe
+    """
+    sink = get_sink(path)
+    sink.flush()
+    for name, value in options.items():
+        if name not in SINK_OPTIONS:
+            raise TypeError(f"Неизвестный параметр приемника: {name}")
+        if name == 'when' and value is not None and value not in ROTATION_PERIODS:
+            raise ValueError(f"Неизвестный период ротации: {value}; допустимы {', '.join(ROTATION_PERIODS)}")
+        setattr(sink, name, value)
+    return sink
+
+
+def flush_logs(path=None):
+    """
+    Принудительно записать буферизованные логи на диск.
+
+    Args:
+        path (str): Путь к файлу логов; по умолчанию - все файлы
+    """
+    if path is None:
+        sinks = list(_sinks.values())
+    else:
+        sinks = [_sinks[path]] if path in _sinks else []
+
+    for sink in sinks:
+        sink.flush()
+
+
+def close_logs(path=None):
+    """
+    Сбросить и закрыть приемники логов (вызывается при выходе).
+
+    Args:
+        path (str): Путь к файлу логов; по умолчанию - все файлы
+    """
+    with _sinks_lock:
+        if path is None:
+            sinks = list(_sinks.values())
+            _sinks.clear()
+        else:
+            sink = _sinks.pop(path, None)
+            sinks = [sink] if sink is not None else []
+
+    for sink in sinks:
+        sink.close()
+
+
+def _reset_after_fork():
+    """
+    Сбросить приемники в дочернем процессе после fork.
+
+    Фоновые потоки родителя в дочерний процесс не копируются, а их
+    блокировки могли остаться захваченными, поэтому дочерний процесс
+    получает новые приемники с теми же настройками (ротация, process_safe)
+    и пустыми буферами. Записи из буферов родителя запишет сам родитель.
+    """
+    global _sinks, _sinks_lock
+    _sinks = {path: LogSink(path, **sink.options()) for path, sink in _sinks.items()}
+    _sinks_lock = threading.Lock()
+    metrics.reinit_locks()
+
+
+atexit.register(close_logs)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class RecordFormatter:
+    """
+    Отложенное форматирование записей лога в текст.
+
+    Вызывается приемником в фоновом потоке, поэтому стоимость str()
+    аргументов и результата не ложится на вызывающий код.
+
+    Args:
+        max_length (int): Предельная длина текста аргументов и результата
+        log_result (bool): Записывать ли возвращаемое значение
+        redact (callable): Функция (args, kwargs, result) -> (args, kwargs, result)
+            для маскировки данных перед записью
+    """
+
+    def __init__(self, max_length=None, log_result=True, redact=None):
+        self.max_length = max_length
+        self.log_result = log_result
+        self.redact = redact
+
+    def render(self, record):
+        """Сформировать строку лога для записи LogRecord"""
+        args, kwargs, result = record.args, record.kwargs, record.result
+        if self.redact is not None:
+            args, kwargs, result = self.redact(args, kwargs, result)
+
+        # Формируем строку с аргументами
+        parts = [str(arg) for arg in args]
+        parts.extend(f'{k}={v}' for k, v in kwargs.items())
+        args_combined = self._shorten(', '.join(parts))
+
+        if record.error is not None:
+            outcome = self._shorten(f'{type(record.error).__name__}: {record.error}')
+        else:
+            outcome = self._shorten(str(result)) if self.log_result else '...'
+
+        line = (
+            f"{_format_timestamp(record.timestamp)} | "
+            f"{record.status} | {record.func.__name__}({args_combined}) -> {outcome} | "
+            f"Время: {format_duration(record.duration_ns)}"
+        )
+        if record.cpu_ns is not None:
+            line += f" | CPU: {format_duration(record.cpu_ns)}"
+        return line + '\n'
+
+    def _shorten(self, text):
+        if self.max_length is None or len(text) <= self.max_length:
+            return text
+        return f'{text[:self.max_length]}... [+{len(text) - self.max_length} симв.]'
+
+
+class JsonRecordFormatter(RecordFormatter):
+    """
+    Форматирование записей в JSON Lines: одна запись - один объект JSON.
+
+    Поля: ts (время Unix, с), func, status, duration_ns, cpu_ns (если
+    измерялось), args, kwargs, result или error ({type, message}).
+    Значения, которые JSON не поддерживает, записываются как текст
+    (словареподобные объекты - как словари, множества - как списки).
+    """
+
+    def __init__(self, max_length=None, log_result=True, redact=None):
+        super().__init__(max_length, log_result, redact)
+        import json  # только если выбран формат JSON или двоичный
+        self._json_dumps = json.dumps
+
+    def render(self, record):
+        """Сформировать строку JSON для записи LogRecord"""
+        document = {
+            'ts': record.timestamp,
+            'func': record.func.__name__,
+            'status': record.status,
+            'duration_ns': record.duration_ns,
+        }
+        if record.cpu_ns is not None:
+            document['cpu_ns'] = record.cpu_ns
+        document.update(self.payload(record))
+        return self.dumps(document) + '\n'
+
+    def payload(self, record):
+        """Аргументы, результат и ошибка записи после маскировки"""
+        args, kwargs, result = record.args, record.kwargs, record.result
+        if self.redact is not None:
+            args, kwargs, result = self.redact(args, kwargs, result)
+
+        payload = {'args': list(args), 'kwargs': kwargs}
+        if record.error is not None:
+            payload['error'] = {
+                'type': type(record.error).__name__,
+                'message': self._shorten(str(record.error)),
+            }
+        elif self.log_result:
+            payload['result'] = result
+        return payload
+
+    def dumps(self, value):
+        return self._json_dumps(value, ensure_ascii=False, separators=(',', ':'), default=self._to_json)
+
+    def _to_json(self, value):
+        if isinstance(value, Mapping):
+            return dict(value)
+        if isinstance(value, (set, frozenset)):
+            return list(value)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return self._shorten(str(value))
+
+
+# Двоичный формат записи: заголовок фиксированной длины и тело.
+# Заголовок: байт синхронизации, версия, статус, флаги, длина тела,
+# CRC32 тела, время (с), длительность (нс), CPU-время (нс, -1 - нет),
+# длина имени функции. Тело: имя функции в UTF-8 и JSON-массив с
+# аргументами и результатом или ошибкой. Фильтровать по заголовку можно,
+# не разбирая JSON.
+BINARY_SYNC = 0xA5
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<BBBBIIdqqH')
+BINARY_STATUSES = ('SUCCESS', 'ERROR', 'CACHE_HIT')
+BINARY_FLAG_CPU = 0x01
+
+
+class BinaryRecordFormatter(JsonRecordFormatter):
+    """
+    Компактный двоичный формат записей с префиксом длины.
+
+    Байт синхронизации 0xA5 не встречается в начале текстовой строки
+    UTF-8, поэтому читатель может отличить двоичные записи от текстовых
+    в одном файле, а CRC32 позволяет пропустить оборванную запись.
+    """
+
+    _status_codes = {status: code for code, status in enumerate(BINARY_STATUSES)}
+
+    def __init__(self, max_length=None, log_result=True, redact=None):
+        super().__init__(max_length, log_result, redact)
+        import zlib
+        self._crc32 = zlib.crc32
+
+    def render(self, record):
+        """Сформировать двоичную запись для LogRecord"""
+        # Тело без имен полей: [args, kwargs, result] для успешного вызова
+        # (result нет, если он не записывается), [args, kwargs, type, message]
+        # для ошибки; статус хранится в заголовке
+        payload = self.payload(record)
+        values = [payload['args'], payload['kwargs']]
+        if 'error' in payload:
+            values.extend(payload['error'].values())
+        elif 'result' in payload:
+            values.append(payload['result'])
+
+        name = record.func.__name__.encode('utf-8')
+        body = name + self.dumps(values).encode('utf-8')
+        cpu_ns = record.cpu_ns
+        return BINARY_HEADER.pack(
+            BINARY_SYNC, BINARY_VERSION, self._status_codes[record.status],
+            BINARY_FLAG_CPU if cpu_ns is not None else 0,
+            len(body), self._crc32(body), record.timestamp, record.duration_ns,
+            cpu_ns if cpu_ns is not None else -1, len(name),
+        ) + body
+
+
+FORMATTERS = {
+    'text': RecordFormatter,
+    'jsonl': JsonRecordFormatter,
+    'binary': BinaryRecordFormatter,
+}
+
+
+DEFAULT_FORMATTER = RecordFormatter()
+
+_last_timestamp = [None, '']
+
+
+def _format_timestamp(timestamp):
+    """Форматировать время записи с кэшированием в пределах одной секунды"""
+    second = int(timestamp)
+    cached_second, text = _last_timestamp
+    if second != cached_second:
+        text = datetime.fromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S')
+        _last_timestamp[:] = [second, text]
+    return text
+
+
+class LogRecord:
+    """
+    Легковесная запись о вызове функции.
+
+    Хранит только ссылки на данные вызова; преобразование в текст
+    выполняется позже, при записи в файл.
+    """
+
+    __slots__ = ('timestamp', 'func', 'args', 'kwargs', 'result', 'error',
+                 'duration_ns', 'cpu_ns', 'formatter', 'cache_hit')
+
+    def __init__(self, timestamp, func, args, kwargs, result, error, duration_ns,
+                 cpu_ns=None, formatter=DEFAULT_FORMATTER, cache_hit=False):
+        self.timestamp = timestamp
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.result = result
+        self.error = error
+        self.duration_ns = duration_ns
+        self.cpu_ns = cpu_ns
+        self.formatter = formatter
+        self.cache_hit = cache_hit
+
+    @property
+    def status(self):
+        """Статус записи: ERROR, CACHE_HIT или SUCCESS"""
+        if self.error is not None:
+            return 'ERROR'
+        return 'CACHE_HIT' if self.cache_hit else 'SUCCESS'
+
+    def render(self):
+        """Преобразовать запись в строку лога (или байты двоичного формата)"""
+        try:
+            return self.formatter.render(self)
+        except Exception as e:
+            # Ошибка форматирования не должна останавливать запись остальных
+            return (
+                f"{_format_timestamp(self.timestamp)} | ERROR | "
+                f"{getattr(self.func, '__name__', self.func)}(...) -> "
+                f"не удалось сформировать запись: {type(e).__name__}: {e} | "
+                f"Время: {format_duration(self.duration_ns)}\n"
+            )
+
+
+class Sampler:
+    """
+    Решение о том, записывать ли очередной вызов функции.
+
+    Поддерживает запись 1 из N вызовов, вероятностную выборку и ограничение
+    частоты (token bucket). Решение принимается до вызова функции и до любого
+    форматирования, поэтому пропущенные вызовы почти ничего не стоят.
+    Ошибки и медленные вызовы могут записываться всегда.
+
+    Счетчики emitted/dropped позволяют экстраполировать выборку
+    на полное число вызовов.
+
+    Args:
+        every (int): Записывать каждый N-й вызов
+        probability (float): Вероятность записи вызова (0..1)
+        rate (float): Не больше rate записей в секунду
+        burst (int): Емкость token bucket (по умолчанию - max(1, rate))
+        always_errors (bool): Всегда записывать вызовы с исключением
+        slow_threshold (float): Всегда записывать вызовы дольше порога (с)
+    """
+
+    def __init__(self, every=None, probability=None, rate=None, burst=None,
+                 always_errors=True, slow_threshold=None):
+        if every is not None and every < 1:
+            raise ValueError("Параметр every должен быть не меньше 1")
+        if probability is not None and not 0.0 <= probability <= 1.0:
+            raise ValueError("Вероятность должна быть в диапазоне от 0 до 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("Частота записи должна быть положительной")
+
+        self.every = every
+        self.probability = probability
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 0.0)
+        self.always_errors = always_errors
+        self.slow_threshold = slow_threshold
+        self._slow_ns = None if slow_threshold is None else int(slow_threshold * 1e9)
+        self.emitted = 0
+        self.dropped = 0
+        self._calls = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def watches_outliers(self):
+        """Нужно ли измерять невыбранные вызовы, чтобы поймать ошибки и медленные"""
+        return self.always_errors or self.slow_threshold is not None
+
+    def sample(self):
+        """Принять решение о записи вызова (до его выполнения)"""
+        with self._lock:
+            self._calls += 1
+            if self.every is not None and self._calls % self.every:
+                return False
+            if self.probability is not None and random.random() >= self.probability:
+                return False
+            if self.rate is not None:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+                self._refilled_at = now
+                if self._tokens < 1.0:
+                    return False
+                self._tokens -= 1.0
+            return True
+
+    def is_outlier(self, error, duration_ns):
+        """Проверить, нужно ли записать невыбранный вызов как ошибку или медленный"""
+        if error is not None:
+            return self.always_errors
+        return self._slow_ns is not None and duration_ns >= self._slow_ns
+
+    def count(self, emitted):
+        """Учесть итоговое решение по вызову в счетчиках"""
+        with self._lock:
+            if emitted:
+                self.emitted += 1
+            else:
+                self.dropped += 1
+
+    def stats(self):
+        """
+        Получить счетчики выборки.
+
+        Returns:
+            dict: emitted, dropped, total и scale - множитель для экстраполяции
+            количества записанных событий на все вызовы
+        """
+        with self._lock:
+            emitted, dropped = self.emitted, self.dropped
+        total = emitted + dropped
+        return {
+            'emitted': emitted,
+            'dropped': dropped,
+            'total': total,
+            'scale': total / emitted if emitted else 0.0,
+        }
+
+
+def _make_sampler(sample_every=None, sample_probability=None, rate_limit=None,
+                  burst=None, always_log_errors=True, slow_threshold=None):
+    """Создать Sampler для функции или None, если выборка не настроена"""
+    if sample_every is None and sample_probability is None and rate_limit is None:
+        return None
+    return Sampler(sample_every, sample_probability, rate_limit, burst,
+                   always_log_errors, slow_threshold)
+
+
+def logger(path_or_function=None, durable=False, max_length=None,
+           log_result=True, redact=None, snapshot=False, sample_every=None,
+           sample_probability=None, rate_limit=None, burst=None,
+           always_log_errors=True, slow_threshold=None, cpu_time=None,
+           log_format='text'):
+    """
+    Универсальный декоратор логирования.
+    Может использоваться как простой декоратор (@logger)
+    или как параметризованный (@logger('path/to/file.log'))
+
+    Записи передаются в общий буферизованный приемник LogSink,
+    поэтому обернутая функция не открывает файл на каждый вызов.
+    На горячем пути сохраняются только ссылки на аргументы и результат,
+    а форматирование в текст выполняется фоновым потоком приемника.
+    Корутины и асинхронные генераторы получают асинхронную обертку,
+    которая измеряет их выполнение и не блокирует цикл событий записью.
+
+    Args:
+        path_or_function: Путь к файлу логов или декорируемая функция
+        durable (bool): Писать каждую запись синхронно с fsync (режим аудита)
+        max_length (int): Обрезать текст аргументов и результата до этой длины
+        log_result (bool): Записывать ли возвращаемое значение
+        redact (callable): Маскировка (args, kwargs, result) перед записью
+        snapshot (bool): Сохранять глубокую копию аргументов и результата,
+            если функция или вызывающий код изменяют их после вызова
+        sample_every (int): Записывать только каждый N-й вызов
+        sample_probability (float): Записывать вызов с заданной вероятностью
+        rate_limit (float): Не больше rate_limit записей в секунду на функцию
+        burst (int): Допустимый всплеск записей при rate_limit
+        always_log_errors (bool): При выборке всегда записывать ошибки
+        slow_threshold (float): При выборке всегда записывать вызовы дольше порога (с)
+        cpu_time (str): Дополнительно записывать CPU-время: 'process' или 'thread'
+        log_format (str): Формат записей: 'text' (по умолчанию), 'jsonl'
+            или 'binary'; прочитать структурированные записи можно
+            модулем log_reader
+
+    При включенной выборке у обертки есть атрибут sampler со счетчиками
+    записанных и пропущенных вызовов.
+    """
+    # Определяем путь к файлу логов
+    if isinstance(path_or_function, str):
+        log_path = path_or_function
+    else:
+        log_path = DEFAULT_LOG_PATH
+
+    if log_format not in FORMATTERS:
+        raise ValueError(f"Неизвестный формат лога: {log_format}; допустимы {', '.join(FORMATTERS)}")
+    if log_format == 'text' and max_length is None and log_result and redact is None:
+        formatter = DEFAULT_FORMATTER
+    else:
+        formatter = FORMATTERS[log_format](max_length, log_result, redact)
+
+    sampling = dict(sample_every=sample_every, sample_probability=sample_probability,
+                    rate_limit=rate_limit, burst=burst,
+                    always_log_errors=always_log_errors, slow_threshold=slow_threshold)
+
+    cpu_clock = get_cpu_clock(cpu_time)
+
+    def decorator(func):
+        return _attach(func, 'log', lambda target: _LogStage(
+            target, log_path, durable, formatter, snapshot, sampling, cpu_clock))
+
+    # Проверяем, использован ли декоратор без параметров
+    if callable(path_or_function):
+        return decorator(path_or_function)
+    else:
+        return decorator
+
+
+class _LogStage:
+    """
+    Часть обертки, которая записывает вызовы в лог (см. logger).
+
+    Решение о выборке принимается в decide() до вызова функции,
+    запись формируется в emit() после него. Используется и объединенной
+    оберткой, и отдельным слоем для корутин через begin()/finish().
+    """
+
+    def __init__(self, func, log_path, durable, formatter, snapshot, sampling, cpu_clock):
+        self.func = func
+        self.log_path = log_path
+        self.durable = durable
+        self.formatter = formatter
+        self.snapshot = snapshot
+        self.sampler = _make_sampler(**sampling)
+        self.cpu_clock = cpu_clock
+        self.set_level(INSTRUMENT_ON)
+        # Если под логгером есть кэш, попадания в него отмечаются как CACHE_HIT
+        self.cache_layers = tuple(cache for layer in _wrapped_chain(func)
+                                  for cache in (getattr(layer, 'result_cache', None),
+                                                getattr(layer, 'persistent_cache', None))
+                                  if cache is not None)
+
+    def set_level(self, level):
+        """Уровень инструментирования (см. InstrumentationConfig)"""
+        self.level = level
+        # Решение для объединенной обертки без вызова decide(), если оно известно
+        if level == INSTRUMENT_OFF:
+            self.mode = None
+        elif level == INSTRUMENT_ON and self.sampler is None:
+            self.mode = True
+        else:
+            self.mode = _DECIDE
+
+    def decide(self):
+        """Решение о записи вызова: True, False (только выбросы) или None - не измерять"""
+        if self.level != INSTRUMENT_ON:
+            return None if self.level == INSTRUMENT_OFF else False
+        sampler = self.sampler
+        if sampler is None:
+            return True
+        sampled = sampler.sample()
+        if not sampled and not sampler.watches_outliers:
+            sampler.count(False)
+            return None
+        return sampled
+
+    def emit(self, sampled, start_time, args, kwargs, result, error, duration_ns,
+             cpu_ns, cache_hit, blocking):
+        """
+        Записать измеренный вызов, если он выбран или оказался выбросом.
+
+        cache_hit=None означает, что попадание в кэш нужно определить
+        по отметке кэша, расположенного под логгером.
+        """
+        if sampled:
+            keep = True
+        elif self.level == INSTRUMENT_ON:
+            keep = self.sampler.is_outlier(error, duration_ns)
+        else:
+            keep = error is not None
+        if keep:
+            if cache_hit is None:
+                cache_hit = (bool(self.cache_layers)
+                             and getattr(_call_state, 'cache_hit', None) in self.cache_layers)
+            record = LogRecord(start_time, self.func, args, kwargs, result, error,
+                               duration_ns, cpu_ns, self.formatter, cache_hit)
+            get_sink(self.log_path).emit(_snapshot(record) if self.snapshot else record,
+                                         self.durable, blocking)
+        if self.sampler is not None:
+            self.sampler.count(keep)
+
+    def begin(self):
+        """Начало вызова для _instrument: состояние вызова или None"""
+        sampled = self.decide()
+        if sampled is None:
+            return None
+        cpu_clock = self.cpu_clock
+        # Получаем время начала выполнения
+        return (sampled, time.time(),
+                cpu_clock() if cpu_clock is not None else 0, wall_clock_ns())
+
+    def finish(self, call, args, kwargs, result, error, blocking):
+        """Завершение вызова для _instrument"""
+        sampled, start_time, cpu_started, started = call
+        duration_ns = wall_clock_ns() - started
+        cpu_ns = self.cpu_clock() - cpu_started if self.cpu_clock is not None else None
+        self.emit(sampled, start_time, args, kwargs, result, error, duration_ns,
+                  cpu_ns, None, blocking)
+
+
+# Флаги байткода корутины и асинхронного генератора (inspect.CO_COROUTINE,
+# inspect.CO_ASYNC_GENERATOR): при декорировании inspect не импортируется
+_CO_COROUTINE = 0x80
+_CO_ASYNC_GENERATOR = 0x200
+
+
+def _code_flags(func):
+    """Флаги байткода функции, как их проверяет inspect (0 - не функция Python)"""
+    while isinstance(func, MethodType):
+        func = func.__func__
+    while isinstance(func, partial):
+        func = func.func
+    return func.__code__.co_flags if isinstance(func, FunctionType) else 0
+
+
+def _is_coroutine_function(func):
+    """То же, что inspect.iscoroutinefunction"""
+    return bool(_code_flags(func) & _CO_COROUTINE)
+
+
+def _is_async_generator_function(func):
+    """То же, что inspect.isasyncgenfunction"""
+    return bool(_code_flags(func) & _CO_ASYNC_GENERATOR)
+
+
+def _instrument(func, begin, finish):
+    """
+    Построить обертку с измерением вызова подходящего вида.
+
+    Для обычных функций обертка синхронная, для корутин - асинхронная
+    (измеряется выполнение, а не создание корутины), для асинхронных
+    генераторов - асинхронный генератор (измеряется полный проход,
+    результатом считается число выданных элементов).
+
+    Args:
+        func (callable): Декорируемая функция
+        begin (callable): begin() -> состояние вызова или None, если вызов
+            не нужно измерять
+        finish (callable): finish(call, args, kwargs, result, error, blocking);
+            blocking=False означает, что нельзя блокировать цикл событий
+    """
+    if _is_async_generator_function(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            call = begin()
+            if call is None:
+                async for item in func(*args, **kwargs):
+                    yield item
+                return
+
+            items = 0
+            error = None
+            try:
+                async for item in func(*args, **kwargs):
+                    items += 1
+                    yield item
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                finish(call, args, kwargs, f'<{items} элементов>', error, False)
+
+    elif _is_coroutine_function(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            call = begin()
+            if call is None:
+                return await func(*args, **kwargs)
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                finish(call, args, kwargs, None, e, False)
+                raise
+            finish(call, args, kwargs, result, None, False)
+            return result
+
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            call = begin()
+            if call is None:
+                return func(*args, **kwargs)
+
+            try:
+                # Вызываем оригинальную функцию
+                result = func(*args, **kwargs)
+            except Exception as e:
+                # Фиксируем ошибку и перебрасываем исключение
+                finish(call, args, kwargs, None, e, True)
+                raise
+            finish(call, args, kwargs, result, None, True)
+            return result
+
+    return wrapper
+
+
+def _wrapped_chain(func):
+    """Все слои декораторов функции по цепочке __wrapped__ (включая ее саму)"""
+    chain = []
+    while func is not None and func not in chain:
+        chain.append(func)
+        func = getattr(func, '__wrapped__', None)
+    return chain
+
+
+def _snapshot(record):
+    """Заменить ссылки в записи на глубокие копии (если это возможно)"""
+    try:
+        record.args, record.kwargs, record.result = copy.deepcopy(
+            (record.args, record.kwargs, record.result)
+        )
+    except Exception:
+        # Некопируемые объекты записываем как есть
+        pass
+    return record
+
+
+# Точность гистограммы: 2**6 под-корзин на каждую степень двойки,
+# относительная погрешность значения корзины не превышает 1/32 (~3%)
+_SUB_BUCKET_BITS = 6
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT // 2
+_BUCKET_COUNT = (63 - _SUB_BUCKET_BITS + 1) * _SUB_BUCKET_HALF + _SUB_BUCKET_COUNT
+
+
+def _bucket_index(value):
+    """Номер корзины для значения (лог-линейная схема, как в HdrHistogram)"""
+    if value < _SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - _SUB_BUCKET_BITS
+    return shift * _SUB_BUCKET_HALF + (value >> shift)
+
+
+def _bucket_bounds(index):
+    """Нижняя и верхняя граница значений корзины"""
+    if index < _SUB_BUCKET_COUNT:
+        return index, index
+    shift = index // _SUB_BUCKET_HALF - 1
+    mantissa = index - shift * _SUB_BUCKET_HALF
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Гистограмма длительностей вызовов фиксированного размера.
+
+    Значения (в наносекундах) раскладываются по логарифмическим корзинам,
+    поэтому память не растет с числом вызовов, а перцентили вычисляются
+    с относительной погрешностью не более ~3%. Гистограммы можно объединять.
+    """
+
+    def __init__(self):
+        self._counts = [0] * _BUCKET_COUNT
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, value_ns):
+        """Учесть одно измерение в наносекундах"""
+        value_ns = max(0, min(int(value_ns), (1 << 63) - 1))
+        index = _bucket_index(value_ns)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ns += value_ns
+            if value_ns > self.max_ns:
+                self.max_ns = value_ns
+            if self.min_ns is None or value_ns < self.min_ns:
+                self.min_ns = value_ns
+
+    def merge(self, other):
+        """Добавить к гистограмме измерения другой гистограммы"""
+        other = other.copy()
+        with self._lock:
+            for index, value in enumerate(other._counts):
+                if value:
+                    self._counts[index] += value
+            self.count += other.count
+            self.total_ns += other.total_ns
+            self.max_ns = max(self.max_ns, other.max_ns)
+            if other.min_ns is not None:
+                self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        return self
+
+    def copy(self, reset=False):
+        """
+        Получить независимую копию гистограммы.
+
+        Args:
+            reset (bool): Атомарно обнулить исходную гистограмму
+        """
+        clone = LatencyHistogram()
+        with self._lock:
+            clone._counts = self._counts[:]
+            clone.count, clone.total_ns = self.count, self.total_ns
+            clone.min_ns, clone.max_ns = self.min_ns, self.max_ns
+            if reset:
+                self._reset_unlocked()
+        return clone
+
+    def reset(self):
+        """Обнулить все измерения"""
+        with self._lock:
+            self._reset_unlocked()
+
+    def _reset_unlocked(self):
+        self._counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def percentile(self, percent):
+        """
+        Значение перцентиля в наносекундах.
+
+        Args:
+            percent (float): Перцентиль от 0 до 100
+        """
+        with self._lock:
+            if not self.count:
+                return 0
+            rank = max(1, math.ceil(self.count * percent / 100))
+            seen = 0
+            for index, value in enumerate(self._counts):
+                seen += value
+                if seen >= rank:
+                    low, high = _bucket_bounds(index)
+                    middle = (low + high) // 2
+                    return min(max(middle, self.min_ns), self.max_ns)
+            return self.max_ns
+
+    def summary(self):
+        """
+        Сводка по гистограмме.
+
+        Returns:
+            dict: count, mean, p50, p90, p99, p999, min и max (в наносекундах)
+        """
+        # Считаем по копии, чтобы все значения относились к одному моменту
+        frozen = self.copy()
+        count = frozen.count
+        return {
+            'count': count,
+            'mean': frozen.total_ns / count if count else 0.0,
+            'p50': frozen.percentile(50),
+            'p90': frozen.percentile(90),
+            'p99': frozen.percentile(99),
+            'p999': frozen.percentile(99.9),
+            'min': frozen.min_ns or 0,
+            'max': frozen.max_ns,
+        }
+
+
+class MetricsRegistry:
+    """
+    Реестр гистограмм длительностей по именам функций.
+
+    Поддерживает снимки всех метрик и снимки за временное окно:
+    snapshot(reset=True) возвращает данные с начала окна и начинает новое.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.window_started_at = time.time()
+
+    def reinit_locks(self):
+        """Пересоздать блокировки (в дочернем процессе после fork)"""
+        self._lock = threading.Lock()
+        for histogram in self._histograms.values():
+            histogram._lock = threading.Lock()
+
+    def histogram(self, name):
+        """Получить (или создать) гистограмму по имени"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def names(self):
+        """Имена зарегистрированных метрик"""
+        return sorted(self._histograms)
+
+    def summary(self, name):
+        """Сводка count/mean/перцентили/max по одной метрике"""
+        return self.histogram(name).summary()
+
+    def snapshot(self, reset=False):
+        """
+        Снимок всех метрик.
+
+        Args:
+            reset (bool): Обнулить метрики и начать новое временное окно
+
+        Returns:
+            dict: started_at, ended_at и metrics - сводки по именам функций
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+            started_at = self.window_started_at
+            ended_at = time.time()
+            if reset:
+                self.window_started_at = ended_at
+
+        return {
+            'started_at': started_at,
+            'ended_at': ended_at,
+            'metrics': {
+                name: histogram.copy(reset=reset).summary()
+                for name, histogram in sorted(histograms.items())
+            },
+        }
+
+    def reset(self, name=None):
+        """
+        Обнулить метрики.
+
+        Args:
+            name (str): Имя метрики; по умолчанию - все метрики
+        """
+        with self._lock:
+            if name is None:
+                histograms = list(self._histograms.values())
+                self.window_started_at = time.time()
+            else:
+                histogram = self._histograms.get(name)
+                histograms = [histogram] if histogram is not None else []
+
+        for histogram in histograms:
+            histogram.reset()
+
+
+# Общий реестр метрик, который наполняет performance_monitor
+metrics = MetricsRegistry()
+
+
+def metric_name(func):
+    """Имя метрики для функции: модуль и квалифицированное имя"""
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def performance_monitor(func=None, threshold=1.0, sample_every=None,
+                        sample_probability=None, rate_limit=None, burst=None,
+                        cpu_time=None, registry=metrics):
+    """
+    Декоратор для мониторинга производительности функций.
+    Может использоваться как @performance_monitor
+    или с параметрами: @performance_monitor(threshold=0.5, sample_every=100)
+
+    Args:
+        threshold (float): Порог (с), после которого выводится предупреждение
+        sample_every (int): Измерять только каждый N-й вызов
+        sample_probability (float): Измерять вызов с заданной вероятностью
+        rate_limit (float): Не больше rate_limit измерений в секунду
+        burst (int): Допустимый всплеск измерений при rate_limit
+        cpu_time (str): Показывать также CPU-время: 'process' или 'thread'
+        registry (MetricsRegistry): Реестр, куда записываются длительности
+            (None - не накапливать гистограмму)
+
+    Каждое измерение попадает в гистограмму функции в реестре metrics,
+    откуда доступны count, mean, p50/p90/p99/p999 и max. Для корутин
+    и асинхронных генераторов измеряется их фактическое выполнение.
+    При включенной выборке у обертки есть атрибут sampler со счетчиками.
+    """
+    threshold_ns = int(threshold * 1e9)
+    cpu_clock = get_cpu_clock(cpu_time)
+    sampling = (sample_every, sample_probability, rate_limit, burst)
+
+    def decorator(func):
+        return _attach(func, 'monitor', lambda target: _MonitorStage(
+            target, threshold_ns, sampling, cpu_clock, registry))
+
+    # Проверяем, использован ли декоратор без параметров
+    if callable(func):
+        return decorator(func)
+    else:
+        return decorator
+
+
+class _MonitorStage:
+    """
+    Часть обертки, которая измеряет выполнение функции (см. performance_monitor).
+
+    Решение о выборке принимается в decide(), измеренная длительность
+    передается в observe(). Для корутин используется через begin()/finish().
+    """
+
+    def __init__(self, func, threshold_ns, sampling, cpu_clock, registry):
+        self.func = func
+        self.threshold_ns = threshold_ns
+        self.sampler = _make_sampler(*sampling, always_log_errors=False)
+        self.cpu_clock = cpu_clock
+        self.histogram = registry.histogram(metric_name(func)) if registry is not None else None
+        self.set_level(INSTRUMENT_ON)
+
+    def set_level(self, level):
+        """Уровень инструментирования (см. InstrumentationConfig)"""
+        self.level = level
+        if level == INSTRUMENT_OFF:
+            self.mode = False
+        else:
+            self.mode = True if self.sampler is None else _DECIDE
+
+    def decide(self):
+        """Решение об измерении вызова"""
+        if self.level == INSTRUMENT_OFF:
+            return False
+        sampler = self.sampler
+        if sampler is None:
+            return True
+        sampled = sampler.sample()
+        sampler.count(sampled)
+        return sampled
+
+    def observe(self, execution_ns, cpu_ns):
+        """Учесть длительность в гистограмме и предупредить о медленном вызове"""
+        if self.histogram is not None:
+            self.histogram.record(execution_ns)
+
+        if execution_ns > self.threshold_ns:  # Если функция выполнялась дольше порога
+            # Через консоль пакета: действуют ACCOUNTING_CONSOLE и буферизация
+            from application.console import console
+
+            message = "⚠️  МЕДЛЕННОЕ ВЫПОЛНЕНИЕ: {} заняла {:.2f} секунд"
+            if cpu_ns is not None:
+                message += f" (CPU: {cpu_ns / 1e9:.2f} с)"
+            console.info(message, self.func.__name__, execution_ns / 1e9)
+
+    def begin(self):
+        """Начало вызова для _instrument: состояние вызова или None"""
+        if not self.decide():
+            return None
+        return (self.cpu_clock() if self.cpu_clock is not None else 0), wall_clock_ns()
+
+    def finish(self, call, args, kwargs, result, error, blocking):
+        """Завершение вызова для _instrument"""
+        cpu_started, started = call
+        execution_ns = wall_clock_ns() - started
+        self.observe(execution_ns,
+                     self.cpu_clock() - cpu_started if self.cpu_clock is not None else None)
+
+
+ArgumentSlot = namedtuple('ArgumentSlot', 'number name expected check')
+
+
+def _compile_type(expected):
+    """
+    Преобразовать описание типа в проверку.
+
+    Возвращает класс или кортеж классов, если достаточно isinstance,
+    иначе функцию-предикат (для tuple[...] с типами элементов).
+    Поддерживаются классы, None, Any, Optional/Union (и X | Y),
+    tuple[X, Y], tuple[X, ...] и прочие обобщенные типы вида list[X]
+    (для них проверяется только сам контейнер).
+    """
+    import typing
+
+    if expected is None:
+        return NoneType
+    if expected is typing.Any:
+        return object
+
+    origin = typing.get_origin(expected)
+    if origin is typing.Union or origin is UnionType:
+        return _compile_alternatives(typing.get_args(expected))
+    if origin is tuple:
+        return _compile_tuple(typing.get_args(expected))
+    if origin is not None and isinstance(origin, type):
+        return origin
+
+    if isinstance(expected, tuple):
+        return _compile_alternatives(expected)
+    if isinstance(expected, type):
+        return expected
+    raise TypeError(f"Неподдерживаемое описание типа: {expected!r}")
+
+
+def _compile_alternatives(alternatives):
+    """Проверка для объединения типов: любой из вариантов"""
+    checks = [_compile_type(alternative) for alternative in alternatives]
+    if all(isinstance(check, (type, tuple)) for check in checks):
+        classes = []
+        for check in checks:
+            classes.extend(check if isinstance(check, tuple) else (check,))
+        return tuple(classes)
+    return lambda value: any(_matches(check, value) for check in checks)
+
+
+def _compile_tuple(items):
+    """Проверка для tuple[X, Y] и tuple[X, ...]"""
+    if not items:
+        return tuple
+    if items == ((),):  # tuple[()] - пустой кортеж
+        return lambda value: isinstance(value, tuple) and not value
+    if len(items) == 2 and items[1] is Ellipsis:
+        check = _compile_type(items[0])
+        return lambda value: (isinstance(value, tuple)
+                              and all(_matches(check, item) for item in value))
+    checks = [_compile_type(item) for item in items]
+    return lambda value: (isinstance(value, tuple) and len(value) == len(checks)
+                          and all(map(_matches, checks, value)))
+
+
+def _matches(check, value):
+    """Проверить значение скомпилированной проверкой"""
+    if isinstance(check, (type, tuple)):
+        return isinstance(value, check)
+    return check(value)
+
+
+def _type_name(expected):
+    """Имя типа для сообщения об ошибке"""
+    import typing
+
+    if isinstance(expected, type) and typing.get_origin(expected) is None:
+        return expected.__name__
+    if isinstance(expected, tuple):
+        return ' | '.join(_type_name(item) for item in expected)
+    return repr(expected).replace('typing.', '')
+
+
+class ArgumentChecker:
+    """
+    Проверка типов аргументов, привязанная к сигнатуре функции.
+
+    Типы сопоставляются с параметрами один раз при декорировании, а для
+    каждой формы вызова (число позиционных аргументов и имена переданных
+    по имени) один раз собирается и кэшируется специализированная
+    проверка. Параметры, оставленные по умолчанию, не проверяются.
+
+    Args:
+        func (callable): Проверяемая функция
+        types (tuple): Типы позиционных параметров по порядку
+        named_types (dict): Типы параметров по имени (в т.ч. keyword-only)
+    """
+
+    # Ограничение числа кэшированных планов для функций с **kwargs
+    MAX_PLANS = 256
+
+    def __init__(self, func, types, named_types=None):
+        import inspect  # сигнатура нужна только при декорировании
+
+        self.func_name = getattr(func, '__name__', repr(func))
+        try:
+            parameters = list(inspect.signature(func).parameters.values())
+        except (TypeError, ValueError):  # Встроенные функции без сигнатуры
+            parameters = None
+
+        if parameters is None:
+            if named_types:
+                raise TypeError(f"Сигнатура функции {self.func_name} недоступна, типы по имени не применимы")
+            self._positional = [self._slot(index, None, expected) for index, expected in enumerate(types)]
+            self._by_name = {}
+        else:
+            positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+            variadic = next((p for p in parameters if p.kind is p.VAR_POSITIONAL), None)
+            if len(types) > len(positional) and variadic is None:
+                raise TypeError(
+                    f"Для функции {self.func_name} указано типов: {len(types)}, "
+                    f"а позиционных параметров: {len(positional)}"
+                )
+
+            numbers = {p.name: index for index, p in enumerate(parameters)}
+            accepts_any = any(p.kind is p.VAR_KEYWORD for p in parameters)
+            for name in named_types or ():
+                if name not in numbers and not accepts_any:
+                    raise TypeError(f"У функции {self.func_name} нет параметра {name}")
+
+            expected_by_name = dict(zip((p.name for p in positional), types))
+            expected_by_name.update(named_types or {})
+            slots = {name: self._slot(numbers.get(name, len(parameters)), name, expected)
+                     for name, expected in expected_by_name.items()}
+
+            # Позиционные слоты по индексу (None - тип не задан), затем *args
+            self._positional = [slots.get(p.name) for p in positional]
+            self._positional.extend(self._slot(index, variadic.name, types[index])
+                                    for index in range(len(positional), len(types)))
+            while self._positional and self._positional[-1] is None:
+                self._positional.pop()
+            # Positional-only параметры нельзя передать по имени
+            positional_only = {p.name for p in positional if p.kind is p.POSITIONAL_ONLY}
+            self._by_name = {name: slot for name, slot in slots.items() if name not in positional_only}
+
+        self.plans = {}
+        self.enabled = True
+
+    def set_level(self, level):
+        """Уровень инструментирования (см. InstrumentationConfig)"""
+        self.enabled = level != INSTRUMENT_OFF
+
+    @staticmethod
+    def _slot(index, name, expected):
+        return ArgumentSlot(index + 1, name, expected, _compile_type(expected))
+
+    def plan(self, shape):
+        """
+        Получить проверку для формы вызова, при необходимости собрав ее.
+
+        Форма - число позиционных аргументов либо кортеж из него и имен
+        аргументов, переданных по имени. Проверка собирается в одно
+        выражение из isinstance и предикатов без циклов и обращений к
+        сигнатуре, и выполняется как check(args, kwargs).
+        """
+        plan = self.plans.get(shape)
+        if plan is not None:
+            return plan
+
+        if isinstance(shape, int):
+            count, names = shape, ()
+        else:
+            count, names = shape[0], shape[1:]
+
+        values = [(f'args[{index}]', self._positional[index])
+                  for index in range(min(count, len(self._positional)))]
+        values.extend((f'kwargs[{name!r}]', self._by_name.get(name)) for name in names)
+
+        namespace = {'reject': self.reject}
+        conditions = []
+        for number, (value, slot) in enumerate(values):
+            if slot is None:
+                continue
+            namespace[f'check{number}'] = slot.check
+            if isinstance(slot.check, (type, tuple)):
+                conditions.append(f'isinstance({value}, check{number})')
+            else:
+                conditions.append(f'check{number}({value})')
+
+        if conditions:
+            source = (f"def check(args, kwargs):\n"
+                      f"    if not ({' and '.join(conditions)}):\n"
+                      f"        reject(args, kwargs)\n")
+            exec(source, namespace)
+            plan = namespace['check']
+        else:
+            plan = _accept_arguments
+
+        if len(self.plans) >= self.MAX_PLANS:
+            self.plans.clear()
+        self.plans[shape] = plan
+        return plan
+
+    def __call__(self, args, kwargs):
+        """Проверить аргументы вызова, выбросив TypeError при несовпадении"""
+        self.plan((len(args), *kwargs) if kwargs else len(args))(args, kwargs)
+
+    def reject(self, args, kwargs):
+        """Найти первый неподходящий аргумент и выбросить TypeError"""
+        for slot, value in zip(self._positional, args):
+            if slot is not None and not _matches(slot.check, value):
+                raise self._error(slot, value)
+        for name, value in kwargs.items():
+            slot = self._by_name.get(name)
+            if slot is not None and not _matches(slot.check, value):
+                raise self._error(slot, value)
+
+    def _error(self, slot, value):
+        label = f"{slot.number} ({slot.name})" if slot.name else str(slot.number)
+        return TypeError(
+            f"Аргумент {label} функции {self.func_name} должен быть типа {_type_name(slot.expected)}, "
+            f"получен {type(value).__name__}"
+        )
+
+
+def _accept_arguments(args, kwargs):
+    """Проверка для формы вызова, в которой нечего проверять"""
+
+
+class _ValidationSettings:
+    """Глобальный режим проверки аргументов для всех validate_args"""
+
+    __slots__ = ('enabled', 'every', '_calls')
+
+    def __init__(self):
+        self.enabled = True
+        self.every = None
+        self._calls = itertools.count(1)
+
+    def sample(self):
+        """Решение о проверке вызова в режиме выборки (каждый N-й)"""
+        # next() у itertools.count атомарен под GIL, блокировка не нужна
+        return not next(self._calls) % self.every
+
+
+_validation = _ValidationSettings()
+
+
+def configure_validation(enabled=True, sample_every=None):
+    """
+    Глобально включить, выключить или проредить проверку аргументов.
+
+    Настройка действует на весь процесс, поэтому рассчитана на доверенные
+    пакетные запуски (например, рабочие процессы расчета зарплаты),
+    а не на переключение вокруг отдельных вызовов.
+
+    Args:
+        enabled (bool): Выполнять ли проверки
+        sample_every (int): Проверять только каждый N-й вызов
+    """
+    if sample_every is not None and sample_every < 1:
+        raise ValueError("Параметр sample_every должен быть не меньше 1")
+    _validation.every = sample_every if sample_every != 1 else None
+    _validation.enabled = enabled
+
+
+def validate_args(*types, **named_types):
+    """
+    Декоратор для валидации типов аргументов.
+
+    Типы сопоставляются с параметрами функции по порядку (а через
+    именованные аргументы декоратора - по имени), поэтому проверяются
+    и аргументы, переданные по имени. Помимо классов поддерживаются
+    None, Optional/Union и tuple[...].
+    Для корутин и асинхронных генераторов проверка выполняется
+    при их запуске внутри асинхронной обертки.
+    """
+
+    def decorator(func):
+        return _attach(func, 'validate',
+                       lambda target: ArgumentChecker(target, types, named_types))
+
+    return decorator
+
+
+def _validation_check(checker):
+    """Проверка аргументов с учетом глобального режима configure_validation"""
+    plans, plan = checker.plans, checker.plan
+    settings = _validation
+
+    def check(args, kwargs):
+        if checker.enabled and settings.enabled and (settings.every is None or settings.sample()):
+            shape = (len(args), *kwargs) if kwargs else len(args)
+            (plans.get(shape) or plan(shape))(args, kwargs)
+
+    return check
+
+
+# Состояние последнего вызова в потоке: кэш отмечает здесь попадание,
+# а logger над ним читает отметку, чтобы записать вызов как CACHE_HIT
+_call_state = threading.local()
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions expirations uncacheable size maxsize')
+
+_LIST_MARK = object()
+_DICT_MARK = object()
+_SET_MARK = object()
+
+
+def _freeze(value):
+    """
+    Привести аргумент к хешируемому виду для ключа кэша.
+
+    Списки, словари и множества преобразуются рекурсивно;
+    для прочих нехешируемых объектов выбрасывается TypeError.
+    """
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        pass
+
+    if isinstance(value, (list, tuple)):
+        return (_LIST_MARK, type(value), tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return (_DICT_MARK, frozenset((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return (_SET_MARK, frozenset(_freeze(item) for item in value))
+    raise TypeError(f"Нехешируемый аргумент типа {type(value).__name__}")
+
+
+def make_cache_key(args, kwargs):
+    """Построить ключ кэша по аргументам вызова"""
+    key = _freeze(args)
+    if kwargs:
+        key = (key, frozenset((name, _freeze(value)) for name, value in kwargs.items()))
+    return key
+
+
+def cached(maxsize=128, ttl=None):
+    """
+    Декоратор кэширования результатов с вытеснением LRU и временем жизни.
+
+    Аргументы-списки и словари приводятся к хешируемому виду; вызовы
+    с аргументами, которые привести нельзя, выполняются без кэша.
+    Исключения не кэшируются. Возвращаемые объекты общие для всех
+    попаданий, поэтому изменять их нельзя.
+
+    При использовании под @logger попадания в кэш записываются
+    со статусом CACHE_HIT, а не как полноценное выполнение.
+
+    Args:
+        maxsize (int): Максимальное число записей в кэше
+        ttl (float): Время жизни записи в секундах (None - бессрочно)
+
+    У обертки есть методы:
+        cache_info() - счетчики попаданий, промахов и вытеснений
+        cache_invalidate(*args, **kwargs) - удалить запись для аргументов
+        cache_invalidate_where(predicate) - удалить записи, для которых
+            predicate(args, kwargs) истинен
+        cache_clear() - очистить кэш
+    """
+    if maxsize is not None and maxsize < 1:
+        raise ValueError("Размер кэша должен быть не меньше 1")
+
+    def decorator(func):
+        return _attach(func, 'cache', lambda target: ResultCache(maxsize, ttl))
+
+    return decorator
+
+
+# Отсутствие результата в кэше (None - допустимый кэшируемый результат)
+_MISSING = object()
+
+
+class ResultCache:
+    """
+    Хранилище результатов функции для декоратора cached.
+
+    Args:
+        maxsize (int): Максимальное число записей (None - без ограничения)
+        ttl (float): Время жизни записи в секундах (None - бессрочно)
+    """
+
+    def __init__(self, maxsize=128, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # ключ -> (срок годности, результат, args, kwargs)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                          'uncacheable': 0}
+        self.enabled = True
+
+    def set_level(self, level):
+        """Уровень инструментирования (см. InstrumentationConfig)"""
+        self.enabled = level != INSTRUMENT_OFF
+
+    def key(self, args, kwargs):
+        """Ключ для аргументов вызова или None, если их нельзя кэшировать"""
+        try:
+            return make_cache_key(args, kwargs)
+        except TypeError:
+            with self._lock:
+                self._counters['uncacheable'] += 1
+            return None
+
+    def get(self, key):
+        """Результат для ключа или _MISSING; учитывается как попадание или промах"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] is None or entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._counters['expirations'] += 1
+            self._counters['misses'] += 1
+        return _MISSING
+
+    def put(self, key, result, args, kwargs):
+        """Сохранить результат, вытеснив самые давние записи сверх maxsize"""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, result, args, kwargs)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def info(self):
+        """Счетчики попаданий, промахов и вытеснений"""
+        with self._lock:
+            return CacheInfo(size=len(self._entries), maxsize=self.maxsize, **self._counters)
+
+    def invalidate(self, *args, **kwargs):
+        """Удалить запись для аргументов; True, если она была"""
+        try:
+            key = make_cache_key(args, kwargs)
+        except TypeError:
+            return False
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def invalidate_where(self, predicate):
+        """Удалить записи, для которых predicate(args, kwargs) истинен"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if predicate(entry[2], entry[3])]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Порядок частей объединенной обертки снаружи внутрь
+FUSION_ORDER = ('log', 'cache', 'validate', 'monitor')
+
+# Объединять ли стек декораторов в одну обертку при декорировании
+# (False - каждый декоратор отдельным слоем, для сравнения и отладки)
+FUSE_STACKS = True
+
+_Fusion = namedtuple('_Fusion', 'wrapper func stages')
+
+# Режим части, при котором решение о вызове принимает ее метод decide()
+_DECIDE = object()
+
+
+# Уровни инструментирования: off - часть выключена, errors - логгер
+# записывает только вызовы с исключением (для остальных частей как on)
+INSTRUMENT_OFF = 0
+INSTRUMENT_ERRORS = 1
+INSTRUMENT_ON = 2
+INSTRUMENT_LEVELS = {'off': INSTRUMENT_OFF, 'errors': INSTRUMENT_ERRORS, 'on': INSTRUMENT_ON}
+
+# Переменная окружения с начальной настройкой, например
+# "monitor=off;application.salary:log=errors;application.db.people.get_employees:all=on"
+INSTRUMENT_ENV = 'ACCOUNTING_INSTRUMENTATION'
+
+
+class InstrumentationConfig:
+    """
+    Уровни декораторов logger, cached, validate_args и performance_monitor
+    для всего процесса, модулей и отдельных функций.
+
+    Правило задается для цели - префикса полного имени функции по точкам
+    ('' - все функции, 'application.salary', 'application.salary.calculate_salary')
+    и вида части ('log', 'cache', 'validate', 'monitor' или 'all').
+    Действует правило с самой длинной подходящей целью; без правил - 'on'.
+
+    Часть, выключенная при декорировании, не оборачивает функцию вовсе.
+    Изменения во время работы применяются к уже созданным оберткам:
+    их части хранят свой уровень, и на вызов приходится одна проверка атрибута.
+    """
+
+    def __init__(self, spec=None):
+        self._rules = {}  # цель -> {вид: уровень}
+        self._stages = weakref.WeakKeyDictionary()  # часть -> (вид, имя функции)
+        self._lock = threading.Lock()
+        if spec:
+            self.load(spec)
+
+    def load(self, spec):
+        """Добавить правила из строки формата INSTRUMENT_ENV"""
+        for rule in filter(None, (part.strip() for part in spec.split(';'))):
+            target, _, assignments = rule.rpartition(':')
+            levels = {}
+            for assignment in assignments.split(','):
+                kind, separator, level = assignment.partition('=')
+                if not separator:
+                    raise ValueError(f"Неверное правило инструментирования: {rule!r}")
+                levels[kind.strip()] = level.strip()
+            self.set(target.strip(), **levels)
+
+    def set(self, target='', **levels):
+        """Задать уровни для цели, например set('application.salary', log='off')"""
+        parsed = {}
+        for kind, level in levels.items():
+            if kind != 'all' and kind not in FUSION_ORDER:
+                raise ValueError(f"Неизвестная часть: {kind}; допустимы all, {', '.join(FUSION_ORDER)}")
+            if isinstance(level, bool):
+                level = 'on' if level else 'off'
+            if level not in INSTRUMENT_LEVELS:
+                raise ValueError(f"Неизвестный уровень: {level}; допустимы {', '.join(INSTRUMENT_LEVELS)}")
+            parsed[kind] = INSTRUMENT_LEVELS[level]
+        with self._lock:
+            self._rules.setdefault(target, {}).update(parsed)
+            self._apply()
+
+    def clear(self):
+        """Удалить все правила (все части включены)"""
+        with self._lock:
+            self._rules.clear()
+            self._apply()
+
+    def level(self, name, kind):
+        """Уровень части kind для функции с полным именем name"""
+        parts = name.split('.')
+        for size in range(len(parts), -1, -1):
+            rule = self._rules.get('.'.join(parts[:size]))
+            if rule is not None:
+                level = rule.get(kind, rule.get('all'))
+                if level is not None:
+                    return level
+        return INSTRUMENT_ON
+
+    def track(self, stage, kind, name, level):
+        """Запомнить часть обертки, чтобы менять ее уровень во время работы"""
+        stage.set_level(level)
+        with self._lock:
+            self._stages[stage] = (kind, name)
+
+    def _apply(self):
+        for stage, (kind, name) in list(self._stages.items()):
+            stage.set_level(self.level(name, kind))
+
+
+# Настройка читается из окружения один раз при импорте модуля
+instrumentation = InstrumentationConfig(os.environ.get(INSTRUMENT_ENV))
+
+
+def configure_instrumentation(target='', **levels):
+    """
+    Включить, выключить или понизить уровень декораторов во время работы.
+
+    Примеры:
+        configure_instrumentation(all='off')                     # весь процесс
+        configure_instrumentation('application.salary', log='errors')
+        configure_instrumentation('application.db.people.get_employees', cache=False)
+
+    Args:
+        target (str): Модуль или полное имя функции ('' - все функции)
+        **levels: Уровни частей log, cache, validate, monitor или all:
+            'off', 'errors', 'on' (или True/False)
+    """
+    instrumentation.set(target, **levels)
+
+
+def reset_instrumentation():
+    """Вернуть настройку из переменной окружения INSTRUMENT_ENV"""
+    instrumentation.clear()
+    instrumentation.load(os.environ.get(INSTRUMENT_ENV, ''))
+
+
+def _qualified_name(func):
+    """Полное имя функции для правил инструментирования"""
+    qualname = getattr(func, '__qualname__', getattr(func, '__name__', ''))
+    return f"{getattr(func, '__module__', None)}.{qualname}"
+
+
+def instrument(func=None, log=None, cache=None, validate=None, monitor=None):
+    """
+    Объединенный декоратор: логирование, кэш, проверка аргументов
+    и мониторинг в одной обертке над функцией.
+
+    Время читается один раз до и один раз после вызова и используется
+    и логом, и мониторингом; между оберткой и функцией нет промежуточных
+    кадров. Части выполняются в порядке FUSION_ORDER: лог → кэш →
+    проверка аргументов → мониторинг → функция, как в стеке
+    @logger @cached @validate_args @performance_monitor.
+
+    Такой стек из отдельных декораторов объединяется в одну обертку
+    автоматически, поэтому instrument удобен прежде всего тем, что
+    собирает все настройки в одном месте.
+
+    Args:
+        log: True, путь к файлу логов или словарь параметров logger
+            (путь - в ключе 'path')
+        cache: True или словарь параметров cached
+        validate: Кортеж типов позиционных параметров или словарь
+            типов параметров по имени (см. validate_args)
+        monitor: True или словарь параметров performance_monitor
+
+    Пример:
+        @instrument(log='accounting.log', validate=(str, float), monitor=True)
+        def calculate(name, salary): ...
+    """
+    layers = []
+    if monitor:
+        layers.append(performance_monitor(**_options(monitor)))
+    if validate:
+        layers.append(validate_args(**validate) if isinstance(validate, Mapping)
+                      else validate_args(*validate))
+    if cache:
+        layers.append(cached(**_options(cache)))
+    if log:
+        options = {} if isinstance(log, str) else _options(log)
+        path = log if isinstance(log, str) else options.pop('path', None)
+        layers.append(logger(path, **options))
+
+    def decorator(func):
+        for layer in layers:
+            func = layer(func)
+        return func
+
+    if callable(func):
+        return decorator(func)
+    return decorator
+
+
+def _options(value):
+    """Параметры части instrument: True - параметры по умолчанию"""
+    return {} if value is True else dict(value)
+
+
+def _attach(func, kind, make_stage):
+    """
+    Добавить к функции часть обертки вида kind (один из FUSION_ORDER).
+
+    Если func - объединенная обертка, в которой нет части kind, а все ее
+    части по FUSION_ORDER расположены глубже, новая часть встраивается
+    в ту же обертку над исходной функцией. Иначе создается отдельный слой:
+    для корутин и асинхронных генераторов - асинхронный.
+
+    Args:
+        func (callable): Декорируемая функция или обертка
+        kind (str): Вид части
+        make_stage (callable): make_stage(target) -> часть для функции target
+    """
+    name = _qualified_name(func)
+    level = instrumentation.level(name, kind)
+    if level == INSTRUMENT_OFF:
+        # Выключенная при декорировании часть не добавляет обертку
+        return func
+
+    fusion = getattr(func, '__fusion__', None)
+    # Атрибут копируется через @wraps во внешние обертки, поэтому
+    # проверяем, что это объединенная обертка, а не слой над ней
+    if FUSE_STACKS and fusion is not None and fusion.wrapper is func:
+        rank = FUSION_ORDER.index(kind)
+        if all(FUSION_ORDER.index(other) > rank for other in fusion.stages):
+            stage = make_stage(fusion.func)
+            if _shares_clock(fusion.stages, stage):
+                instrumentation.track(stage, kind, name, level)
+                return _fuse(fusion.func, {**fusion.stages, kind: stage})
+
+    stage = make_stage(func)
+    instrumentation.track(stage, kind, name, level)
+    if _is_coroutine_function(func) or _is_async_generator_function(func):
+        wrapper = _wrap_async(func, kind, stage)
+        if wrapper is not None:
+            _expose(wrapper, {kind: stage})
+            return wrapper
+    return _fuse(func, {kind: stage})
+
+
+def _shares_clock(stages, stage):
+    """Можно ли измерить CPU-время всех частей одним чтением часов"""
+    clocks = {part.cpu_clock for part in (*stages.values(), stage)
+              if getattr(part, 'cpu_clock', None) is not None}
+    return len(clocks) <= 1
+
+
+def _wrap_async(func, kind, stage):
+    """Асинхронный слой для части stage"""
+    if kind in ('log', 'monitor'):
+        return _instrument(func, stage.begin, stage.finish)
+    if kind == 'cache':
+        return _async_cache(func, stage)
+
+    check = _validation_check(stage)
+    if _is_async_generator_function(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            check(args, kwargs)
+            async for item in func(*args, **kwargs):
+                yield item
+
+    else:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            check(args, kwargs)
+            return await func(*args, **kwargs)
+
+    return wrapper
+
+
+def _async_cache(func, cache):
+    """
+    Асинхронный слой кэша: хранится результат корутины, а не она сама.
+
+    Одновременные вызовы с одинаковым ключом, как в single_flight,
+    ждут один общий вызов; исключения не кэшируются.
+    """
+    if _is_async_generator_function(func):
+        raise TypeError(f"cached не поддерживает асинхронные генераторы: {_qualified_name(func)}")
+    import asyncio  # импортируем только при декорировании корутин
+
+    flights = {}
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = cache.key(args, kwargs) if cache.enabled else None
+        if key is None:
+            _call_state.cache_hit = None
+            return await func(*args, **kwargs)
+
+        result = cache.get(key)
+        if result is _MISSING:
+            flight_key = (asyncio.get_running_loop(), key)
+            future = flights.get(flight_key)
+            if future is not None:
+                # shield: отмена одного ожидающего не отменяет общий вызов
+                result = await asyncio.shield(future)
+            else:
+                future = flights[flight_key] = asyncio.get_running_loop().create_future()
+                future.add_done_callback(lambda done: done.cancelled() or done.exception())
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except BaseException as e:
+                    future.set_exception(e)
+                    _call_state.cache_hit = None
+                    raise
+                else:
+                    cache.put(key, result, args, kwargs)
+                    future.set_result(result)
+                finally:
+                    flights.pop(flight_key, None)
+                _call_state.cache_hit = None
+                return result
+
+        # Внешний logger читает признак сразу после возврата, без переключения задач
+        _call_state.cache_hit = cache
+        return result
+
+    return wrapper
+
+
+def _expose(wrapper, stages):
+    """Перенести на обертку атрибуты ее частей (sampler, histogram, методы кэша...)"""
+    log, monitor = stages.get('log'), stages.get('monitor')
+    if log is not None or monitor is not None:
+        # Как в стеке декораторов, sampler внешнего logger виден снаружи
+        wrapper.sampler = (log if log is not None else monitor).sampler
+    if monitor is not None:
+        wrapper.histogram = monitor.histogram
+    if 'validate' in stages:
+        wrapper.check_args = stages['validate']
+    cache = stages.get('cache')
+    if cache is not None:
+        wrapper.result_cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_invalidate = cache.invalidate
+        wrapper.cache_invalidate_where = cache.invalidate_where
+        wrapper.cache_clear = cache.clear
+
+
+def _fuse(func, stages):
+    """
+    Собрать одну синхронную обертку из частей stages над функцией func.
+
+    Часы после вызова читаются один раз, показания общие для лога
+    и мониторинга. Лог измеряет весь вызов обертки, а мониторинг - только
+    выполнение функции: его отсчет начинается непосредственно перед
+    вызовом, после ключа кэша и проверки аргументов. Попадания в кэш
+    и вызовы, отклоненные проверкой, в гистограмму и выборку мониторинга
+    не попадают.
+    """
+    log = stages.get('log')
+    cache = stages.get('cache')
+    checker = stages.get('validate')
+    monitor = stages.get('monitor')
+
+    log_cpu = log.cpu_clock if log is not None else None
+    monitor_cpu = monitor.cpu_clock if monitor is not None else None
+    cpu_clock = log_cpu if log_cpu is not None else monitor_cpu
+    if checker is not None:
+        plans, plan = checker.plans, checker.plan
+    settings = _validation
+
+    def complete(sampled, watched, start_time, cpu_started, started,
+                 args, kwargs, result, error, hit):
+        finished = wall_clock_ns()
+        cpu_finished = cpu_clock() if cpu_clock is not None else 0
+        if watched:
+            watch_cpu, watch_started = watched
+            monitor.observe(finished - watch_started,
+                            cpu_finished - watch_cpu if monitor_cpu is not None else None)
+        if sampled is not None:
+            # Промах своего кэша мог оказаться попаданием кэша глубже (None)
+            log.emit(sampled, start_time, args, kwargs, result, error, finished - started,
+                     cpu_finished - cpu_started if log_cpu is not None else None,
+                     hit or None, True)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Решение о записи в лог принимается до вызова и до чтения часов
+        sampled = None if log is None else log.mode
+        if sampled is _DECIDE:
+            sampled = log.decide()
+        start_time = cpu_started = started = 0
+        if sampled is not None:
+            start_time = time.time()
+            cpu_started = cpu_clock() if cpu_clock is not None else 0
+            started = wall_clock_ns()
+
+        hit = watched = False
+        try:
+            key = cache.key(args, kwargs) if cache is not None and cache.enabled else None
+            if key is not None:
+                result = cache.get(key)
+                hit = result is not _MISSING
+            if not hit:
+                if checker is not None and checker.enabled and settings.enabled and (
+                        settings.every is None or settings.sample()):
+                    shape = (len(args), *kwargs) if kwargs else len(args)
+                    (plans.get(shape) or plan(shape))(args, kwargs)
+                # Мониторинг решает только о вызовах, которые дошли до функции,
+                # и начинает отсчет непосредственно перед вызовом
+                if monitor is not None:
+                    watched = monitor.mode
+                    if watched is _DECIDE:
+                        watched = monitor.decide()
+                    if watched:
+                        watched = (cpu_clock() if cpu_clock is not None else 0, wall_clock_ns())
+                result = func(*args, **kwargs)
+                if key is not None:
+                    cache.put(key, result, args, kwargs)
+        except Exception as error:
+            # Фиксируем ошибку и перебрасываем исключение
+            if cache is not None:
+                _call_state.cache_hit = None
+            if sampled is not None or watched:
+                complete(sampled, watched, start_time, cpu_started, started,
+                         args, kwargs, None, error, False)
+            raise
+
+        if sampled is not None or watched:
+            complete(sampled, watched, start_time, cpu_started, started,
+                     args, kwargs, result, None, hit)
+        if cache is not None:
+            _call_state.cache_hit = cache if hit else None
+        return result
+
+    _expose(wrapper, stages)
+    wrapper.__fusion__ = _Fusion(wrapper, func, stages)
+    return wrapper
+
+
+FlightInfo = namedtuple('FlightInfo', 'calls executions coalesced in_flight')
+
+
+class _Flight:
+    """Выполняющийся вызов, результат которого ждут остальные потоки"""
+
+    __slots__ = ('done', 'owner', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.owner = threading.get_ident()
+        self.result = None
+        self.error = None
+
+
+def single_flight(key=None):
+    """
+    Декоратор объединения одновременных вызовов (single-flight).
+
+    Первый вызов для ключа выполняет функцию, а одновременные вызовы
+    с тем же ключом ждут его завершения и получают тот же результат
+    или то же исключение. В отличие от кэша, результат не хранится
+    после завершения вызова. Поддерживаются обычные функции (потоки)
+    и корутины (asyncio).
+
+    Args:
+        key (callable): Функция (*args, **kwargs) -> ключ; по умолчанию
+            ключ строится по всем аргументам, как в cached
+
+    У обертки есть метод flight_info() со счетчиками calls, executions,
+    coalesced (сколько вызовов получили чужой результат) и in_flight.
+    """
+
+    def decorator(func):
+        make_key = key if key is not None else (lambda *args, **kwargs: make_cache_key(args, kwargs))
+        if _is_coroutine_function(func):
+            return _async_single_flight(func, make_key)
+
+        flights = {}
+        lock = threading.Lock()
+        counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                flight_key = make_key(*args, **kwargs)
+            except TypeError:
+                flight_key = None
+
+            with lock:
+                counters['calls'] += 1
+                flight = flights.get(flight_key) if flight_key is not None else None
+                if flight is None and flight_key is not None:
+                    flight = flights[flight_key] = _Flight()
+                    waiting = False
+                elif flight is not None and flight.owner != threading.get_ident():
+                    waiting = True
+                else:
+                    # Нехешируемые аргументы или повторный вход из того же
+                    # потока (иначе поток ждал бы сам себя) - вызываем напрямую
+                    flight = None
+                    waiting = False
+                counters['coalesced' if waiting else 'executions'] += 1
+
+            if waiting:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+
+            if flight is None:
+                return func(*args, **kwargs)
+
+            try:
+                flight.result = func(*args, **kwargs)
+                return flight.result
+            except BaseException as e:
+                flight.error = e
+                raise
+            finally:
+                with lock:
+                    flights.pop(flight_key, None)
+                flight.done.set()
+
+        def flight_info():
+            with lock:
+                return FlightInfo(in_flight=len(flights), **counters)
+
+        wrapper.flight_info = flight_info
+        return wrapper
+
+    return decorator
+
+
+def _async_single_flight(func, make_key):
+    """Вариант single_flight для корутин: ожидающие разделяют один Future"""
+    import asyncio  # импортируем только при декорировании корутин
+
+    flights = {}
+    lock = threading.Lock()
+    counters = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        try:
+            flight_key = (loop, make_key(*args, **kwargs))
+        except TypeError:
+            flight_key = None
+
+        with lock:
+            counters['calls'] += 1
+            future = flights.get(flight_key) if flight_key is not None else None
+            if future is None:
+                counters['executions'] += 1
+            else:
+                counters['coalesced'] += 1
+
+        if future is not None:
+            # shield: отмена одного ожидающего не отменяет общий вызов
+            return await asyncio.shield(future)
+
+        if flight_key is None:
+            return await func(*args, **kwargs)
+
+        future = loop.create_future()
+        # Исключение считается полученным, даже если ожидающих не было
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        with lock:
+            flights[flight_key] = future
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with lock:
+                flights.pop(flight_key, None)
+
+    def flight_info():
+        with lock:
+            return FlightInfo(in_flight=len(flights), **counters)
+
+    wrapper.flight_info = flight_info
+    return wrapper
+
+
+# Файл постоянного кэша по умолчанию (SQLite, рядом с логами)
+PERSISTENT_CACHE_PATH = 'accounting_cache.sqlite3'
+
+PersistentCacheInfo = namedtuple('PersistentCacheInfo', 'hits misses uncacheable entries bytes')
+
+
+class PersistentStore:
+    """
+    Файл SQLite с результатами функций, общий для всех persistent_cache
+    с этим путем (и для всех процессов, которые его открывают).
+
+    Запись выполняется одной транзакцией, поэтому прерванный процесс не
+    оставляет половинных результатов. После записи самые давно
+    использованные результаты вытесняются сверх max_entries и max_bytes.
+
+    Args:
+        path (str): Путь к файлу кэша
+        max_entries (int): Максимальное число результатов
+        max_bytes (int): Максимальный суммарный размер результатов в байтах
+    """
+
+    def __init__(self, path, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("Размер постоянного кэша должен быть положительным")
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Сохраненный результат (байты pickle) или None"""
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            with connection:
+                connection.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key, name, value):
+        """Атомарно сохранить результат и вытеснить лишние"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    'INSERT OR REPLACE INTO results (key, func, value, size, used) VALUES (?, ?, ?, ?, ?)',
+                    (key, name, value, len(value), time.time()),
+                )
+                self._evict(connection)
+
+    def clear(self, name=None):
+        """Удалить результаты функции name (None - все результаты)"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                if name is None:
+                    connection.execute('DELETE FROM results')
+                else:
+                    connection.execute('DELETE FROM results WHERE func = ?', (name,))
+
+    def usage(self, name=None):
+        """Число результатов и их размер в байтах (для функции name или всего файла)"""
+        with self._lock:
+            connection = self._connect()
+            query = 'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results'
+            if name is None:
+                return connection.execute(query).fetchone()
+            return connection.execute(query + ' WHERE func = ?', (name,)).fetchone()
+
+    def close(self):
+        """Закрыть соединение (следующее обращение откроет его снова)"""
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def _connect(self):
+        # Соединение SQLite нельзя использовать после fork: открываем свое в каждом процессе
+        if self._connection is None or self._pid != os.getpid():
+            import sqlite3  # импортируем при первом обращении, чтобы не замедлять запуск
+
+            connection = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS results ('
+                    'key BLOB PRIMARY KEY, func TEXT NOT NULL, value BLOB NOT NULL, '
+                    'size INTEGER NOT NULL, used REAL NOT NULL)'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+            self._connection, self._pid = connection, os.getpid()
+        return self._connection
+
+    def _evict(self, connection):
+        count, total = connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in connection.execute('SELECT key, size FROM results ORDER BY used'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        connection.executemany('DELETE FROM results WHERE key = ?', stale)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_persistent_store(path=PERSISTENT_CACHE_PATH, **options):
+    """
+    Получить общий файл постоянного кэша, создав объект при первом обращении.
+
+    Args:
+        path (str): Путь к файлу кэша
+        **options: Параметры PersistentStore, применяемые при создании
+    """
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = PersistentStore(path, **options)
+    return store
+
+
+def content_hash(*values):
+    """
+    Быстрый хеш содержимого значений (blake2b, 16 байт).
+
+    Значения сериализуются pickle протокола 5: большие буферы (bytes,
+    массивы NumPy) хешируются напрямую, без копирования в поток pickle.
+    TypeError/pickle.PicklingError - если значение не сериализуется.
+    """
+    import hashlib
+    import pickle
+
+    digest = hashlib.blake2b(digest_size=16)
+    buffers = []
+    digest.update(pickle.dumps(values, protocol=5, buffer_callback=buffers.append))
+    for buffer in buffers:
+        digest.update(buffer.raw())
+    return digest.digest()
+
+
+def content_hash_stream(values):
+    """
+    Хеш содержимого последовательности значений (blake2b, 16 байт).
+
+    В отличие от content_hash, значения сериализуются и хешируются по
+    одному, поэтому последовательность может быть потоком частей
+    большой выборки, которая не загружается в память целиком.
+    """
+    import hashlib
+    import pickle
+
+    digest = hashlib.blake2b(digest_size=16)
+    for value in values:
+        buffers = []
+        digest.update(pickle.dumps(value, protocol=5, buffer_callback=buffers.append))
+        for buffer in buffers:
+            digest.update(buffer.raw())
+    return digest.digest()
+
+
+def code_version(*objects):
+    """
+    Версия кода: хеш байткода, констант и имен функций
+    (для классов - всех методов, для модулей - всех функций и классов модуля).
+    """
+    import hashlib
+    import marshal
+
+    digest = hashlib.blake2b(digest_size=8)
+    for obj in objects:
+        for code in _code_objects(obj):
+            digest.update(marshal.dumps(code))
+    return digest.hexdigest()
+
+
+def _code_objects(obj):
+    import inspect
+
+    if isinstance(obj, ModuleType):
+        for value in vars(obj).values():
+            if getattr(value, '__module__', None) == obj.__name__:
+                yield from _code_objects(value)
+    elif isinstance(obj, type):
+        for value in vars(obj).values():
+            if isinstance(value, (staticmethod, classmethod)):
+                value = value.__func__
+            elif isinstance(value, property):
+                value = value.fget
+            if inspect.isfunction(value):
+                yield from _code_objects(value)
+    else:
+        code = getattr(inspect.unwrap(obj), '__code__', None)
+        if code is not None:
+            yield code
+
+
+class PersistentCache:
+    """
+    Постоянный кэш одной функции в файле PersistentStore.
+
+    Ключ - хеш полного имени функции, версии кода, аргументов и снимка
+    входных данных depends_on() (например, отпечатка штата сотрудников).
+    """
+
+    def __init__(self, func, store, version=None, depends_on=None):
+        self.name = _qualified_name(func)
+        self.store = store
+        self.version = version if version is not None else code_version(func)
+        self.depends_on = depends_on
+        self.enabled = True
+        self._counters = {'hits': 0, 'misses': 0, 'uncacheable': 0}
+        self._lock = threading.Lock()
+
+    def set_level(self, level):
+        """Уровень инструментирования (см. InstrumentationConfig)"""
+        self.enabled = level != INSTRUMENT_OFF
+
+    def key(self, args, kwargs):
+        """Ключ для вызова или None, если аргументы не сериализуются"""
+        import pickle
+
+        snapshot = self.depends_on() if self.depends_on is not None else None
+        try:
+            return content_hash(self.name, self.version, args, kwargs, snapshot)
+        except (TypeError, AttributeError, pickle.PicklingError):
+            self._count('uncacheable')
+            return None
+
+    def get(self, key):
+        """Сохраненный результат или _MISSING"""
+        import pickle
+
+        value = self.store.get(key)
+        if value is not None:
+            try:
+                result = pickle.loads(value)
+            except Exception:
+                # Класс результата изменился или удален: считаем промахом
+                pass
+            else:
+                self._count('hits')
+                return result
+        self._count('misses')
+        return _MISSING
+
+    def put(self, key, result):
+        """Сохранить результат, если он сериализуется"""
+        import pickle
+
+        try:
+            value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except (TypeError, AttributeError, pickle.PicklingError):
+            return
+        self.store.put(key, self.name, value)
+
+    def info(self):
+        """Счетчики этого процесса и размер результатов функции в файле"""
+        entries, size = self.store.usage(self.name)
+        with self._lock:
+            return PersistentCacheInfo(entries=entries, bytes=size, **self._counters)
+
+    def clear(self):
+        """Удалить все результаты функции из файла"""
+        self.store.clear(self.name)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+def persistent_cache(path=PERSISTENT_CACHE_PATH, version=None, depends_on=None,
+                     max_entries=1024, max_bytes=64 * 1024 * 1024):
+    """
+    Декоратор кэширования результатов на диске между запусками программы.
+
+    Результат ищется по хешу полного имени функции, версии ее кода,
+    аргументов и снимка входных данных, которые функция читает не из
+    аргументов (depends_on). Изменение любого из них дает новый ключ,
+    поэтому устаревшие результаты не возвращаются, а вытесняются по LRU.
+    Каждое попадание возвращает новую копию результата.
+
+    Версия по умолчанию - хеш байткода самой функции; если результат
+    зависит и от кода других функций, укажите version явно и меняйте
+    его вместе с ними.
+
+    При использовании под @logger попадания записываются как CACHE_HIT.
+
+    Args:
+        path (str): Файл кэша SQLite
+        version (str): Версия кода функции (по умолчанию - хеш байткода,
+            см. code_version)
+        depends_on (callable): depends_on() -> снимок внешних входных данных
+        max_entries (int): Максимальное число результатов в файле
+        max_bytes (int): Максимальный размер результатов в файле (байт)
+
+    У обертки есть атрибут persistent_cache с методами info() и clear().
+    """
+
+    def decorator(func):
+        name = _qualified_name(func)
+        level = instrumentation.level(name, 'cache')
+        if level == INSTRUMENT_OFF:
+            return func
+
+        store = get_persistent_store(path, max_entries=max_entries, max_bytes=max_bytes)
+        cache = PersistentCache(func, store, version, depends_on)
+        instrumentation.track(cache, 'cache', name, level)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache.key(args, kwargs) if cache.enabled else None
+            if key is not None:
+                result = cache.get(key)
+                if result is not _MISSING:
+                    _call_state.cache_hit = cache
+                    return result
+
+            result = func(*args, **kwargs)
+            if key is not None:
+                cache.put(key, result)
+            _call_state.cache_hit = None
+            return result
+
+        wrapper.persistent_cache = cache
+        return wrapper
+
+    return decorator
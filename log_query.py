@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Запросы к логам декоратора logger без загрузки файла в память
+
+Лог отображается в память (mmap), а рядом с ним хранится индекс
+(файл <лог>.idx) со смещениями и временем записей. Индекс дополняется
+только новыми записями, поэтому повторные запросы к растущему логу
+не перечитывают его целиком. Ротированные файлы (<лог>.N и <лог>.N.gz)
+читаются потоком перед текущим.
+
+Запуск:
+    python log_query.py accounting.log --status ERROR --since "2024-01-01 00:00:00"
+    python log_query.py accounting.log --func calculate_salary --tail 20
+    python log_query.py accounting.log --summary
+    python log_query.py accounting.log --follow
+"""
+
+import argparse
+import bisect
+import contextlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque
+from datetime import datetime
+
+from decorators import LatencyHistogram, format_duration
+from log_reader import iter_records, log_segments, scan_timestamps
+
+
+# Записи из разных процессов попадают в лог пачками, поэтому время
+# записей может идти не строго по порядку; допускаем такое отставание
+ORDER_SLACK = 60.0
+# Сколько байт начала лога сверяется, чтобы заметить подмену файла
+FINGERPRINT_SIZE = 4096
+
+
+class LogIndex:
+    """
+    Индекс записей лога: смещение, время и максимум времени до записи.
+
+    Хранится в файле рядом с логом: заголовок (версия, inode лога,
+    проиндексированная длина, отпечаток начала лога, число записей)
+    и три колонки int64 на запись. Если лог был усечен или подменен
+    (ротация, очистка), индекс строится заново.
+
+    Args:
+        path (str): Путь к файлу лога
+        index_path (str): Путь к индексу (по умолчанию - path + '.idx')
+    """
+
+    MAGIC = b'LOGIDX\x01\x00'
+    HEADER = struct.Struct('<8sqqqq')
+    FIELDS = 3
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or path + '.idx'
+        self._reset()
+        self._load()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _reset(self):
+        self.offsets = array('q')  # Смещения записей в логе
+        self.timestamps = array('q')  # Время записей, мкс
+        self.running_max = array('q')  # Максимум времени до записи включительно, мкс
+        self.covered = 0  # Длина проиндексированной части лога
+        self.inode = None
+        self.fingerprint = None
+        self._stored = 0  # Записей, уже сохраненных в файле индекса
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'rb') as index_file:
+                header = index_file.read(self.HEADER.size)
+                if len(header) < self.HEADER.size:
+                    return
+                magic, inode, covered, fingerprint, count = self.HEADER.unpack(header)
+                if magic != self.MAGIC:
+                    return
+                values = array('q')
+                values.frombytes(index_file.read(count * self.FIELDS * values.itemsize))
+        except OSError:
+            return
+        if len(values) != count * self.FIELDS:
+            return
+
+        self.offsets = values[0::3]
+        self.timestamps = values[1::3]
+        self.running_max = values[2::3]
+        self.covered, self.inode, self.fingerprint = covered, inode, fingerprint
+        self._stored = count
+
+    def refresh(self):
+        """
+        Дописать в индекс новые записи лога.
+
+        Returns:
+            bool: True, если индекс пришлось построить заново
+        """
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            rebuilt = self.covered > 0
+            self._reset()
+            return rebuilt
+
+        rebuilt = False
+        with open(self.path, 'rb') as log_file:
+            fingerprint = zlib.crc32(log_file.read(min(self.covered, FINGERPRINT_SIZE)))
+            if (status.st_ino != self.inode or status.st_size < self.covered
+                    or fingerprint != self.fingerprint):
+                rebuilt = self.covered > 0
+                self._reset()
+                self.inode = status.st_ino
+
+            if status.st_size > self.covered:
+                with _mapped(log_file, status.st_size) as mapped:
+                    self._extend(mapped, status.st_size)
+
+            log_file.seek(0)
+            self.fingerprint = zlib.crc32(log_file.read(min(self.covered, FINGERPRINT_SIZE)))
+
+        self._save()
+        return rebuilt
+
+    def _extend(self, mapped, size):
+        latest = self.running_max[-1] if self.running_max else -(1 << 62)
+        for offset, next_offset, timestamp in scan_timestamps(mapped, self.covered, size):
+            if timestamp is not None:
+                stamp = int(timestamp * 1_000_000)
+                latest = max(latest, stamp)
+                self.offsets.append(offset)
+                self.timestamps.append(stamp)
+                self.running_max.append(latest)
+            self.covered = next_offset
+
+    def _save(self):
+        count = len(self.offsets)
+        stored = self._stored if os.path.exists(self.index_path) else 0
+        rows = array('q')
+        for index in range(stored, count):
+            rows.extend((self.offsets[index], self.timestamps[index], self.running_max[index]))
+
+        with open(self.index_path, 'r+b' if stored else 'wb') as index_file:
+            # Сначала колонки, затем заголовок с числом записей: прерванная
+            # запись оставит индекс согласованным с прежним заголовком
+            index_file.seek(self.HEADER.size + stored * self.FIELDS * rows.itemsize)
+            index_file.write(rows.tobytes())
+            index_file.truncate()
+            index_file.seek(0)
+            index_file.write(self.HEADER.pack(
+                self.MAGIC, self.inode or 0, self.covered, self.fingerprint or 0, count))
+        self._stored = count
+
+    def offset_range(self, since=None, until=None):
+        """
+        Диапазон смещений лога, в котором лежат записи за интервал.
+
+        Args:
+            since (float): Начало интервала (с, время Unix)
+            until (float): Конец интервала
+        """
+        start, end = 0, self.covered
+        if since is not None:
+            position = bisect.bisect_left(self.running_max, int(since * 1_000_000))
+            start = self.offsets[position] if position < len(self.offsets) else self.covered
+        if until is not None:
+            limit = int((until + ORDER_SLACK) * 1_000_000)
+            position = bisect.bisect_right(self.running_max, limit)
+            if position < len(self.offsets):
+                end = self.offsets[position]
+        return start, end
+
+
+class LogQuery:
+    """
+    Запросы к одному файлу лога поверх индекса LogIndex.
+
+    Args:
+        path (str): Путь к файлу лога
+        index_path (str): Путь к индексу (по умолчанию - path + '.idx')
+    """
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index = LogIndex(path, index_path)
+
+    def records(self, func=None, status=None, since=None, until=None, rotated=True):
+        """
+        Записи за интервал времени с отбором по функции и статусу.
+
+        Args:
+            func (str | Iterable[str]): Имя функции или несколько имен
+            status (str | Iterable[str]): SUCCESS, ERROR, CACHE_HIT или несколько
+            since (float | datetime): Не раньше этого времени
+            until (float | datetime): Раньше этого времени
+            rotated (bool): Читать и ротированные файлы (path.N[.gz])
+        """
+        since, until = _as_timestamp(since), _as_timestamp(until)
+        filters = dict(func=func, status=status, since=since, until=until)
+        if rotated:
+            for segment in self.segments():
+                if since is not None and os.path.getmtime(segment) < since:
+                    continue
+                yield from iter_records(segment, rotated=False, **filters)
+
+        self.index.refresh()
+        start, end = self.index.offset_range(since, until)
+        yield from self._read(start, end, **filters)
+
+    def segments(self):
+        """Ротированные файлы лога от старых к новым (без текущего)"""
+        return [segment for segment in log_segments(self.path) if segment != self.path]
+
+    def tail(self, count=10, **filters):
+        """
+        Последние count записей (с отбором, как у records).
+
+        Читает текущий файл с конца блоками растущего размера по индексу,
+        а если записей в нем не хватает - ротированные файлы от новых к старым.
+        """
+        if count <= 0:
+            return []
+        self.index.refresh()
+        offsets = self.index.offsets
+        found = []
+        stop, end = len(offsets), self.index.covered
+        step = count * 4
+        while stop > 0 and len(found) < count:
+            begin = max(0, stop - step)
+            found[:0] = self._read(offsets[begin], end, **filters)
+            stop, end = begin, offsets[begin]
+            step *= 2
+
+        for segment in reversed(self.segments()):
+            if len(found) >= count:
+                break
+            latest = deque(iter_records(segment, rotated=False, **filters), maxlen=count - len(found))
+            found[:0] = latest
+        return found[-count:]
+
+    def follow(self, interval=0.5, **filters):
+        """
+        Бесконечно выдавать новые записи по мере их появления (как tail -f).
+
+        При ротации сначала дочитывается хвост ротированного файла (пока он
+        не сжат), затем чтение продолжается с начала нового файла.
+        """
+        self.index.refresh()
+        position = self.index.covered
+        while True:
+            inode = self.index.inode
+            if self.index.refresh():
+                previous = f'{self.path}.1'
+                with contextlib.suppress(FileNotFoundError):
+                    if os.stat(previous).st_ino == inode:
+                        yield from iter_records(previous, start=position, rotated=False, **filters)
+                position = 0
+            if self.index.covered > position:
+                yield from self._read(position, self.index.covered, **filters)
+                position = self.index.covered
+            else:
+                time.sleep(interval)
+
+    def summary(self, **filters):
+        """
+        Сводка по функциям: вызовы, ошибки, попадания в кэш, длительности.
+
+        Returns:
+            dict: {функция: {'calls', 'errors', 'cache_hits', 'mean', 'p50',
+            'p99', 'max'}}, длительности в наносекундах
+        """
+        histograms = {}
+        counters = {}
+        for entry in self.records(**filters):
+            histogram = histograms.get(entry.func)
+            if histogram is None:
+                histogram = histograms[entry.func] = LatencyHistogram()
+                counters[entry.func] = {'ERROR': 0, 'CACHE_HIT': 0}
+            histogram.record(entry.duration_ns)
+            if entry.status in counters[entry.func]:
+                counters[entry.func][entry.status] += 1
+
+        report = {}
+        for name in sorted(histograms):
+            stats = histograms[name].summary()
+            report[name] = {
+                'calls': stats['count'],
+                'errors': counters[name]['ERROR'],
+                'cache_hits': counters[name]['CACHE_HIT'],
+                'mean': stats['mean'],
+                'p50': stats['p50'],
+                'p99': stats['p99'],
+                'max': stats['max'],
+            }
+        return report
+
+    def _read(self, start, end, **filters):
+        if end <= start:
+            return
+        with open(self.path, 'rb') as log_file:
+            # Файл мог быть усечен после обновления индекса: чтение за концом
+            # отображения завершило бы процесс сигналом SIGBUS
+            end = min(end, os.fstat(log_file.fileno()).st_size)
+            if end <= start:
+                return
+            with _mapped(log_file, end) as mapped:
+                yield from iter_records(mapped, start=start, end=end, **filters)
+
+
+@contextlib.contextmanager
+def _mapped(log_file, size):
+    """Отобразить начало файла в память (пустой файл mmap не поддерживает)"""
+    mapped = mmap.mmap(log_file.fileno(), size, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return value
+
+
+def format_entry(entry):
+    """Строка для вывода записи в формате текстового лога"""
+    if entry.format == 'text':
+        args = entry.args
+    else:
+        parts = [str(arg) for arg in entry.args]
+        parts.extend(f'{name}={value}' for name, value in entry.kwargs.items())
+        args = ', '.join(parts)
+
+    error = entry.error
+    if error is not None:
+        outcome = f"{error['type']}: {error['message']}"
+    else:
+        outcome = entry.result if entry.has_result else '...'
+
+    line = (f"{datetime.fromtimestamp(entry.timestamp):%Y-%m-%d %H:%M:%S} | {entry.status} | "
+            f"{entry.func}({args}) -> {outcome} | Время: {format_duration(entry.duration_ns)}")
+    if entry.cpu_ns is not None:
+        line += f" | CPU: {format_duration(entry.cpu_ns)}"
+    return line
+
+
+def print_summary(report):
+    """Вывести сводку LogQuery.summary в виде таблицы"""
+    print(f"{'Функция':<36} {'Вызовы':>8} {'Ошибки':>8} {'Среднее':>12} {'p99':>12}")
+    print("-" * 80)
+    for name, stats in report.items():
+        print(f"{name:<36} {stats['calls']:>8} {stats['errors']:>8} "
+              f"{format_duration(stats['mean']):>12} {format_duration(stats['p99']):>12}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Запросы к логам программы 'Бухгалтерия'")
+    parser.add_argument('path', help="Файл лога")
+    parser.add_argument('--func', action='append', help="Имя функции (можно несколько)")
+    parser.add_argument('--status', action='append', choices=['SUCCESS', 'ERROR', 'CACHE_HIT'],
+                        help="Статус записи (можно несколько)")
+    parser.add_argument('--since', help="Начало интервала, ГГГГ-ММ-ДД[ ЧЧ:ММ:СС]")
+    parser.add_argument('--until', help="Конец интервала, ГГГГ-ММ-ДД[ ЧЧ:ММ:СС]")
+    parser.add_argument('--tail', type=int, metavar='N', help="Только последние N записей")
+    parser.add_argument('--follow', action='store_true', help="Ждать и выводить новые записи")
+    parser.add_argument('--summary', action='store_true', help="Сводка по функциям")
+    parser.add_argument('--json', action='store_true', help="Выводить записи в JSON Lines")
+    options = parser.parse_args(argv)
+
+    # Текущего файла может не быть, если остались только ротированные
+    if not log_segments(options.path):
+        print(f"❌ Файл {options.path} не найден")
+        return 1
+
+    query = LogQuery(options.path)
+    filters = dict(func=options.func, status=options.status)
+    if options.json:
+        def show(entry):
+            print(json.dumps(entry.to_dict(), ensure_ascii=False, default=str))
+    else:
+        def show(entry):
+            print(format_entry(entry))
+
+    try:
+        if options.summary:
+            print_summary(query.summary(since=options.since, until=options.until, **filters))
+            return 0
+
+        if options.tail is not None:
+            entries = query.tail(options.tail, **filters)
+        elif options.follow:
+            entries = ()
+        else:
+            entries = query.records(since=options.since, until=options.until, **filters)
+        for entry in entries:
+            show(entry)
+
+        if options.follow:
+            for entry in query.follow(**filters):
+                show(entry)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Потоковое чтение логов декоратора logger
+
+Поддерживаются все форматы записей: текстовый (по умолчанию), JSON Lines
+и двоичный. Формат определяется для каждой записи отдельно, поэтому
+файл, в который писали логгеры с разными форматами, тоже читается.
+Файл читается блоками, а фильтры по функции, статусу и времени
+применяются до разбора аргументов и результата. Ротированные файлы
+(в том числе сжатые gzip) читаются вместе с текущим.
+
+Пример:
+    for entry in iter_records('accounting.log', status='ERROR'):
+        print(entry.func, entry.error)
+"""
+
+import gzip
+import json
+import os
+import re
+import zlib
+from datetime import datetime
+
+from decorators import (
+    BINARY_FLAG_CPU, BINARY_HEADER, BINARY_STATUSES, BINARY_SYNC, BINARY_VERSION, rotated_segment,
+)
+
+
+CHUNK_SIZE = 1 << 20
+# Предельный размер тела двоичной записи: большее значение длины
+# означает поврежденный заголовок
+MAX_RECORD_SIZE = 64 << 20
+
+_SYNC_BYTE = bytes([BINARY_SYNC])
+
+_TEXT_RECORD = re.compile(
+    r'(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) \| ([A-Z_]+) \| (\w+)\((.*?)\) -> (.*) '
+    r'\| Время: ([\d.]+)с(?: \| CPU: ([\d.]+)с)?\s*$',
+    re.S,
+)
+_TEXT_TIMESTAMP = re.compile(rb'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d \|')
+_JSON_TIMESTAMP = re.compile(rb'\{"ts":(-?[0-9.eE+-]+)')
+
+
+class LogEntry:
+    """
+    Прочитанная запись лога.
+
+    Время, функция, статус и длительности доступны сразу, а аргументы,
+    результат и ошибка разбираются при первом обращении. Для текстовых
+    записей args и result - исходный текст из строки лога.
+    """
+
+    __slots__ = ('timestamp', 'func', 'status', 'duration_ns', 'cpu_ns', 'format',
+                 '_payload', '_fields')
+
+    def __init__(self, timestamp, func, status, duration_ns, cpu_ns, format, payload):
+        self.timestamp = timestamp
+        self.func = func
+        self.status = status
+        self.duration_ns = duration_ns
+        self.cpu_ns = cpu_ns
+        self.format = format
+        self._payload = payload
+        self._fields = None
+
+    @property
+    def args(self):
+        return self._decoded()['args']
+
+    @property
+    def kwargs(self):
+        return self._decoded()['kwargs']
+
+    @property
+    def result(self):
+        return self._decoded().get('result')
+
+    @property
+    def has_result(self):
+        """Записан ли результат (logger(log_result=False) его не записывает)"""
+        return 'result' in self._decoded()
+
+    @property
+    def error(self):
+        """Ошибка в виде {'type': ..., 'message': ...} или None"""
+        return self._decoded().get('error')
+
+    def _decoded(self):
+        if self._fields is None:
+            payload = self._payload
+            if self.format == 'binary':
+                values = json.loads(payload)
+                self._fields = {'args': values[0], 'kwargs': values[1]}
+                if self.status == 'ERROR':
+                    self._fields['error'] = {'type': values[2], 'message': values[3]}
+                elif len(values) > 2:
+                    self._fields['result'] = values[2]
+            elif self.format == 'jsonl':
+                self._fields = payload
+            else:
+                args, outcome = payload
+                if self.status == 'ERROR':
+                    error_type, _, message = outcome.partition(': ')
+                    self._fields = {'args': args, 'kwargs': {},
+                                    'error': {'type': error_type, 'message': message}}
+                else:
+                    self._fields = {'args': args, 'kwargs': {}, 'result': outcome}
+        return self._fields
+
+    def to_dict(self):
+        """Запись целиком в виде словаря (в схеме формата JSON Lines)"""
+        document = {
+            'ts': self.timestamp,
+            'func': self.func,
+            'status': self.status,
+            'duration_ns': self.duration_ns,
+        }
+        if self.cpu_ns is not None:
+            document['cpu_ns'] = self.cpu_ns
+        document.update(self._decoded())
+        return document
+
+    def __repr__(self):
+        return (f'LogEntry({self.func!r}, {self.status}, '
+                f'{datetime.fromtimestamp(self.timestamp):%Y-%m-%d %H:%M:%S}, {self.duration_ns} нс)')
+
+
+def iter_records(source, func=None, status=None, since=None, until=None,
+                 strict=False, chunk_size=CHUNK_SIZE, start=0, end=None, rotated=True):
+    """
+    Последовательно прочитать записи лога, отбирая подходящие.
+
+    Args:
+        source: Путь к файлу, открытый в двоичном режиме файл или mmap
+        func (str | Iterable[str]): Имя функции или несколько имен
+        status (str | Iterable[str]): SUCCESS, ERROR, CACHE_HIT или несколько
+        since (float | datetime): Не раньше этого времени
+        until (float | datetime): Раньше этого времени
+        strict (bool): Выбрасывать ValueError на нераспознанных записях
+            вместо того, чтобы пропускать их
+        chunk_size (int): Размер блока чтения в байтах
+        start (int): Смещение начала записи, с которой читать
+        end (int): Смещение, на котором остановиться
+        rotated (bool): Для пути к файлу прочитать сначала ротированные
+            файлы (path.N, path.N.gz, ..., path.1), затем текущий
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        source = os.fsdecode(source)
+        segments = log_segments(source) if rotated and not start and end is None else []
+        for segment in segments or [source]:
+            # Ротированный файл, измененный до начала интервала, можно не читать
+            if (segment != source and since is not None
+                    and os.path.getmtime(segment) < _as_timestamp(since)):
+                continue
+            with open_segment(segment) as stream:
+                yield from iter_records(stream, func, status, since, until, strict,
+                                        chunk_size, start, end)
+        return
+
+    funcs = _as_set(func)
+    statuses = _as_set(status)
+    since = _as_timestamp(since)
+    until = _as_timestamp(until)
+    # Быстрая предварительная проверка строк до разбора JSON и regex
+    json_markers = tuple(f'"func":"{name}"'.encode('utf-8') for name in funcs or ())
+    text_markers = tuple(f'| {name}('.encode('utf-8') for name in funcs or ())
+
+    def selected(entry_func, entry_status, timestamp):
+        return ((funcs is None or entry_func in funcs)
+                and (statuses is None or entry_status in statuses)
+                and (since is None or timestamp >= since)
+                and (until is None or timestamp < until))
+
+    for _, kind, data, body in _scan(source, chunk_size, strict, start, end):
+        if kind == 'binary':
+            _, _, status_code, flags, _, _, timestamp, duration_ns, cpu_ns, name_length = data
+            name = body[:name_length].decode('utf-8')
+            entry_status = BINARY_STATUSES[status_code]
+            if selected(name, entry_status, timestamp):
+                yield LogEntry(timestamp, name, entry_status, duration_ns,
+                               cpu_ns if flags & BINARY_FLAG_CPU else None,
+                               'binary', body[name_length:])
+
+        elif data[:1] == b'{':
+            if json_markers and not any(marker in data for marker in json_markers):
+                continue
+            try:
+                document = json.loads(data)
+                timestamp = document.pop('ts')
+                name = document.pop('func')
+                entry_status = document.pop('status')
+                duration_ns = document.pop('duration_ns')
+            except (ValueError, KeyError, AttributeError):
+                if strict:
+                    raise ValueError(f"Нераспознанная запись JSON: {data[:80]!r}") from None
+                continue
+            if selected(name, entry_status, timestamp):
+                yield LogEntry(timestamp, name, entry_status, duration_ns,
+                               document.pop('cpu_ns', None), 'jsonl', document)
+
+        else:
+            if text_markers and not any(marker in data for marker in text_markers):
+                continue
+            match = _TEXT_RECORD.match(data.decode('utf-8', 'replace'))
+            if match is None:
+                if strict and data.strip():
+                    raise ValueError(f"Нераспознанная строка лога: {data[:80]!r}")
+                continue
+            when, entry_status, name, args, outcome, duration, cpu = match.groups()
+            timestamp = _parse_text_time(when)
+            if selected(name, entry_status, timestamp):
+                yield LogEntry(timestamp, name, entry_status, round(float(duration) * 1e9),
+                               round(float(cpu) * 1e9) if cpu is not None else None,
+                               'text', (args, outcome))
+
+
+def log_segments(path):
+    """
+    Файлы лога от старых к новым: ротированные (сжатые или нет) и текущий.
+
+    Args:
+        path (str): Путь к текущему файлу лога
+    """
+    segments = []
+    index = 1
+    while True:
+        segment = rotated_segment(path, index)
+        if segment is None:
+            break
+        segments.append(segment)
+        index += 1
+    segments.reverse()
+    if os.path.exists(path):
+        segments.append(path)
+    return segments
+
+
+def open_segment(path):
+    """Открыть файл лога для чтения в двоичном режиме, распаковывая .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_records(source, **filters):
+    """Прочитать подходящие записи лога в список (параметры - как у iter_records)"""
+    return list(iter_records(source, **filters))
+
+
+def _scan(stream, chunk_size=CHUNK_SIZE, strict=False, start=0, end=None, partial_tail=True):
+    """
+    Разбить поток байтов на записи.
+
+    Выдает (смещение, 'binary', заголовок, тело) для двоичных записей и
+    (смещение, 'line', строка, None) для текстовых и JSON. Поврежденная
+    двоичная запись пропускается до ближайшей границы строки или байта
+    синхронизации; оборванная двоичная запись в конце файла отбрасывается.
+
+    Args:
+        start (int): Смещение, с которого читать поток
+        end (int): Смещение, на котором остановиться (по умолчанию - конец)
+        partial_tail (bool): Выдавать последнюю строку без перевода строки
+            (False - если запись в файл еще может продолжаться)
+    """
+    header_size = BINARY_HEADER.size
+    if start:
+        stream.seek(start)
+    remaining = None if end is None else end - start
+    base = start  # Смещение data[0] в файле
+    data = b''
+    pos = 0
+
+    while True:
+        size = len(data)
+        if pos < size:
+            if data[pos] == BINARY_SYNC:
+                if size - pos >= header_size:
+                    header = BINARY_HEADER.unpack_from(data, pos)
+                    length = header[4]
+                    if header[1] != BINARY_VERSION or length > MAX_RECORD_SIZE:
+                        pos = _resync(data, pos, base, strict)
+                        continue
+                    if size - pos >= header_size + length:
+                        body_start = pos + header_size
+                        body = data[body_start:body_start + length]
+                        if zlib.crc32(body) != header[5]:
+                            pos = _resync(data, pos, base, strict)
+                            continue
+                        yield base + pos, 'binary', header, body
+                        pos = body_start + length
+                        continue
+            else:
+                newline = data.find(b'\n', pos)
+                if newline >= 0:
+                    yield base + pos, 'line', data[pos:newline], None
+                    pos = newline + 1
+                    continue
+
+        chunk = stream.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:
+            # Последняя строка без перевода строки - полноценная запись
+            if partial_tail and pos < size and data[pos] != BINARY_SYNC:
+                yield base + pos, 'line', data[pos:], None
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        base += pos
+        data = data[pos:] + chunk
+        pos = 0
+
+
+def scan_timestamps(stream, start=0, end=None):
+    """
+    Пройти по завершенным записям потока, не разбирая их содержимое.
+
+    Выдает (смещение, смещение следующей записи, время записи) для
+    каждой записи; для нераспознанных строк время - None. Последняя
+    строка без перевода строки считается недописанной и пропускается.
+    Используется для построения индексов (см. log_query).
+    """
+    for offset, kind, data, body in _scan(stream, start=start, end=end, partial_tail=False):
+        if kind == 'binary':
+            yield offset, offset + BINARY_HEADER.size + len(body), data[6]
+            continue
+
+        timestamp = None
+        if data[:1] == b'{':
+            match = _JSON_TIMESTAMP.match(data)
+            if match is not None:
+                timestamp = float(match.group(1))
+        elif _TEXT_TIMESTAMP.match(data):
+            timestamp = _parse_text_time(data[:19].decode('ascii'))
+        yield offset, offset + len(data) + 1, timestamp
+
+
+def _resync(data, pos, base, strict):
+    """Найти начало следующей записи после поврежденной"""
+    if strict:
+        raise ValueError(f"Поврежденная двоичная запись по смещению {base + pos}")
+    candidates = [index for index in (data.find(_SYNC_BYTE, pos + 1), data.find(b'\n', pos) + 1)
+                  if index > 0]
+    return min(candidates) if candidates else len(data)
+
+
+_last_text_time = [None, 0.0]
+
+
+def _parse_text_time(text):
+    """Время текстовой записи (локальное) в секундах Unix; кэш на одну секунду"""
+    cached_text, timestamp = _last_text_time
+    if text != cached_text:
+        timestamp = datetime.strptime(text, '%Y-%m-%d %H:%M:%S').timestamp()
+        _last_text_time[:] = [text, timestamp]
+    return timestamp
+
+
+def _as_set(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return {value}
+    return set(value)
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
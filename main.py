@@ -1,60 +1,74 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Основной модуль программы "Бухгалтерия" с применением декораторов
-"""
-
-import os
-from datetime import datetime
-from decorators import logger, performance_monitor
-from application.salary import calculate_salary
-from application.db.people import get_employees
-
-
-@logger('main_operations.log')
-@performance_monitor
-def main():
-    """Основная функция программы"""
-    print("=== Программа 'Бухгалтерия' с логированием ===")
-    print(f"Дата запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print()
-
-    # Получаем список сотрудников
-    print("Получаем список сотрудников...")
-    employees = get_employees()
-    print()
-
-    # Рассчитываем зарплату
-    print("Рассчитываем зарплату...")
-    salary_results = calculate_salary()
-    print()
-
-    print("Программа завершена успешно!")
-    print(f"📄 Логи сохранены в файлы: main_operations.log, accounting.log")
-
-    return "SUCCESS"
-
-
-@logger
-def show_logs():
-    """Показать содержимое лог-файлов"""
-    log_files = ['main_operations.log', 'accounting.log']
-
-    for log_file in log_files:
-        if os.path.exists(log_file):
-            print(f"\n📄 Содержимое {log_file}:")
-            print("-" * 60)
-            with open(log_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if content:
-                    print(content)
-                else:
-                    print("Файл пустой")
-        else:
-            print(f"❌ Файл {log_file} не найден")
-
-
-if __name__ == '__main__':
-    main()
-    print("\n" + "=" * 60)
-    show_logs()
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Основной модуль программы "Бухгалтерия" с применением декораторов
+"""
+
+from datetime import datetime
+from decorators import logger, performance_monitor, flush_logs
+from log_query import LogQuery, format_entry, print_summary
+from log_reader import log_segments
+from application.salary import calculate_salary
+from application.db.people import get_employees
+
+
+@logger('main_operations.log')
+@performance_monitor
+def main():
+    """Основная функция программы"""
+    print("=== Программа 'Бухгалтерия' с логированием ===")
+    print(f"Дата запуска: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print()
+
+    # Получаем список сотрудников
+    print("Получаем список сотрудников...")
+    employees = get_employees()
+    print()
+
+    # Рассчитываем зарплату
+    print("Рассчитываем зарплату...")
+    salary_results = calculate_salary()
+    print()
+
+    print("Программа завершена успешно!")
+    print(f"📄 Логи сохранены в файлы: main_operations.log, accounting.log")
+
+    return "SUCCESS"
+
+
+@logger
+def show_logs(tail=20, log_files=('main_operations.log', 'accounting.log')):
+    """
+    Показать последние записи и сводку по лог-файлам
+
+    Логи читаются через индекс log_query, поэтому размер файлов
+    не влияет на потребление памяти. Учитываются и ротированные
+    (в том числе сжатые) файлы, даже если текущего файла уже нет.
+
+    Args:
+        tail (int): Сколько последних записей показать для каждого файла
+        log_files (iterable): Пути к текущим файлам логов
+    """
+    flush_logs()
+
+    for log_file in log_files:
+        if log_segments(log_file):
+            query = LogQuery(log_file)
+            entries = query.tail(tail)
+            print(f"\n📄 Последние записи {log_file}:")
+            print("-" * 60)
+            if entries:
+                for entry in entries:
+                    print(format_entry(entry))
+                print()
+                print_summary(query.summary())
+            else:
+                print("Файл пустой")
+        else:
+            print(f"❌ Файл {log_file} не найден")
+
+
+if __name__ == '__main__':
+    main()
+    print("\n" + "=" * 60)
+    show_logs()
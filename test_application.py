@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тестирование модулей пакета application
+"""
+
+import json
+import math
+import random
+import statistics
+import threading
+from pathlib import Path
+
+import pytest
+
+from decorators import LogRecord, get_sink
+from application.salary import (
+    calculate_taxes, calculate_taxes_batch,
+    calculate_individual_salary, calculate_individual_salaries_batch, LivePayroll,
+)
+from application.incremental import LiveAggregate, LiveDepartmentStats
+from application.console import Console, QUIET, SUMMARY, NORMAL
+from application.payroll import run_payroll, calculate_payroll, process_payroll_chunk, WORKER_LOG_PATH
+from application.stats import DepartmentAggregate, ExactSum, merge_aggregates
+from application.db.columnar import EmployeeColumns, EmployeeRecord
+from application.db.repository import EmployeeRepository
+from application.db.connection import ConnectionPool
+from application.db.sqlite_repository import SqliteEmployeeRepository
+from application.db.importer import import_file
+from application.db.changes import ChangeLog
+
+
+def make_employees():
+    """Небольшой штат для тестов"""
+    return [
+        {"id": 1, "name": "Иванов И.И.", "position": "Менеджер", "salary": 120000.0},
+        {"id": 2, "name": "Петров П.П.", "position": "Программист", "salary": 180000.0},
+        {"id": 3, "name": "Сидоров С.С.", "position": "программист", "salary": 150000.0},
+    ]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_repository(request, tmp_path):
+    """Фабрика хранилищ: в памяти и в файле SQLite"""
+    if request.param == 'memory':
+        yield EmployeeRepository
+        return
+
+    pools = []
+
+    def build(employees=()):
+        pools.append(ConnectionPool(str(tmp_path / f'employees{len(pools)}.sqlite3')))
+        return SqliteEmployeeRepository(pools[-1], employees)
+
+    yield build
+    for pool in pools:
+        pool.close()
+
+
+def test_repository_indexes_by_id_and_position(make_repository):
+    """Поиск по ID и по должности без учета регистра"""
+    repository = make_repository(make_employees())
+
+    assert repository.get(2)['name'] == "Петров П.П."
+    assert repository.get(42) is None
+    assert [emp['id'] for emp in repository.by_position('ПРОГРАММИСТ')] == [2, 3]
+    assert len(repository) == 3
+
+
+def test_repository_incremental_updates(make_repository):
+    """Добавление назначает ID из последовательности, изменение переиндексирует"""
+    repository = make_repository(make_employees())
+
+    added = repository.add({"name": "Кузнецов К.К.", "position": "Дизайнер", "salary": 100000.0})
+    assert added['id'] == 4
+    assert repository.by_position('дизайнер') == [added]
+
+    old, new = repository.update(2, position="Аналитик")
+    assert old['position'] == "Программист" and new['position'] == "Аналитик"
+    assert [emp['id'] for emp in repository.by_position('программист')] == [3]
+    assert repository.by_position('аналитик') == [new]
+
+    with pytest.raises(ValueError):
+        repository.add({"id": 1, "name": "Дубль", "position": "Менеджер"})
+
+
+def test_sqlite_repository_transactions_and_pool(tmp_path):
+    """Пакетная вставка атомарна, данные переживают переоткрытие, пул работает из потоков"""
+    path = str(tmp_path / 'employees.sqlite3')
+    repository = SqliteEmployeeRepository(ConnectionPool(path, size=2), make_employees())
+
+    with pytest.raises(ValueError):
+        repository.add_many([{"name": "Новый", "position": "Дизайнер"},
+                             {"id": 2, "name": "Дубль", "position": "Менеджер"}])
+    assert len(repository) == 3  # откат всей пачки
+    fingerprint = repository.fingerprint()
+
+    def worker(number):
+        for index in range(20):
+            repository.add({"name": f"Сотрудник {number}-{index}", "position": "Аналитик"})
+            assert repository.get(1)['name'] == "Иванов И.И."
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(repository) == 83
+    assert len({employee['id'] for employee in repository.all()}) == 83
+    assert repository.fingerprint() != fingerprint
+    repository.pool.close()
+
+    # Повторное открытие: данные сохранены, начальные сотрудники не дублируются
+    reopened = SqliteEmployeeRepository(ConnectionPool(path), make_employees())
+    assert len(reopened.by_position('аналитик')) == 80
+    assert reopened.add({"name": "Последний", "position": "Менеджер"})['id'] == 84
+    reopened.pool.close()
+
+
+def test_import_file_rejects_bad_rows_without_aborting(make_repository, tmp_path):
+    """Импорт частями: ошибочные строки уходят в файл отклоненных, остальные добавляются"""
+    repository = make_repository(make_employees())
+    source = tmp_path / 'employees.csv'
+    source.write_text(
+        "name,position,salary,hire_date\n"
+        "Новиков Н.Н.,Аналитик,90000,2024-02-01\n"
+        ",Аналитик,90000,2024-02-01\n"              # пустое имя
+        "Орлов О.О.,Дизайнер,много,2024-02-01\n"    # оклад не число
+        "Белов Б.Б.,Дизайнер,,\n"                   # значения по умолчанию
+        "Зуев З.З.,Менеджер,80000,2024-13-01\n",    # неверная дата
+        encoding='utf-8',
+    )
+    chunks = []
+    report = import_file(repository, str(source), chunk_size=2, hire_date='2024-01-01',
+                         on_chunk=chunks.append)
+
+    assert (report.imported, report.rejected) == (2, 3)
+    assert [(chunk.rows, chunk.imported, chunk.rejected) for chunk in chunks] == [(2, 1, 1), (2, 1, 1), (1, 0, 1)]
+    assert [employee['id'] for employee in repository.by_position('дизайнер')] == [5]
+    assert repository.get(5)['salary'] == 100000.0 and repository.get(5)['hire_date'] == '2024-01-01'
+
+    rejects = [json.loads(line) for line in Path(report.rejects_path).read_text(encoding='utf-8').splitlines()]
+    assert [reject['line'] for reject in rejects] == [3, 4, 6]
+    assert rejects[1]['row']['salary'] == 'много'
+
+    # JSONL: явные ID, повтор ID в файле и в хранилище, испорченная строка
+    source = tmp_path / 'employees.jsonl'
+    source.write_text(
+        '{"id": 10, "name": "Ершов Е.Е.", "position": "Аналитик", "salary": 95000}\n'
+        '{"id": 10, "name": "Дубль", "position": "Аналитик"}\n'
+        '{"id": 2, "name": "Занятый", "position": "Аналитик"}\n'
+        '{"name": "Обрыв строки"\n'
+        '\n'
+        '{"name": "Фомин Ф.Ф.", "position": "Аналитик", "bonus": 5}\n'
+        '{"name": "Яшин Я.Я.", "position": "Аналитик"}\n',
+        encoding='utf-8',
+    )
+    report = import_file(repository, str(source), rejects_path=str(tmp_path / 'rejects.jsonl'))
+
+    assert (report.imported, report.rejected) == (2, 4)
+    assert repository.get(10)['name'] == "Ершов Е.Е."
+    analysts = {employee['name']: employee['id'] for employee in repository.by_position('аналитик')}
+    assert sorted(analysts) == ["Ершов Е.Е.", "Новиков Н.Н.", "Яшин Я.Я."]
+    assert len(set(analysts.values())) == 3
+    last_id = max(employee['id'] for employee in repository.all())
+    assert repository.add({"name": "Следующий", "position": "Аналитик"})['id'] == last_id + 1
+    rejects = [json.loads(line) for line in Path(report.rejects_path).read_text(encoding='utf-8').splitlines()]
+    assert sorted(reject['line'] for reject in rejects) == [2, 3, 4, 6]
+
+
+def test_change_log_returns_changes_since_position():
+    """Журнал отдает изменения после номера, а вытесненные - как None"""
+    changes = ChangeLog(maxlen=3)
+    first = {'id': 1, 'salary': 1.0}
+    changes.record(None, first)
+    changes.record_many([(first, {'id': 1, 'salary': 2.0}), (None, {'id': 2, 'salary': 3.0})])
+
+    assert [change.sequence for change in changes.since(1)] == [2, 3]
+    assert changes.since(3) == []
+    assert changes.dirty_ids(1) == {1, 2}
+
+    changes.record({'id': 2, 'salary': 3.0}, {'id': 2, 'salary': 4.0})
+    assert changes.since(0) is None  # первое изменение уже вытеснено
+    assert len(changes.since(1)) == 3
+
+
+def test_live_aggregates_track_changes_incrementally(make_repository):
+    """Итоги зарплаты и статистика по отделам обновляются по журналу и совпадают с пересчетом"""
+    repository = make_repository(make_employees())
+    payroll = LivePayroll(repository, verify_every=1)
+    departments = LiveDepartmentStats(repository, verify_every=1)
+    assert payroll.refresh() == -1 and departments.refresh() == -1
+
+    random.seed(24)
+    positions = ["Менеджер", "Программист", "программист", "Аналитик"]
+    for step in range(200):
+        if step % 5 == 0:
+            repository.add({"name": f"Новый {step}", "position": random.choice(positions),
+                            "salary": float(random.randint(50, 300) * 1000)})
+        else:
+            employee = random.choice(repository.all())
+            repository.update(employee['id'], position=random.choice(positions),
+                              salary=employee['salary'] + random.choice([-0.1, 0.3, 10000.0]))
+        assert payroll.refresh() == 1
+        assert departments.refresh() == 1
+
+    assert payroll.verify() == [] and departments.verify() == []
+    assert payroll.rebuilds == departments.rebuilds == 1
+
+    # Удаление крайнего оклада: min/max пересчитываются по индексу должности
+    top = max(repository.by_position('Аналитик'), key=lambda employee: employee['salary'])
+    repository.update(top['id'], position="Менеджер")
+    report = departments.report()
+    analysts = [employee['salary'] for employee in repository.all() if employee['position'] == "Аналитик"]
+    assert report['positions']['Аналитик']['max_salary'] == max(analysts)
+    assert payroll.report()['total_salary'] == math.fsum(employee['salary'] for employee in repository.all())
+
+    # Подкласс без обязательных методов не создается
+    class Incomplete(LiveAggregate):
+        def empty(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete(repository)
+
+    # Рассинхронизация обнаруживается в режиме проверки
+    payroll._aggregate.employees += 1
+    with pytest.raises(RuntimeError):
+        payroll.refresh()
+
+
+def test_snapshot_streams_employees(make_repository):
+    """Снимок штата отдается потоком, а не списком, с той же версией данных"""
+    repository = make_repository(make_employees())
+    with repository.snapshot() as (revision, employees):
+        assert not isinstance(employees, list)
+        assert revision == repository.revision()
+        assert [dict(employee) for employee in employees] == [dict(e) for e in repository.all()]
+
+    fingerprint = repository.fingerprint()
+    assert repository.fingerprint() == fingerprint
+    repository.update(1, salary=1.0)
+    assert repository.fingerprint() != fingerprint
+
+
+def test_live_aggregates_see_writes_from_other_processes(tmp_path):
+    """Запись в ту же базу через другое хранилище (другой процесс) не теряется в итогах"""
+    path = str(tmp_path / 'shared.sqlite3')
+    local = SqliteEmployeeRepository(ConnectionPool(path), make_employees())
+    other = SqliteEmployeeRepository(ConnectionPool(path))
+    payroll = LivePayroll(local, verify_every=0)
+    departments = LiveDepartmentStats(local, verify_every=0)
+    assert payroll.report()['total_employees'] == 3
+    departments.refresh()
+
+    other.add({"name": "Чужой Ч.Ч.", "position": "Аналитик", "salary": 50000.0})
+    report = payroll.report()
+    assert report['total_employees'] == 4 and report['total_salary'] == 500000.0
+    assert departments.report()['positions']['Аналитик']['count'] == 1
+
+    # Свои изменения после чужих снова учитываются по журналу
+    local.update(1, salary=125000.0)
+    rebuilds = payroll.rebuilds
+    assert payroll.refresh() == 1 and payroll.rebuilds == rebuilds
+
+    other.update(1, salary=130000.0)
+    local.update(2, salary=185000.0)
+    assert payroll.refresh() == -1  # чужая запись между своими - полный пересчет
+    assert payroll.verify() == [] and departments.verify() == []
+    local.pool.close()
+    other.pool.close()
+
+
+def test_console_levels_skip_formatting_and_buffer_output():
+    """Тихий режим не форматирует сообщения, буферизованный пишет крупными порциями"""
+    class Stream:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, text):
+            self.writes.append(text)
+
+        def flush(self):
+            pass
+
+    class Expensive:
+        formatted = 0
+
+        def __format__(self, spec):
+            Expensive.formatted += 1
+            return 'значение'
+
+    stream = Stream()
+    console = Console(level=QUIET, stream=stream)
+    console.info("{}", Expensive())
+    console.summary("{}", Expensive())
+    assert Expensive.formatted == 0 and stream.writes == []
+
+    console.level = SUMMARY
+    console.info("деталь {}", Expensive())
+    console.summary("итог {}", Expensive())
+    assert stream.writes == ["итог значение\n"] and Expensive.formatted == 1
+
+    stream = Stream()
+    console = Console(level=NORMAL, buffered=True, buffer_size=100, stream=stream)
+    for index in range(30):
+        console.info("строка {:02}", index)
+    assert 1 <= len(stream.writes) < 5  # порции по ~100 символов, а не 30 записей
+    console.flush()
+    assert ''.join(stream.writes) == ''.join(f"строка {index:02}\n" for index in range(30))
+
+
+def test_employee_record_behaves_like_dict():
+    """Запись со __slots__ читается и выводится как словарь"""
+    data = make_employees()[0]
+    record = EmployeeRecord.from_mapping(data)
+
+    assert record == data
+    assert record['salary'] == 120000.0 and record.get('hire_date') is None
+    assert repr(record) == repr(data)
+    assert record.replace(salary=1.0)['salary'] == 1.0
+    with pytest.raises(AttributeError):
+        record.salary = 0.0
+
+
+def test_employee_columns_round_trip_and_aggregation():
+    """Колонки сохраняют данные и агрегируют оклады по должностям"""
+    employees = make_employees() + [
+        {"id": 4, "name": "Кузнецов К.К.", "position": "Менеджер", "salary": 80000.0,
+         "hire_date": "2025-01-15"},
+    ]
+    columns = EmployeeColumns.from_records(employees)
+
+    assert len(columns) == 4
+    assert [dict(row) for row in columns] == employees
+    assert columns[-1]['hire_date'] == "2025-01-15"
+    assert columns.record(1) == employees[1]
+    assert columns.positions == ["Менеджер", "Программист", "программист"]
+    assert columns.salary_totals_by_position()["Менеджер"] == (2, 200000.0)
+
+
+def test_batch_taxes_match_scalar_function():
+    """Пакетный расчет налогов дает те же значения, что и поштучный"""
+    gross = [0, 1, 150000.0, 123456.78, 99999.99]
+    batch = calculate_taxes_batch(gross, backend='python')
+
+    for index, value in enumerate(gross):
+        scalar = calculate_taxes(value)
+        for column in ('income_tax', 'social_tax', 'net_salary', 'total_taxes'):
+            assert batch[column][index] == scalar[column]
+    assert batch['totals']['employees'] == len(gross)
+
+    with pytest.raises(ValueError):
+        calculate_taxes_batch([100.0, -1.0], backend='python')
+
+
+@pytest.mark.parametrize('value', [True, -1.0, float('nan'), float('inf'), '100'])
+def test_taxes_reject_the_same_values_in_every_implementation(value):
+    """Поштучный и пакетный расчеты отклоняют одни и те же значения"""
+    with pytest.raises(ValueError):
+        calculate_taxes(value)
+    with pytest.raises(ValueError):
+        calculate_taxes_batch([100.0, value], backend='python')
+
+
+@pytest.mark.parametrize('value', [True, -1.0, float('nan'), float('inf'), '100'])
+def test_numpy_batch_taxes_validate_like_scalar(value):
+    """Реализация NumPy проверяет значения так же, как calculate_taxes"""
+    np = pytest.importorskip('numpy')
+
+    gross = [0, 1, 150000.0, 123456.78]
+    batch = calculate_taxes_batch(np.array(gross), backend='numpy')
+    for index, amount in enumerate(gross):
+        assert batch['net_salary'][index] == calculate_taxes(amount)['net_salary']
+    assert batch['totals']['employees'] == len(gross)
+
+    with pytest.raises(ValueError):
+        calculate_taxes_batch([100.0, value], backend='numpy')
+    with pytest.raises(ValueError):
+        calculate_taxes_batch(np.array([value]), backend='numpy')
+
+
+def test_batch_salaries_match_scalar_function():
+    """Пакетный расчет зарплат совпадает с calculate_individual_salary"""
+    names = ["Иванов И.И.", "Петров П.П.", "Сидоров С.С."]
+    base = [120000.0, 180000.0, 150000.0]
+    percents = [15.0, 0.0, 7.5]
+    batch = calculate_individual_salaries_batch(names, base, percents, backend='python')
+
+    for index, name in enumerate(names):
+        scalar = calculate_individual_salary(name, base[index], percents[index])
+        assert batch['bonus'][index] == scalar['bonus']
+        assert batch['total'][index] == scalar['total']
+
+    flat = calculate_individual_salaries_batch(names, base, 10.0, backend='python')
+    assert flat['bonus'] == [salary * 0.1 for salary in base]
+
+
+def test_exact_sum_is_order_independent():
+    """Точная сумма не зависит от порядка и точно откатывается вычитанием"""
+    values = [0.1] * 10 + [1e16, 1.0, -1e16]
+    forward, backward = ExactSum(values), ExactSum(reversed(values))
+
+    assert forward.value == backward.value == math.fsum(values)
+
+    forward.add(123.456)
+    forward.add(-123.456)
+    assert forward.value == backward.value
+
+
+def test_department_aggregate_merges_shards_exactly():
+    """Объединение агрегатов шардов совпадает с расчетом за один проход"""
+    rng = random.Random(7)
+    positions = ['Менеджер', 'Программист', 'Аналитик']
+    employees = [
+        {'id': i, 'name': f'Сотрудник {i}', 'position': rng.choice(positions),
+         'salary': round(rng.uniform(50000, 300000), 2)}
+        for i in range(5000)
+    ]
+
+    whole = DepartmentAggregate().consume(iter(employees))
+    shards = [DepartmentAggregate().consume(employees[i::4]) for i in range(4)]
+    merged = merge_aggregates(shards)
+
+    for position in positions:
+        a, b = whole.positions[position], merged.positions[position]
+        assert (a.count, a.total, a.mean, a.min, a.max) == (b.count, b.total, b.mean, b.min, b.max)
+        salaries = [emp['salary'] for emp in employees if emp['position'] == position]
+        assert b.variance == pytest.approx(statistics.pvariance(salaries), rel=1e-9)
+
+    report = merged.to_report()
+    assert report['total_employees'] == 5000
+    assert report['total_salary_budget'] == whole.overall.total
+
+
+def test_failed_payroll_chunk_is_logged_with_its_size():
+    """Запись об ошибке части содержит описание части, а не общий текст"""
+    formatter = process_payroll_chunk.__fusion__.stages['log'].formatter
+    record = LogRecord(0.0, process_payroll_chunk, ([(1, 'Иванов И.И.', 'оклад', 0.0)],), {},
+                       None, TypeError('оклад'), 0)
+
+    assert '<1 сотрудников>' in formatter.render(record)
+
+
+def test_payroll_runner_matches_in_process_calculation():
+    """Многопроцессный расчет возвращает листки по порядку и те же итоги"""
+    employees = [
+        {'id': i, 'name': f'Сотрудник {i}', 'position': 'Менеджер', 'salary': 100000.0 + i}
+        for i in range(1, 2001)
+    ]
+
+    # Режим process_safe включается только на время работы пула процессов
+    sink = get_sink(WORKER_LOG_PATH)
+    previous = sink.process_safe
+    runner = run_payroll(employees, bonus_percent=10.0, workers=2, chunk_size=300)
+    parallel = [next(runner)]
+    assert sink.process_safe
+    parallel.extend(runner)
+    assert sink.process_safe == previous
+
+    serial = list(run_payroll(employees, bonus_percent=10.0, workers=1))
+
+    assert parallel == serial
+    assert [payslip['id'] for payslip in parallel] == list(range(1, 2001))
+
+    report = calculate_payroll(employees, bonus_percent=10.0, workers=2, chunk_size=300)
+    assert report['total_employees'] == 2000
+    assert report['total_salary'] == math.fsum(payslip['total'] for payslip in serial)
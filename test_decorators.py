@@ -1,114 +1,937 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-Тестирование всех декораторов и обновленной программы "Бухгалтерия"
-"""
-
-import os
-from datetime import datetime
-from decorators import logger
-from application.salary import calculate_individual_salary, calculate_taxes
-from application.db.people import get_employee_by_id, add_employee
-
-
-def clean_log_files():
-    """Очистка лог-файлов перед тестированием"""
-    log_files = ['accounting.log', 'main_operations.log', 'test.log']
-    for file in log_files:
-        if os.path.exists(file):
-            os.remove(file)
-    print("🧹 Лог-файлы очищены")
-
-
-@logger('test.log')
-def test_accounting_functions():
-    """Тестирование функций бухгалтерии с логированием"""
-    print("🧪 Начинаем тестирование функций...")
-
-    # Тест 1: Получение сотрудника по ID
-    print("\n1. Тестируем получение сотрудника по ID:")
-    employee = get_employee_by_id(1)
-    print(f"   Результат: {employee}")
-
-    # Тест 2: Добавление нового сотрудника
-    print("\n2. Тестируем добавление сотрудника:")
-    new_emp = add_employee("Кузнецов К.К.", "Дизайнер")
-    print(f"   Результат: {new_emp}")
-
-    # Тест 3: Расчет индивидуальной зарплаты
-    print("\n3. Тестируем расчет зарплаты:")
-    salary_result = calculate_individual_salary("Иванов И.И.", 120000.0, 15.0)
-    print(f"   Результат: {salary_result}")
-
-    # Тест 4: Расчет налогов
-    print("\n4. Тестируем расчет налогов:")
-    tax_result = calculate_taxes(150000.0)
-    print(f"   Результат: {tax_result}")
-
-    return "Все тесты завершены"
-
-
-@logger('test.log')
-def test_error_handling():
-    """Тестирование обработки ошибок в декораторе"""
-    print("⚠️ Тестируем обработку ошибок:")
-
-    try:
-        # Намеренно вызываем ошибку валидации типов
-        calculate_individual_salary(123, "invalid", 10.0)  # Неправильные типы
-    except TypeError as e:
-        print(f"   Поймана ошибка типа: {e}")
-
-    try:
-        # Намеренно вызываем ошибку валидации значений
-        calculate_taxes(-1000)  # Отрицательная зарплата
-    except ValueError as e:
-        print(f"   Поймана ошибка значения: {e}")
-
-    return "Тестирование ошибок завершено"
-
-
-def show_test_logs():
-    """Показать содержимое тестовых логов"""
-    log_files = ['test.log', 'accounting.log']
-
-    for log_file in log_files:
-        if os.path.exists(log_file):
-            print(f"\n📄 Содержимое {log_file}:")
-            print("=" * 60)
-            with open(log_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if content:
-                    print(content)
-                else:
-                    print("Файл пустой")
-        else:
-            print(f"❌ Файл {log_file} не найден")
-
-
-def main():
-    """Основная функция для запуска всех тестов"""
-    print("🚀 Запуск полного тестирования декораторов")
-    print("=" * 60)
-
-    # Очищаем старые логи
-    clean_log_files()
-
-    # Запускаем тесты
-    test_result1 = test_accounting_functions()
-    print(f"\n✅ {test_result1}")
-
-    test_result2 = test_error_handling()
-    print(f"✅ {test_result2}")
-
-    # Показываем логи
-    print("\n" + "=" * 60)
-    print("РЕЗУЛЬТАТЫ ЛОГИРОВАНИЯ:")
-    show_test_logs()
-
-    print("\n" + "=" * 60)
-    print("🎉 Тестирование завершено успешно!")
-
-
-if __name__ == '__main__':
-    main()
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тестирование всех декораторов и обновленной программы "Бухгалтерия"
+"""
+
+import asyncio
+import gzip
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import pytest
+
+from decorators import (
+    logger, performance_monitor, validate_args, configure_validation, flush_logs,
+    close_logs, configure_sink, get_sink, Sampler, LatencyHistogram, MetricsRegistry,
+    metric_name, cached, single_flight, instrument, InstrumentationConfig,
+    configure_instrumentation, reset_instrumentation, INSTRUMENT_ERRORS, INSTRUMENT_ON,
+    INSTRUMENT_OFF, persistent_cache, get_persistent_store,
+)
+from log_reader import read_records
+from log_query import LogQuery, main as log_query_main
+from application.salary import calculate_individual_salary, calculate_taxes
+from application.db.people import (
+    get_employee_by_id, add_employee, get_employees_by_position, calculate_department_stats,
+)
+
+
+def clean_log_files():
+    """Очистка лог-файлов перед тестированием"""
+    log_files = ['accounting.log', 'main_operations.log', 'test.log']
+    for file in log_files:
+        if os.path.exists(file):
+            os.remove(file)
+    print("🧹 Лог-файлы очищены")
+
+
+@logger('test.log')
+def test_accounting_functions():
+    """Тестирование функций бухгалтерии с логированием"""
+    print("🧪 Начинаем тестирование функций...")
+
+    # Тест 1: Получение сотрудника по ID
+    print("\n1. Тестируем получение сотрудника по ID:")
+    employee = get_employee_by_id(1)
+    print(f"   Результат: {employee}")
+
+    # Тест 2: Добавление нового сотрудника
+    print("\n2. Тестируем добавление сотрудника:")
+    new_emp = add_employee("Кузнецов К.К.", "Дизайнер")
+    print(f"   Результат: {new_emp}")
+
+    # Тест 3: Расчет индивидуальной зарплаты
+    print("\n3. Тестируем расчет зарплаты:")
+    salary_result = calculate_individual_salary("Иванов И.И.", 120000.0, 15.0)
+    print(f"   Результат: {salary_result}")
+
+    # Тест 4: Расчет налогов
+    print("\n4. Тестируем расчет налогов:")
+    tax_result = calculate_taxes(150000.0)
+    print(f"   Результат: {tax_result}")
+
+    return "Все тесты завершены"
+
+
+@logger('test.log')
+def test_error_handling():
+    """Тестирование обработки ошибок в декораторе"""
+    print("⚠️ Тестируем обработку ошибок:")
+
+    try:
+        # Намеренно вызываем ошибку валидации типов
+        calculate_individual_salary(123, "invalid", 10.0)  # Неправильные типы
+    except TypeError as e:
+        print(f"   Поймана ошибка типа: {e}")
+
+    try:
+        # Намеренно вызываем ошибку валидации значений
+        calculate_taxes(-1000)  # Отрицательная зарплата
+    except ValueError as e:
+        print(f"   Поймана ошибка значения: {e}")
+
+    return "Тестирование ошибок завершено"
+
+
+def test_log_sink_buffers_records(tmp_path):
+    """Записи буферизуются приемником и попадают в файл после flush"""
+    path = str(tmp_path / 'sink.log')
+
+    @logger(path)
+    def summator(a, b=0):
+        return a + b
+
+    for i in range(10):
+        summator(i, b=1)
+    flush_logs(path)
+
+    with open(path, encoding='utf-8') as log_file:
+        lines = log_file.read().splitlines()
+
+    assert len(lines) == 10
+    assert 'summator(9, b=1) -> 10' in lines[-1]
+
+
+def test_log_sink_durable_mode(tmp_path):
+    """В режиме durable запись доступна сразу после возврата из функции"""
+    path = str(tmp_path / 'audit.log')
+
+    @logger(path, durable=True)
+    def audit(value):
+        return value
+
+    audit('проверка')
+
+    with open(path, encoding='utf-8') as log_file:
+        assert 'audit(проверка) -> проверка' in log_file.read()
+
+
+def test_log_sink_reopens_removed_file(tmp_path):
+    """Приемник переоткрывает файл, если его удалили между сбросами"""
+    path = str(tmp_path / 'removed.log')
+    sink = get_sink(path)
+
+    sink.emit('первая\n')
+    sink.flush()
+    os.remove(path)
+    sink.emit('вторая\n')
+    sink.close()
+
+    with open(path, encoding='utf-8') as log_file:
+        assert log_file.read() == 'вторая\n'
+
+
+def test_logger_formats_records_lazily(tmp_path):
+    """Аргументы преобразуются в текст только при записи, а не при вызове"""
+    path = str(tmp_path / 'lazy.log')
+    rendered_in = []
+
+    class Payload:
+        def __str__(self):
+            rendered_in.append(True)
+            return 'payload'
+
+    @logger(path)
+    def consume(payload):
+        return len(rendered_in)
+
+    assert consume(Payload()) == 0
+    flush_logs(path)
+    assert len(rendered_in) == 1
+
+    with open(path, encoding='utf-8') as log_file:
+        assert 'consume(payload) -> 0' in log_file.read()
+
+
+def test_logger_render_options(tmp_path):
+    """Обрезка, отключение результата, маскировка и единый формат ошибок"""
+    path = str(tmp_path / 'options.log')
+
+    @logger(path, max_length=10)
+    def big():
+        return 'x' * 100
+
+    @logger(path, log_result=False)
+    def secret_result():
+        return 'тайна'
+
+    @logger(path, redact=lambda args, kwargs, result: (('***',), kwargs, result))
+    def login(password):
+        return 'ok'
+
+    @logger(path)
+    def fail(value):
+        raise ValueError('плохое значение')
+
+    big()
+    secret_result()
+    login('qwerty')
+    try:
+        fail(-1)
+    except ValueError:
+        pass
+    flush_logs(path)
+
+    with open(path, encoding='utf-8') as log_file:
+        content = log_file.read()
+
+    assert 'big() -> xxxxxxxxxx... [+90 симв.]' in content
+    assert 'secret_result() -> ... |' in content
+    assert 'login(***) -> ok' in content and 'qwerty' not in content
+    assert 'ERROR | fail(-1) -> ValueError: плохое значение' in content
+
+
+def test_logger_sampling_counts_dropped_calls(tmp_path):
+    """При выборке 1 из N записывается каждый N-й вызов, ошибки - всегда"""
+    path = str(tmp_path / 'sampled.log')
+
+    @logger(path, sample_every=10)
+    def square(x):
+        if x < 0:
+            raise ValueError('отрицательное число')
+        return x * x
+
+    for i in range(100):
+        square(i)
+    try:
+        square(-1)
+    except ValueError:
+        pass
+    flush_logs(path)
+
+    with open(path, encoding='utf-8') as log_file:
+        lines = log_file.read().splitlines()
+
+    stats = square.sampler.stats()
+    assert len(lines) == stats['emitted'] == 11
+    assert stats['dropped'] == 90
+    assert 'ERROR | square(-1)' in lines[-1]
+
+
+def test_sampler_rate_limit_and_slow_calls():
+    """Token bucket ограничивает частоту, медленные вызовы проходят всегда"""
+    sampler = Sampler(rate=1, burst=3, slow_threshold=0.5)
+
+    decisions = [sampler.sample() for _ in range(10)]
+    assert decisions.count(True) == 3
+    assert sampler.is_outlier(None, 1_000_000_000)
+    assert not sampler.is_outlier(None, 100_000_000)
+
+
+def test_logger_records_nanosecond_and_cpu_time(tmp_path):
+    """Длительность хранится в наносекундах, CPU-время записывается по запросу"""
+    path = str(tmp_path / 'timing.log')
+    records = []
+
+    @logger(path, cpu_time='thread')
+    def busy():
+        return sum(range(10000))
+
+    sink = get_sink(path)
+    original_emit = sink.emit
+    sink.emit = lambda record, *options: (records.append(record),
+                                          original_emit(record, *options))
+    busy()
+    sink.emit = original_emit
+    flush_logs(path)
+
+    record = records[0]
+    assert isinstance(record.duration_ns, int) and record.duration_ns > 0
+    assert isinstance(record.cpu_ns, int) and record.cpu_ns >= 0
+
+    with open(path, encoding='utf-8') as log_file:
+        assert '| CPU: ' in log_file.read()
+
+
+def test_latency_histogram_percentiles():
+    """Перцентили гистограммы совпадают с точными с погрешностью до 3%"""
+    histogram = LatencyHistogram()
+    values = [i * 1000 for i in range(1, 10001)]
+    for value in values:
+        histogram.record(value)
+
+    summary = histogram.summary()
+    assert summary['count'] == 10000
+    assert summary['max'] == 10_000_000
+    for key, exact in (('p50', 5_000_000), ('p90', 9_000_000), ('p99', 9_900_000)):
+        assert abs(summary[key] - exact) / exact < 0.03
+
+    other = LatencyHistogram()
+    other.record(50_000_000)
+    histogram.merge(other)
+    assert histogram.count == 10001 and histogram.max_ns == 50_000_000
+
+
+def test_performance_monitor_feeds_registry():
+    """performance_monitor накапливает измерения в реестре метрик"""
+    registry = MetricsRegistry()
+
+    @performance_monitor(registry=registry)
+    def quick():
+        return 1
+
+    for _ in range(50):
+        quick()
+
+    name = metric_name(quick)
+    assert registry.summary(name)['count'] == 50
+
+    window = registry.snapshot(reset=True)
+    assert window['metrics'][name]['count'] == 50
+    assert registry.summary(name)['count'] == 0
+
+
+def test_slow_call_warning_goes_through_console(capsys):
+    """Предупреждение о медленном вызове подчиняется уровню консоли"""
+    from application import console as console_module
+
+    @performance_monitor(threshold=0, registry=None)
+    def slow():
+        return 1
+
+    previous = console_module.console.level
+    try:
+        console_module.configure_console(level='quiet')
+        slow()
+        assert capsys.readouterr().out == ''
+
+        console_module.configure_console(level='normal')
+        slow()
+        assert 'МЕДЛЕННОЕ ВЫПОЛНЕНИЕ: slow' in capsys.readouterr().out
+    finally:
+        console_module.configure_console(level=previous)
+
+
+def test_cached_lru_ttl_and_unhashable_args():
+    """Кэш вытесняет старые записи, учитывает TTL и принимает списки и словари"""
+    calls = []
+
+    @cached(maxsize=2, ttl=0.05)
+    def total(values, options=None):
+        calls.append(values)
+        return sum(values)
+
+    assert total([1, 2]) == 3
+    assert total([1, 2]) == 3
+    assert total([3], options={'mode': 'fast'}) == 3
+    assert total([4]) == 4
+    assert total([1, 2]) == 3  # вытеснено LRU
+    assert len(calls) == 4
+
+    info = total.cache_info()
+    assert (info.hits, info.misses, info.evictions, info.size) == (1, 4, 2, 2)
+
+    time.sleep(0.06)
+    total([4])
+    assert total.cache_info().expirations == 1
+
+    assert total.cache_invalidate([4])
+    assert not total.cache_invalidate([100])
+
+
+def test_logger_marks_cache_hits(tmp_path):
+    """Попадания в кэш записываются как CACHE_HIT, промахи - как SUCCESS"""
+    path = str(tmp_path / 'cache.log')
+
+    @logger(path)
+    @cached()
+    def lookup(key):
+        return key.upper()
+
+    lookup('a')
+    lookup('a')
+    flush_logs(path)
+
+    with open(path, encoding='utf-8') as log_file:
+        lines = log_file.read().splitlines()
+
+    assert '| SUCCESS | lookup(a) -> A' in lines[0]
+    assert '| CACHE_HIT | lookup(a) -> A' in lines[1]
+
+
+def test_add_employee_invalidates_people_caches():
+    """Добавление сотрудника сбрасывает кэш поиска по должности"""
+    get_employees_by_position('Дизайнер')
+    assert get_employees_by_position.cache_info().size >= 1
+
+    add_employee("Смирнов С.С.", "Дизайнер")
+    assert get_employees_by_position.cache_invalidate('Дизайнер') is False
+
+    # Запросы, совпадающие с должностью по ключу индекса, тоже сбрасываются
+    padded = len(get_employees_by_position(' дизайнер '))
+    assert len(get_employees_by_position('ДИЗАЙНЕР')) == padded
+    add_employee("Орлов О.О.", "Дизайнер")
+    assert len(get_employees_by_position(' дизайнер ')) == padded + 1
+    assert len(get_employees_by_position('ДИЗАЙНЕР')) == padded + 1
+
+
+def test_department_stats_timestamp_is_not_cached():
+    """Повторный отчет из кэша получает текущее время формирования"""
+    first = calculate_department_stats()
+    time.sleep(0.001)
+    second = calculate_department_stats()
+
+    assert second['generated_at'] > first['generated_at']
+    del first['generated_at'], second['generated_at']
+    assert second == first
+
+
+def test_show_logs_reads_rotated_segments_without_current_file(tmp_path, capsys):
+    """show_logs показывает ротированные и сжатые файлы, даже если текущего нет"""
+    from main import show_logs
+
+    line = "2026-01-15 10:00:00 | SUCCESS | calculate_salary() -> {} | Время: 0.000100с\n"
+    path = tmp_path / 'accounting.log'
+    (tmp_path / 'accounting.log.1').write_text(line * 2, encoding='utf-8')
+    with gzip.open(tmp_path / 'accounting.log.2.gz', 'wt', encoding='utf-8') as segment:
+        segment.write(line)
+
+    show_logs(log_files=[str(path), str(tmp_path / 'missing.log')])
+    output = capsys.readouterr().out
+    assert f"Последние записи {path}" in output
+    assert output.count('calculate_salary') >= 3
+    assert "missing.log не найден" in output
+
+
+def test_salary_cache_hits_are_not_monitored():
+    """Попадания постоянного кэша calculate_salary не попадают в гистограмму времени"""
+    from application.salary import calculate_salary
+
+    first = calculate_salary()
+    executions = calculate_salary.histogram.count
+    assert calculate_salary() == first
+    assert calculate_salary.histogram.count == executions
+
+
+def test_single_flight_coalesces_threads():
+    """Одновременные вызовы с одним ключом выполняют функцию один раз"""
+    started = threading.Event()
+    release = threading.Event()
+
+    @single_flight()
+    def load(source):
+        started.set()
+        release.wait(1)
+        return [source]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(load('db'))) for _ in range(8)]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    while load.flight_info().calls < 8:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    info = load.flight_info()
+    assert (info.executions, info.coalesced, info.in_flight) == (1, 7, 0)
+    assert all(result is results[0] for result in results)
+
+
+def test_single_flight_shares_errors_in_asyncio():
+    """Корутины с одним ключом разделяют результат и исключение"""
+    executions = []
+
+    @single_flight()
+    async def fetch(key):
+        executions.append(key)
+        await asyncio.sleep(0.01)
+        if key == 'bad':
+            raise LookupError(key)
+        return key * 2
+
+    async def scenario():
+        good = await asyncio.gather(*(fetch('ok') for _ in range(5)))
+        bad = await asyncio.gather(*(fetch('bad') for _ in range(3)), return_exceptions=True)
+        return good, bad
+
+    good, bad = asyncio.run(scenario())
+    assert good == ['okok'] * 5
+    assert all(isinstance(error, LookupError) for error in bad)
+    assert executions == ['ok', 'bad']
+    assert fetch.flight_info().coalesced == 6
+
+
+def test_cached_coroutine_stores_awaited_result():
+    """@cached над корутиной кэширует результат, а одновременные промахи выполняются один раз"""
+    executions = []
+
+    @cached(maxsize=8)
+    async def fetch(key):
+        executions.append(key)
+        await asyncio.sleep(0.01)
+        if key == 'bad':
+            raise ValueError(key)
+        return key.upper()
+
+    async def scenario():
+        first = await asyncio.gather(*(fetch('a') for _ in range(5)))
+        again = await fetch('a')
+        failed = await asyncio.gather(fetch('bad'), fetch('bad'), return_exceptions=True)
+        return first, again, failed
+
+    assert inspect.iscoroutinefunction(fetch)
+    first, again, failed = asyncio.run(scenario())
+    assert first == ['A'] * 5 and again == 'A'
+    assert all(isinstance(error, ValueError) for error in failed)
+    assert executions == ['a', 'bad']
+    assert fetch.cache_info().size == 1
+
+    # Исключения не кэшируются: следующий вызов выполняет функцию снова
+    with pytest.raises(ValueError):
+        asyncio.run(fetch('bad'))
+    assert executions == ['a', 'bad', 'bad']
+
+
+def test_async_decorators_measure_awaited_execution(tmp_path):
+    """Асинхронные обертки измеряют выполнение корутины, а не ее создание"""
+    path = str(tmp_path / 'async.log')
+    registry = MetricsRegistry()
+
+    @logger(path)
+    @performance_monitor(registry=registry)
+    @validate_args(int)
+    async def fetch(delay_ms):
+        await asyncio.sleep(delay_ms / 1000)
+        return delay_ms
+
+    @logger(path)
+    async def stream(count):
+        for i in range(count):
+            await asyncio.sleep(0)
+            yield i
+
+    async def scenario():
+        results = await asyncio.gather(*(fetch(20) for _ in range(10)))
+        items = [item async for item in stream(3)]
+        return results, items
+
+    assert inspect.iscoroutinefunction(fetch)
+    results, items = asyncio.run(scenario())
+    assert results == [20] * 10 and items == [0, 1, 2]
+
+    with pytest.raises(TypeError):
+        asyncio.run(fetch('20'))
+
+    summary = registry.summary(metric_name(fetch))
+    assert summary['count'] == 11 and summary['p90'] >= 20_000_000
+
+    flush_logs(path)
+    with open(path, encoding='utf-8') as log_file:
+        content = log_file.read()
+    assert content.count('SUCCESS | fetch(20) -> 20') == 10
+    assert 'ERROR | fetch(20) -> TypeError' in content
+    assert 'stream(3) -> <3 элементов>' in content
+
+
+def test_validate_args_binds_to_signature():
+    """Проверка аргументов по имени, составных типов и глобального режима"""
+
+    @validate_args(str, float, Optional[float], tags=tuple[str, ...])
+    def payslip(name, base, bonus=None, *, tags=()):
+        return name
+
+    assert payslip('Иван', base=1.0) == 'Иван'
+    assert payslip('Иван', 1.0, None, tags=('a', 'b')) == 'Иван'
+
+    for call in (lambda: payslip('Иван', base=1),
+                 lambda: payslip('Иван', 1.0, 'x'),
+                 lambda: payslip('Иван', 1.0, tags=('a', 1))):
+        with pytest.raises(TypeError, match='функции payslip'):
+            call()
+
+    try:
+        configure_validation(sample_every=2)
+        failures = 0
+        for _ in range(4):
+            try:
+                payslip(1, 1)
+            except TypeError:
+                failures += 1
+        assert failures == 2
+
+        configure_validation(enabled=False)
+        assert payslip(1, 1) == 1
+    finally:
+        configure_validation()
+
+    with pytest.raises(TypeError):
+        validate_args(int, int)(lambda value: value)
+
+
+def test_decorator_stack_fuses_into_one_wrapper(tmp_path):
+    """Стек logger/cached/validate_args/performance_monitor - одна обертка"""
+    path = str(tmp_path / 'fused.log')
+    registry = MetricsRegistry()
+    calls = []
+
+    def salary(name, base):
+        calls.append(name)
+        return base * 2
+
+    @logger(path)
+    @cached()
+    @validate_args(str, float)
+    @performance_monitor(registry=registry)
+    def stacked(name, base):
+        return salary(name, base)
+
+    fused = instrument(log=path, cache=True, validate=(str, float),
+                       monitor={'registry': registry})(salary)
+
+    for func in (stacked, fused):
+        assert not hasattr(func.__wrapped__, '__wrapped__')
+        assert func('Иван', 100.0) == 200.0
+        assert func('Иван', 100.0) == 200.0
+        with pytest.raises(TypeError, match='должен быть типа float'):
+            func('Иван', '100')
+        assert func.cache_info().hits == 1
+        assert func.histogram.count == 1  # попадание и отклоненный вызов не измеряются
+    flush_logs(path)
+
+    statuses = [record.status for record in read_records(path)]
+    assert statuses == ['SUCCESS', 'CACHE_HIT', 'ERROR'] * 2
+    assert calls == ['Иван', 'Иван']
+
+    # Монитор над логгером остается отдельным слоем с прежним поведением
+    outer = performance_monitor(registry=MetricsRegistry())(logger(path)(salary))
+    assert outer.__wrapped__.__wrapped__ is salary
+    assert outer('Петр', 1.0) == 2.0
+    assert outer.histogram.count == 1
+
+
+def test_instrumentation_levels_per_module_and_runtime(tmp_path):
+    """Части выключаются при декорировании и переключаются во время работы"""
+    path = str(tmp_path / 'levels.log')
+    config = InstrumentationConfig('monitor=off; application.salary:all=on, log=errors')
+    assert config.level('application.salary.calculate_salary', 'log') == INSTRUMENT_ERRORS
+    assert config.level('application.salary.calculate_salary', 'monitor') == INSTRUMENT_ON
+    assert config.level('application.db.people.get_employees', 'monitor') == INSTRUMENT_OFF
+    with pytest.raises(ValueError):
+        config.load('log=verbose')
+
+    def checked(value):
+        if value < 0:
+            raise ValueError(value)
+        return value
+
+    try:
+        configure_instrumentation('test_decorators', monitor='off')
+        assert performance_monitor(checked) is checked
+        assert logger(path)(performance_monitor(checked)).__wrapped__ is checked
+
+        logged = logger(path, log_format='jsonl')(checked)
+        configure_instrumentation(log='errors')
+        logged(1)
+        with pytest.raises(ValueError):
+            logged(-1)
+        configure_instrumentation(log=False)
+        logged(2)
+        configure_instrumentation(log='on')
+        logged(3)
+    finally:
+        reset_instrumentation()
+    flush_logs(path)
+
+    assert [(entry.status, entry.args) for entry in read_records(path)] == [
+        ('ERROR', [-1]), ('SUCCESS', [3])]
+
+
+def test_persistent_cache_survives_restart_and_tracks_inputs(tmp_path):
+    """Постоянный кэш переживает перезапуск и учитывает снимок входных данных"""
+    path = str(tmp_path / 'results.sqlite3')
+    log_path = str(tmp_path / 'persistent.log')
+    roster = {'version': 1}
+    calls = []
+
+    def build():
+        @logger(log_path)
+        @persistent_cache(path, depends_on=lambda: roster['version'], max_entries=2)
+        def report(scale):
+            calls.append(scale)
+            return {'total': scale * roster['version']}
+        return report
+
+    assert build()(10) == {'total': 10}
+    get_persistent_store(path).close()
+    report = build()  # как при новом запуске программы
+    assert report(10) == {'total': 10}
+    assert calls == [10]
+
+    roster['version'] = 2
+    assert report(10) == {'total': 20}
+    report(20)
+    report(30)
+    assert calls == [10, 10, 20, 30]
+    info = report.persistent_cache.info()
+    assert (info.hits, info.entries) == (1, 2)  # старые результаты вытеснены
+
+    flush_logs(log_path)
+    assert [entry.status for entry in read_records(log_path)][:3] == ['SUCCESS', 'CACHE_HIT', 'SUCCESS']
+
+
+def test_structured_log_formats_round_trip(tmp_path):
+    """JSONL и двоичные записи читаются log_reader вместе с текстовыми"""
+    path = str(tmp_path / 'structured.log')
+
+    @logger(path, log_format='binary', cpu_time='thread')
+    def payslip(employee_id, bonus_percent=0.0):
+        return {'id': employee_id, 'positions': {'Программист'}}
+
+    @logger(path, log_format='jsonl')
+    def fail(reason):
+        raise ValueError(reason)
+
+    @logger(path)
+    def legacy(value):
+        return value
+
+    payslip(1)
+    payslip(2, bonus_percent=15.0)
+    with pytest.raises(ValueError):
+        fail('нет данных')
+    legacy('текст')
+    flush_logs(path)
+    # Оборванная двоичная запись не мешает читать следующие
+    with open(path, 'ab') as log_file:
+        log_file.write(b'\xa5' + b'\x00' * 10 + b'\n')
+    legacy(42)
+    flush_logs(path)
+
+    entries = read_records(path)
+    assert [(entry.func, entry.format) for entry in entries] == [
+        ('payslip', 'binary'), ('payslip', 'binary'), ('fail', 'jsonl'),
+        ('legacy', 'text'), ('legacy', 'text'),
+    ]
+    assert entries[1].kwargs == {'bonus_percent': 15.0}
+    assert entries[1].result == {'id': 2, 'positions': ['Программист']}
+    assert entries[0].cpu_ns is not None and entries[2].cpu_ns is None
+    assert entries[2].error == {'type': 'ValueError', 'message': 'нет данных'}
+    assert entries[4].result == '42'
+
+    errors = read_records(path, status='ERROR')
+    assert [entry.func for entry in errors] == ['fail']
+    assert len(read_records(path, func={'payslip', 'legacy'}, since=int(entries[0].timestamp))) == 4
+    with pytest.raises(ValueError):
+        read_records(path, strict=True)
+
+
+def test_log_query_cli_reads_rotated_segments_only(tmp_path, capsys):
+    """Утилита log_query читает ротированные файлы, даже если текущего нет"""
+    line = "2026-01-15 10:00:00 | SUCCESS | calculate_taxes(1000) -> {} | Время: 0.000100с\n"
+    path = tmp_path / 'accounting.log'
+    (tmp_path / 'accounting.log.1').write_text(line, encoding='utf-8')
+    with gzip.open(tmp_path / 'accounting.log.2.gz', 'wt', encoding='utf-8') as segment:
+        segment.write(line * 2)
+
+    assert log_query_main([str(path), '--tail', '10']) == 0
+    output = capsys.readouterr().out
+    assert output.count('calculate_taxes') == 3 and 'не найден' not in output
+
+    assert log_query_main([str(tmp_path / 'missing.log')]) == 1
+    assert 'не найден' in capsys.readouterr().out
+
+
+def test_log_query_uses_incremental_index(tmp_path):
+    """Запросы, tail и сводка по логу через индекс смещений"""
+    path = str(tmp_path / 'query.log')
+
+    @logger(path, log_format='jsonl')
+    def payslip(employee_id):
+        if employee_id % 10 == 0:
+            raise ValueError(employee_id)
+        return employee_id
+
+    def run(ids):
+        for employee_id in ids:
+            try:
+                payslip(employee_id)
+            except ValueError:
+                pass
+        flush_logs(path)
+
+    run(range(1, 101))
+    query = LogQuery(path)
+    assert len(list(query.records())) == 100
+    assert len(query.index) == 100 and os.path.exists(path + '.idx')
+
+    run(range(101, 151))
+    assert len(list(LogQuery(path).records())) == 150
+    assert LogQuery(path).index._stored == 150
+
+    errors = query.tail(3, status='ERROR')
+    assert [entry.args for entry in errors] == [[130], [140], [150]]
+    assert list(query.records(since=time.time() + 3600)) == []
+
+    summary = query.summary(func='payslip')
+    assert summary['payslip']['calls'] == 150 and summary['payslip']['errors'] == 15
+
+    # После очистки лога индекс строится заново
+    os.remove(path)
+    run([1])
+    assert [entry.args for entry in query.records()] == [[1]]
+
+
+def _write_rotating_log(path, worker, count):
+    """Запись лога с ротацией из отдельного процесса"""
+    configure_sink(path, max_bytes=4096, backup_count=100, batch_size=16)
+
+    @logger(path)
+    def payslip(worker_id, employee_id):
+        return employee_id
+
+    for employee_id in range(count):
+        payslip(worker, employee_id)
+        if employee_id % 25 == 0:  # Ротация проверяется перед записью пачки
+            flush_logs(path)
+    close_logs(path)
+
+
+def test_log_rotation_by_size_and_day(tmp_path):
+    """Ротация по размеру и по дню со сжатием, чтение всех поколений"""
+    path = str(tmp_path / 'rotating.log')
+    _write_rotating_log(path, 0, 300)
+
+    segments = sorted(os.listdir(tmp_path))
+    assert 'rotating.log.1.gz' in segments and 'rotating.log.1' not in segments
+    entries = read_records(path, strict=True)
+    assert [entry.result for entry in entries] == [str(i) for i in range(300)]
+
+    # Лишние поколения удаляются
+    configure_sink(path, max_bytes=4096, backup_count=2)
+    for _ in range(3):
+        get_sink(path).emit('x' * 5000 + '\n')
+        flush_logs(path)
+    close_logs(path)
+    assert not os.path.exists(path + '.3.gz') and os.path.exists(path + '.2.gz')
+
+    # Файл, последний раз измененный вчера, ротируется при первой записи за день
+    daily = str(tmp_path / 'daily.log')
+    with open(daily, 'w', encoding='utf-8') as log_file:
+        log_file.write('вчерашняя запись\n')
+    yesterday = time.time() - 86400
+    os.utime(daily, (yesterday, yesterday))
+    configure_sink(daily, when='midnight', compress=False)
+    get_sink(daily).emit('сегодняшняя запись\n')
+    close_logs(daily)
+    with open(daily + '.1', encoding='utf-8') as log_file:
+        assert log_file.read() == 'вчерашняя запись\n'
+
+
+def test_log_rotation_is_safe_across_processes(tmp_path):
+    """Несколько процессов пишут и ротируют один файл без потерь записей"""
+    path = str(tmp_path / 'shared.log')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_write_rotating_log, args=(path, worker, 400))
+               for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    assert any(name.endswith('.gz') for name in os.listdir(tmp_path))
+    entries = read_records(path, strict=True)
+    assert len(entries) == 1600
+    for worker in range(4):
+        results = [int(entry.result) for entry in entries if entry.args.startswith(f'{worker},')]
+        assert results == list(range(400))
+
+
+def _write_long_records(path, worker, count):
+    """Запись длинных результатов из отдельного процесса"""
+    configure_sink(path, process_safe=True, batch_size=4)
+
+    @logger(path)
+    def employee_report(worker_id, index):
+        return f'{worker_id}:{index}:' + chr(ord('a') + worker_id) * (8192 + 997 * index % 8192)
+
+    for index in range(count):
+        employee_report(worker, index)
+    close_logs(path)
+
+
+def test_process_safe_sink_does_not_tear_records(tmp_path):
+    """Длинные записи многих процессов не разрываются и не перемешиваются"""
+    path = str(tmp_path / 'stress.log')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_write_long_records, args=(path, worker, 100))
+               for worker in range(8)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    entries = read_records(path, strict=True)
+    assert len(entries) == 800
+    for entry in entries:
+        worker, index, body = entry.result.split(':')
+        worker, index = int(worker), int(index)
+        assert body == chr(ord('a') + worker) * (8192 + 997 * index % 8192)
+        assert entry.args == f'{worker}, {index}'
+
+
+def show_test_logs():
+    """Показать содержимое тестовых логов"""
+    log_files = ['test.log', 'accounting.log']
+    flush_logs()
+
+    for log_file in log_files:
+        if os.path.exists(log_file):
+            print(f"\n📄 Содержимое {log_file}:")
+            print("=" * 60)
+            with open(log_file, 'r', encoding='utf-8') as f:
+                content = f.read()
+                if content:
+                    print(content)
+                else:
+                    print("Файл пустой")
+        else:
+            print(f"❌ Файл {log_file} не найден")
+
+
+def main():
+    """Основная функция для запуска всех тестов"""
+    print("🚀 Запуск полного тестирования декораторов")
+    print("=" * 60)
+
+    # Очищаем старые логи
+    clean_log_files()
+
+    # Запускаем тесты
+    test_result1 = test_accounting_functions()
+    print(f"\n✅ {test_result1}")
+
+    test_result2 = test_error_handling()
+    print(f"✅ {test_result2}")
+
+    # Показываем логи
+    print("\n" + "=" * 60)
+    print("РЕЗУЛЬТАТЫ ЛОГИРОВАНИЯ:")
+    show_test_logs()
+
+    print("\n" + "=" * 60)
+    print("🎉 Тестирование завершено успешно!")
+
+
+if __name__ == '__main__':
+    main()